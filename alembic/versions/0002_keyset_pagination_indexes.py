@@ -0,0 +1,37 @@
+"""Composite indexes for keyset pagination of sessions and messages
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-17
+
+On PostgreSQL the indexes are built CONCURRENTLY so chat traffic is not
+blocked while a large chat_messages table is indexed. IF NOT EXISTS covers
+databases where the application already created them at startup.
+
+"""
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "0002"
+down_revision = "0001"
+branch_labels = None
+depends_on = None
+
+INDEXES = [
+    ("ix_chat_messages_session_id_timestamp", "chat_messages", ["session_id", "timestamp", "id"]),
+    ("ix_chat_sessions_user_id_created_at", "chat_sessions", ["user_id", "created_at", "id"]),
+    ("ix_chat_sessions_created_at", "chat_sessions", ["created_at", "id"]),
+]
+
+
+def upgrade():
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction
+    with op.get_context().autocommit_block():
+        for name, table, columns in INDEXES:
+            op.create_index(name, table, columns, if_not_exists=True, postgresql_concurrently=True)
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        for name, table, _ in INDEXES:
+            op.drop_index(name, table_name=table, if_exists=True, postgresql_concurrently=True)
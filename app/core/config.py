@@ -18,22 +18,123 @@ class Settings(BaseSettings):
     POSTGRES_PASSWORD: str
     POSTGRES_DB: str
 
+    # Database engine and connection pool
+    DB_POOL_SIZE: int = 10  # Connections kept open
+    DB_MAX_OVERFLOW: int = 10  # Extra connections opened under load, closed when returned
+    DB_POOL_TIMEOUT: float = 30.0  # Seconds to wait for a free connection before failing
+    DB_POOL_RECYCLE: int = 1800  # Reopen connections older than this many seconds (-1 disables)
+    DB_POOL_PRE_PING: bool = True  # Test connections on checkout (serverless Postgres drops idle ones)
+    DB_STATEMENT_CACHE_SIZE: int = 100  # asyncpg prepared statements per connection (0 behind PgBouncer)
+    DB_ECHO: bool = False  # Log every SQL statement
+
     # Qdrant configuration
-    QDRANT_HOST: str
-    QDRANT_API_KEY: str
+    VECTOR_STORE_BACKEND: str = "qdrant"  # "qdrant" or "local" (in-process NumPy index, single-node deployments)
+    QDRANT_HOST: Optional[str] = None  # Required by the "qdrant" backend
+    QDRANT_API_KEY: Optional[str] = None
     QDRANT_COLLECTION_NAME: str = "book_content_embeddings"
+    LOCAL_INDEX_PATH: str = ".cache/vector_index"  # Collections of the "local" backend, one directory each
+    LOCAL_INDEX_TYPE: str = "flat"  # "flat" (exact search) or "ivf" (approximate, for large collections)
+    IVF_NLIST: int = 0  # Clusters of the IVF index (0: square root of the number of chunks)
+    IVF_NPROBE: int = 8  # Clusters searched per query; raise for recall, lower for latency
+    IVF_MIN_POINTS: int = 50000  # Smaller collections are always searched exactly
+
+    # Vector quantization (int8 codes in RAM; float32 originals on disk rescore the best candidates)
+    VECTOR_QUANTIZATION: str = "none"  # "none" or "int8" (Qdrant scalar quantization / local int8 codes)
+    QUANTIZATION_QUANTILE: float = 0.99  # Share of values kept inside the int8 range; outliers are clipped
+    QUANTIZATION_RESCORE: bool = True  # Re-rank candidates with the float32 vectors
+    QUANTIZATION_OVERSAMPLING: float = 2.0  # Candidates rescored per requested result
 
     # OpenAI configuration
-    OPENAI_API_KEY: str
-    EMBEDDING_MODEL: str = "text-embedding-ada-002"
+    OPENAI_API_KEY: Optional[str] = None  # Required by the "openai" embedding provider
+    EMBEDDING_PROVIDER: str = "openai"  # "openai", "sentence-transformers" (local CPU) or "hashing" (offline/tests)
+    EMBEDDING_MODEL: str = "text-embedding-ada-002"  # OpenAI model
+    LOCAL_EMBEDDING_MODEL: str = "all-MiniLM-L6-v2"  # sentence-transformers model
+    EMBEDDING_DIMENSION: Optional[int] = None  # Vector size (hashing provider, or shortened OpenAI text-embedding-3 vectors)
     GPT_MODEL: str = "gpt-3.5-turbo"
 
     # Application settings
-    MAX_CONTEXT_LENGTH: int = 3000  # Maximum length of context to send to LLM
+    MAX_CONTEXT_LENGTH: int = 3000  # Legacy character budget, superseded by MAX_CONTEXT_TOKENS
+    MAX_CONTEXT_TOKENS: int = 750  # Maximum number of model tokens of context to send to LLM
     SIMILARITY_THRESHOLD: float = 0.7  # Minimum similarity score for retrieved results
     CHUNK_SIZE: int = 500  # Size of text chunks for embedding
     CHUNK_OVERLAP: int = 50  # Overlap between chunks
 
+    # Local store of document embeddings, consulted before calling the embedding API
+    EMBEDDING_STORE_ENABLED: bool = True
+    EMBEDDING_STORE_PATH: str = ".cache/embedding_store"
+
+    # Ingestion pipeline
+    INGEST_WORKERS: int = 4  # Processes reading, preprocessing and splitting files
+    INGEST_BATCH_SIZE: int = 64  # Chunks per embedding call and Qdrant upsert
+    INGEST_EMBED_CONCURRENCY: int = 4  # Embedding batches in flight at once
+    INGEST_READ_BLOCK_SIZE: int = 1_000_000  # Characters read from a file before splitting
+    INGEST_MANIFEST_PATH: str = ".cache/ingest_manifest.json"  # Checkpoint used to resume runs
+    INGEST_INCREMENTAL: bool = False  # Only embed new/changed chunks and delete stale ones
+    INGEST_CHECKPOINT_SECONDS: float = 30.0  # Longest stretch of ingested work a crash can lose
+
+    # Retrieval
+    RETRIEVAL_MODE: str = "hybrid"  # "dense" (Qdrant only) or "hybrid" (Qdrant + local BM25)
+    BM25_INDEX_PATH: str = ".cache/bm25_index.pkl"  # Local lexical index built during ingestion
+    BM25_K1: float = 1.5  # BM25 term frequency saturation
+    BM25_B: float = 0.75  # BM25 document length normalization
+    HYBRID_CANDIDATES: int = 20  # Results taken from each retriever before fusion
+    RRF_K: int = 60  # Reciprocal rank fusion damping constant
+    HYBRID_LEXICAL_ONLY_MAX_TERMS: int = 3  # Longest query answered from the lexical index alone
+    MULTI_QUERY_MAX_VARIANTS: int = 3  # Searches per compound question (itself plus its parts; 1 disables)
+    CHAT_BATCH_MAX_QUESTIONS: int = 50  # Questions accepted by one /chat/batch request
+
+    # Two-stage retrieval: over-fetch candidates, rerank them on the CPU, keep the best k
+    RERANKER: str = "none"  # "none", "lexical" (no model) or "cross-encoder" (local sentence-transformers model)
+    RERANK_CANDIDATES: int = 50  # Chunks retrieved per question for the reranker to choose from
+    RERANK_MODEL: str = "cross-encoder/ms-marco-MiniLM-L-6-v2"  # Model of the "cross-encoder" reranker
+    RERANK_LEXICAL_WEIGHT: float = 0.5  # Share of the lexical score in the "lexical" reranker (rest: retrieval score)
+    RERANK_WORKERS: int = 1  # Threads scoring candidates (CPU-bound; more than the cores just contend)
+
+    # Context diversity: every chunk packed into the prompt should add new information
+    CONTEXT_DEDUP_ENABLED: bool = False  # Drop chunks that mostly repeat a better one (MinHash of word shingles)
+    NEAR_DUPLICATE_THRESHOLD: float = 0.8  # Estimated share of a chunk's shingles found in a better chunk to drop it
+    MMR_ENABLED: bool = False  # Pick chunks by Maximal Marginal Relevance (searches also return vectors)
+    MMR_LAMBDA: float = 0.7  # 1 ranks by relevance only, 0 by diversity only
+    DIVERSITY_CANDIDATES: int = 20  # Chunks retrieved per question to choose the k diverse ones from
+
+    # Query embedding cache
+    EMBEDDING_CACHE_BACKEND: str = "memory"  # "memory", "disk", "redis" or "none"
+    EMBEDDING_CACHE_MAX_ENTRIES: int = 10000  # Maximum number of cached query embeddings
+    EMBEDDING_CACHE_MAX_BYTES: int = 64 * 1024 * 1024  # Memory bound for the in-process cache
+    EMBEDDING_CACHE_TTL_SECONDS: int = 86400  # Time-to-live for cached embeddings (0 disables expiry)
+    EMBEDDING_CACHE_PATH: str = ".cache/query_embeddings.sqlite3"  # Used by the "disk" backend
+    EMBEDDING_CACHE_REDIS_URL: Optional[str] = None  # Used by the "redis" backend
+
+    # Micro-batching of query embeddings across concurrent requests
+    EMBEDDING_BATCHING_ENABLED: bool = True
+    EMBEDDING_BATCH_MAX_WAIT_MS: float = 5.0  # Longest a query waits for others to join its batch
+    EMBEDDING_BATCH_MAX_SIZE: int = 64  # Queries per embedding call; a full batch is sent at once
+
+    # Write-behind persistence of chat messages
+    CHAT_WRITE_BEHIND_ENABLED: bool = False  # Queue /chat messages and bulk-insert them in the background
+    CHAT_WRITE_BEHIND_FLUSH_MS: int = 50  # Longest a queued message waits before being flushed
+    CHAT_WRITE_BEHIND_BATCH_ROWS: int = 500  # Messages per bulk insert
+    CHAT_WRITE_BEHIND_MAX_PENDING: int = 10000  # Queued turns before /chat waits for the writer (backpressure)
+
+    # Request coalescing
+    REQUEST_COALESCING_ENABLED: bool = True  # Concurrent identical questions share one computation
+
+    # Conversation memory (follow-up questions in global mode)
+    CONVERSATION_MEMORY_ENABLED: bool = True
+    CONVERSATION_MEMORY_MAX_SESSIONS: int = 1000  # Sessions kept in memory, least recently used evicted
+    CONVERSATION_MEMORY_MAX_TURNS: int = 5  # Turns remembered per session
+    CONVERSATION_CONTEXT_TERMS: int = 4  # Terms of earlier turns added to a follow-up question
+
+    # Session export
+    SESSION_EXPORT_BATCH_ROWS: int = 1000  # Messages fetched per server-side cursor round trip
+
+    # Semantic response cache (global mode)
+    SEMANTIC_CACHE_ENABLED: bool = True
+    SEMANTIC_CACHE_MAX_ENTRIES: int = 1000  # Maximum number of cached responses
+    SEMANTIC_CACHE_DISTANCE_THRESHOLD: float = 0.05  # Maximum cosine distance for a cache hit
+    SEMANTIC_CACHE_TTL_SECONDS: int = 3600  # Time-to-live for cached responses (0 disables expiry)
+    SEMANTIC_CACHE_VERSION_CHECK_SECONDS: float = 5.0  # How often to poll the collection version
+
     class Config:
         env_file = ".env"
 
@@ -0,0 +1,240 @@
+import logging
+from collections import OrderedDict, deque
+from typing import List, Dict, Any, Awaitable, Callable, Optional, Tuple
+from app.core.config import settings
+from app.database.chat_history import load_recent_queries
+from app.database.session import AsyncSessionLocal
+from app.utils.answer_extraction import MIN_TERM_LENGTH, find_word
+from app.utils.text_processing import TERM_PATTERN, STOPWORDS
+
+logger = logging.getLogger(__name__)
+
+# Words that point back at something said earlier in the conversation
+REFERRING_WORDS = frozenset(
+    "he she it they him her them his hers its their theirs this that these those".split()
+)
+# Openings of questions that continue the previous one ("and the daughter?")
+CONTINUATION_STARTERS = ("and ", "also ", "then ", "so ", "what about ", "how about ", "what else")
+
+# A question with a referring word but more content terms than this is
+# treated as self-contained ("what did the keeper do when his lamp failed")
+FOLLOW_UP_MAX_TERMS = 3
+
+
+def content_terms(text: str) -> List[str]:
+    """Distinct lowercase terms of a text that carry retrieval signal, in order"""
+    return list(dict.fromkeys(
+        word for word in TERM_PATTERN.findall(text.lower())
+        if len(word) >= MIN_TERM_LENGTH and word not in STOPWORDS
+    ))
+
+
+def is_follow_up(query: str) -> bool:
+    """Whether a question needs the conversation so far to be understood"""
+    lowered = query.lower().lstrip()
+    terms = content_terms(lowered)
+    if not terms or lowered.startswith(CONTINUATION_STARTERS):
+        return True
+    return len(terms) <= FOLLOW_UP_MAX_TERMS and any(
+        word in REFERRING_WORDS for word in TERM_PATTERN.findall(lowered)
+    )
+
+
+class ConversationTurn:
+    """A question as asked, its standalone form and the chunks retrieved for it"""
+
+    __slots__ = ("query", "standalone_query", "docs")
+
+    def __init__(self, query: str, standalone_query: str, docs: List[Any]):
+        self.query = query
+        self.standalone_query = standalone_query
+        self.docs = docs
+
+
+def condense_query(query: str, history: List[ConversationTurn], max_terms: int) -> Optional[str]:
+    """
+    Rewrite a follow-up question into a standalone one
+
+    Without a language model to rephrase the question, the content terms of
+    the preceding turns (most recent first) are appended to it, which is
+    what both the embedding and the BM25 index need to find the topic again.
+
+    Args:
+        query: Follow-up question
+        history: Earlier turns, oldest first
+        max_terms: Maximum number of terms carried over
+
+    Returns:
+        The standalone question, or None if the history adds nothing
+    """
+    own_terms = set(content_terms(query))
+    carried = []
+    for turn in reversed(history):
+        for term in content_terms(turn.standalone_query):
+            if term not in own_terms and term not in carried:
+                carried.append(term)
+        if len(carried) >= max_terms:
+            break
+    if not carried:
+        return None
+    return f"{query} {' '.join(carried[:max_terms])}"
+
+
+def reusable_context(query: str, history: List[ConversationTurn]) -> Optional[List[Any]]:
+    """
+    Chunks of the previous turn that can answer a follow-up as well
+
+    They are reused when the follow-up brings no new content terms ("why did
+    he do that?") or when every new term already occurs in them.
+
+    Returns:
+        The previous turn's documents, or None if the follow-up needs a fresh retrieval
+    """
+    if not history or not history[-1].docs:
+        return None
+    docs = history[-1].docs
+    terms = content_terms(query)
+    if terms:
+        context = "\n\n".join(doc.page_content for doc in docs).lower()
+        if any(find_word(context, term) == -1 for term in terms):
+            return None
+    return docs
+
+
+async def load_history_from_db(session_id: int, limit: int) -> List[str]:
+    """Questions of a session stored in the database, oldest first"""
+    async with AsyncSessionLocal() as db:
+        return await load_recent_queries(db, session_id, limit)
+
+
+class ConversationMemory:
+    """
+    Recent turns of each chat session, kept in process
+
+    Holds the last max_turns turns of up to max_sessions sessions, evicting
+    the least recently used session. A session that is not in memory is
+    loaded from the chat history in the database on its first follow-up;
+    the database does not record which chunks were retrieved, so such a
+    session only regains its questions.
+    """
+
+    def __init__(
+        self,
+        history_loader: Callable[[int, int], Awaitable[List[str]]],
+        max_sessions: int,
+        max_turns: int,
+        context_terms: int
+    ):
+        self.history_loader = history_loader
+        self.max_sessions = max_sessions
+        self.max_turns = max_turns
+        self.context_terms = context_terms
+        self._sessions = OrderedDict()  # session_id -> deque of ConversationTurn, least recent first
+
+        self.hits = 0
+        self.misses = 0
+        self.load_failures = 0
+        self.evictions = 0
+        self.condensed = 0
+        self.context_reused = 0
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+    def _put(self, session_id: int, turns: deque):
+        self._sessions[session_id] = turns
+        self._sessions.move_to_end(session_id)
+        while len(self._sessions) > self.max_sessions:
+            self._sessions.popitem(last=False)
+            self.evictions += 1
+
+    async def history(self, session_id: int) -> List[ConversationTurn]:
+        """
+        Earlier turns of a session, oldest first, loading them from the database on a miss
+
+        Args:
+            session_id: ID of the chat session
+
+        Returns:
+            Up to max_turns turns
+        """
+        turns = self._sessions.get(session_id)
+        if turns is not None:
+            self.hits += 1
+            self._sessions.move_to_end(session_id)
+            return list(turns)
+
+        self.misses += 1
+        try:
+            queries = await self.history_loader(session_id, self.max_turns)
+        except Exception:
+            # Answer without history rather than fail the request; retried on the next miss
+            self.load_failures += 1
+            logger.exception("Failed to load history of session %s", session_id)
+            return []
+        turns = deque((ConversationTurn(query, query, []) for query in queries), maxlen=self.max_turns)
+        self._put(session_id, turns)
+        return list(turns)
+
+    async def resolve(self, session_id: Optional[int], query: str) -> Tuple[str, Optional[List[Any]]]:
+        """
+        Standalone form of a question and, if they still apply, the chunks retrieved for the previous turn
+
+        History is only consulted (and only loaded) for follow-up questions.
+
+        Args:
+            session_id: ID of the chat session, if any
+            query: User's question
+
+        Returns:
+            (question to retrieve and answer with, reusable documents or None)
+        """
+        if session_id is None or not is_follow_up(query):
+            return query, None
+        history = await self.history(session_id)
+        standalone_query = condense_query(query, history, self.context_terms)
+        if standalone_query is None:
+            return query, None
+        self.condensed += 1
+
+        docs = reusable_context(query, history)
+        if docs is not None:
+            self.context_reused += 1
+        return standalone_query, docs
+
+    def record(self, session_id: Optional[int], turn: Optional[ConversationTurn]):
+        """Remember a completed turn of a session"""
+        if session_id is None or turn is None:
+            return
+        turns = self._sessions.get(session_id)
+        if turns is None:
+            self._put(session_id, deque([turn], maxlen=self.max_turns))
+        else:
+            turns.append(turn)
+            self._sessions.move_to_end(session_id)
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "sessions": len(self._sessions),
+            "max_sessions": self.max_sessions,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "load_failures": self.load_failures,
+            "evictions": self.evictions,
+            "condensed_queries": self.condensed,
+            "context_reused": self.context_reused,
+        }
+
+
+def create_conversation_memory() -> Optional[ConversationMemory]:
+    """Build the conversation memory configured in settings (None when disabled)"""
+    if not settings.CONVERSATION_MEMORY_ENABLED:
+        return None
+    return ConversationMemory(
+        history_loader=load_history_from_db,
+        max_sessions=settings.CONVERSATION_MEMORY_MAX_SESSIONS,
+        max_turns=settings.CONVERSATION_MEMORY_MAX_TURNS,
+        context_terms=settings.CONVERSATION_CONTEXT_TERMS
+    )
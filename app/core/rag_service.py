@@ -1,12 +1,34 @@
-from typing import List, Dict, Any
+import asyncio
+import re
+from typing import List, Dict, Any, AsyncIterator, Awaitable, Callable, Iterator, Optional, Tuple
 from langchain.prompts import PromptTemplate
 from app.utils.vector_store import vector_store_manager
 from app.core.config import settings
+from app.core.semantic_cache import create_semantic_cache
+from app.core.conversation_memory import ConversationTurn, create_conversation_memory
+from app.core.single_flight import create_single_flight, request_key
+from app.utils.context_packing import pack_context
+from app.utils.diversity import select_diverse
+from app.utils.answer_extraction import extract_answer, public_metadata
+from app.utils.query_expansion import expand_query
+from app.utils.reranking import create_reranker
 from app.schemas.chat import ChatRequest
 
+# A streamed token is a word together with the whitespace that follows it
+TOKEN_PATTERN = re.compile(r"\S+\s*")
+
 
 class RAGService:
     def __init__(self):
+        # Near-duplicate questions in global mode are answered from this cache
+        self.semantic_cache = create_semantic_cache(vector_store_manager.get_collection_version)
+        # Recent turns of each session, for answering follow-up questions
+        self.conversation_memory = create_conversation_memory()
+        # Concurrent identical questions share one retrieval and answer
+        self.single_flight = create_single_flight()
+        # Over-fetched candidates are reranked on the CPU before the best k are packed
+        self.reranker = create_reranker()
+
         # Define prompt templates for different modes
         self.global_rag_prompt = PromptTemplate(
             input_variables=["context", "question"],
@@ -38,28 +60,216 @@ class RAGService:
             """
         )
 
-    def generate_response_global(self, query: str, k: int = 4) -> Dict[str, Any]:
+    async def _retrieve_many(self, queries: List[str], k: int) -> List[Dict[str, Any]]:
         """
-        Generate response using global RAG approach (retrieving from entire book content)
-        
+        Retrieval half of the global RAG approach, for one or more questions
+
+        Each question is searched together with its expansions (the parts of
+        a compound question). All embeddings are requested concurrently, so
+        they share one embedding call when micro-batching is enabled, and all
+        searches go to Qdrant in a single search_batch request. With a
+        reranker, RERANK_CANDIDATES chunks are retrieved per question and
+        reranked; near-duplicates are then dropped and, with MMR, the k
+        chunks are picked for relevance and diversity.
+
+        Args:
+            queries: User's questions
+            k: Number of context chunks to retrieve per question
+
+        Returns:
+            For each question, a dictionary with the query embedding (None when
+            the lexical index answered alone), the packed context documents and,
+            on a semantic cache hit, the cached result
+        """
+        retrievals = [None] * len(queries)
+
+        if settings.RETRIEVAL_MODE == "hybrid":
+            # Short lookup queries (names, titles) that the lexical index matches
+            # exactly are answered without calling the embedding API
+            lookups = await asyncio.gather(*(vector_store_manager.lexical_lookup(query, k=k) for query in queries))
+            for i, scored_docs in enumerate(lookups):
+                if scored_docs is not None:
+                    docs = pack_context(scored_docs, settings.MAX_CONTEXT_TOKENS)
+                    retrievals[i] = {"query_embedding": None, "docs": docs, "cached": None}
+
+        pending = [i for i, retrieval in enumerate(retrievals) if retrieval is None]
+        if not pending:
+            return retrievals
+
+        variants = {i: expand_query(queries[i], settings.MULTI_QUERY_MAX_VARIANTS) for i in pending}
+        flat_embeddings = iter(await asyncio.gather(*(
+            vector_store_manager.embed_query(variant) for i in pending for variant in variants[i]
+        )))
+        embeddings = {i: [next(flat_embeddings) for _ in variants[i]] for i in pending}
+
+        if self.semantic_cache is not None:
+            # Entries computed against older collection content are dropped here
+            await self.semantic_cache.current_version()
+            for i in pending:
+                cached = self.semantic_cache.lookup(embeddings[i][0])
+                if cached is not None:
+                    retrievals[i] = {"query_embedding": embeddings[i][0], "docs": [], "cached": cached}
+            pending = [i for i in pending if retrievals[i] is None]
+
+        # Retrieve relevant documents, over-fetching candidates when they are
+        # reranked or when k diverse chunks are chosen from a larger pool
+        diverse = settings.CONTEXT_DEDUP_ENABLED or settings.MMR_ENABLED
+        pool_k = max(k, settings.DIVERSITY_CANDIDATES) if diverse else k
+        fetch_k = max(pool_k, settings.RERANK_CANDIDATES) if self.reranker is not None else pool_k
+        scored = await vector_store_manager.fused_search_batch(
+            [(queries[i], embeddings[i]) for i in pending], k=fetch_k, with_vectors=settings.MMR_ENABLED
+        ) if pending else []
+        if self.reranker is not None and pending:
+            scored = await self.reranker.rerank([queries[i] for i in pending], scored, pool_k)
+        if diverse and pending:
+            # MinHash signatures and similarity matrices are CPU work: every
+            # question of the request is handled in one worker thread hop
+            threshold = settings.NEAR_DUPLICATE_THRESHOLD if settings.CONTEXT_DEDUP_ENABLED else None
+            lambda_mult = settings.MMR_LAMBDA if settings.MMR_ENABLED else None
+            scored = await asyncio.to_thread(
+                lambda: [select_diverse(scored_docs, k, threshold, lambda_mult) for scored_docs in scored]
+            )
+        for i, scored_docs in zip(pending, scored):
+            # Keep the best whole chunks that fit the token budget
+            docs = pack_context(scored_docs, settings.MAX_CONTEXT_TOKENS)
+            retrievals[i] = {"query_embedding": embeddings[i][0], "docs": docs, "cached": None}
+
+        return retrievals
+
+    async def _retrieve_global(self, query: str, k: int) -> Dict[str, Any]:
+        """Retrieval half of the global RAG approach for a single question (see _retrieve_many)"""
+        return (await self._retrieve_many([query], k))[0]
+
+    async def _complete_global(self, query: str, retrieval: Dict[str, Any]) -> Dict[str, Any]:
+        """Answer a question from its retrieval, caching the answer by the question's embedding"""
+        result = retrieval["cached"]
+        if result is None:
+            # Extraction is CPU work proportional to the context; it runs off the event loop
+            idf = await self._book_idf()
+            result = await asyncio.to_thread(self._answer_global, query, retrieval["docs"], idf=idf)
+            if self.semantic_cache is not None and retrieval["query_embedding"] is not None:
+                self.semantic_cache.store(retrieval["query_embedding"], result)
+        return result
+
+    async def answer_batch(self, queries: List[str], k: int = 4) -> List[Dict[str, Any]]:
+        """
+        Answer a list of independent global-mode questions together
+
+        Used for sets like end-of-chapter review questions: retrieval for all
+        of them costs one embedding call (with micro-batching) and one Qdrant
+        round trip. Questions are not treated as follow-ups of each other.
+
+        Args:
+            queries: User's questions
+            k: Number of context chunks to retrieve per question
+
+        Returns:
+            For each question, a dictionary with response and source information
+            and the turn to pass to remember_turn
+        """
+        retrievals = await self._retrieve_many(queries, k)
+        results = []
+        for query, retrieval in zip(queries, retrievals):
+            result = dict(await self._complete_global(query, retrieval))
+            result["turn"] = ConversationTurn(query, query, retrieval["docs"])
+            results.append(result)
+        return results
+
+    async def _coalesce(self, key: Any, compute: Callable[[], Awaitable[Any]]) -> Any:
+        """Run compute, sharing it with concurrent identical requests when coalescing is enabled"""
+        if self.single_flight is None:
+            return await compute()
+        return await self.single_flight.do(key, compute)
+
+    async def _resolve_global(self, query: str, k: int, session_id: Optional[int]) -> Tuple[str, Dict[str, Any]]:
+        """
+        Retrieval step of a global-mode question that may follow up on earlier turns of its session
+
+        Follow-up questions are condensed into a standalone question with the
+        session's recent turns, and the previous turn's chunks are reused
+        instead of querying the vector store when they still cover the question.
+        Concurrent requests for the same standalone question share one retrieval.
+
         Args:
             query: User's question
             k: Number of context chunks to retrieve
-            
+            session_id: ID of the chat session, if any
+
+        Returns:
+            The standalone question and its retrieval (see _retrieve_many); reused
+            chunks have no query embedding
+        """
+        standalone_query, reused_docs = query, None
+        if self.conversation_memory is not None:
+            standalone_query, reused_docs = await self.conversation_memory.resolve(session_id, query)
+
+        if reused_docs is not None:
+            return standalone_query, {"query_embedding": None, "docs": reused_docs, "cached": None}
+        retrieval = await self._coalesce(
+            ("retrieve", request_key("global", standalone_query), k),
+            lambda: self._retrieve_global(standalone_query, k)
+        )
+        return standalone_query, retrieval
+
+    async def _complete_shared(self, standalone_query: str, k: int, retrieval: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Answer a resolved global-mode question
+
+        Concurrent requests that shared a retrieval also share the answer
+        (and its semantic cache store); each caller gets its own result.
+        """
+        if retrieval["query_embedding"] is None:
+            result = await self._complete_global(standalone_query, retrieval)
+        else:
+            result = await self._coalesce(
+                (request_key("global", standalone_query), k),
+                lambda: self._complete_global(standalone_query, retrieval)
+            )
+        return {"response": result["response"], "sources": list(result["sources"])}
+
+    async def _run_global(self, query: str, k: int, session_id: Optional[int]) -> Tuple[Dict[str, Any], ConversationTurn]:
+        """
+        Answer a global-mode question that may follow up on earlier turns of its session
+
+        Args:
+            query: User's question
+            k: Number of context chunks to retrieve
+            session_id: ID of the chat session, if any
+
+        Returns:
+            The result (response and sources) and the turn to pass to remember_turn
+        """
+        standalone_query, retrieval = await self._resolve_global(query, k, session_id)
+        result = await self._complete_shared(standalone_query, k, retrieval)
+        return result, ConversationTurn(query, standalone_query, retrieval["docs"])
+
+    def remember_turn(self, session_id: Optional[int], turn: Optional[ConversationTurn]):
+        """
+        Add an answered turn to its session's conversation memory
+
+        Called once the session ID is known (it is created after answering
+        the first question of a new session).
+        """
+        if self.conversation_memory is not None:
+            self.conversation_memory.record(session_id, turn)
+
+    def _answer_global(
+        self, query: str, docs: List[Any], idf: Optional[Callable[[str], float]] = None
+    ) -> Dict[str, Any]:
+        """
+        Generation half of the global RAG approach
+
+        Args:
+            query: User's question
+            docs: Context documents selected by retrieval
+            idf: Book-wide term weights, as passed to _simple_response_generator
+
         Returns:
             Dictionary with response and source information
         """
-        # Retrieve relevant documents
-        docs = vector_store_manager.similarity_search(query, k=k)
-        
         # Combine documents into context
         context = "\n\n".join([doc.page_content for doc in docs])
         
-        # Check if context is too long
-        if len(context) > settings.MAX_CONTEXT_LENGTH:
-            # Truncate context to fit within limits
-            context = context[:settings.MAX_CONTEXT_LENGTH]
-        
         # If context is empty, return appropriate message
         if not context.strip():
             return {
@@ -69,23 +279,50 @@ class RAGService:
         
         # For an open-source approach without a local LLM, we'll create a simple 
         # response based on the context that answers the question directly
-        response = self._simple_response_generator(query, context)
+        response = self._simple_response_generator(
+            query, [(doc.page_content, doc.metadata) for doc in docs], idf=idf
+        )
         
         # Extract sources
-        sources = [doc.metadata for doc in docs] if docs else []
+        sources = self._sources(docs)
         
         return {
             "response": response,
             "sources": sources
         }
 
-    def generate_response_selected_text_only(self, query: str, selected_text: str) -> Dict[str, Any]:
+    @staticmethod
+    def _sources(docs: List[Any]) -> List[Dict[str, Any]]:
+        """Source information of the context documents"""
+        return [public_metadata(doc.metadata) for doc in docs]
+
+    async def generate_response_global(self, query: str, k: int = 4, session_id: Optional[int] = None) -> Dict[str, Any]:
+        """
+        Generate response using global RAG approach (retrieving from entire book content)
+        
+        Args:
+            query: User's question
+            k: Number of context chunks to retrieve
+            session_id: ID of the chat session, used to resolve follow-up questions
+            
+        Returns:
+            Dictionary with response and source information, and the turn to
+            pass to remember_turn
+        """
+        result, turn = await self._run_global(query, k, session_id)
+        result["turn"] = turn
+        return result
+
+    def generate_response_selected_text_only(
+        self, query: str, selected_text: str, idf: Optional[Callable[[str], float]] = None
+    ) -> Dict[str, Any]:
         """
         Generate response using selected text only approach
         
         Args:
             query: User's question
             selected_text: Text that the user has selected/highlighted
+            idf: Book-wide term weights, as passed to _simple_response_generator
             
         Returns:
             Dictionary with response and source information
@@ -98,58 +335,38 @@ class RAGService:
             }
         
         # Create response based on the selected text
-        response = self._simple_response_generator(query, selected_text)
+        response = self._simple_response_generator(query, [(selected_text, None)], idf=idf)
         
         return {
             "response": response,
             "sources": [{"source": "selected_text", "content": selected_text}]
         }
 
-    def _simple_response_generator(self, query: str, context: str) -> str:
+    def _simple_response_generator(
+        self,
+        query: str,
+        passages: List[Tuple[str, Optional[Dict[str, Any]]]],
+        idf: Optional[Callable[[str], float]] = None
+    ) -> str:
         """
         A simple response generator that tries to answer the query based on the context
         This is a basic implementation without using a language model
+
+        Args:
+            query: User's question
+            passages: (text, chunk metadata or None) pairs making up the context
+            idf: Weight of a query term across the whole book (from _book_idf);
+                without it terms are weighted across the context itself
         """
-        # Convert to lowercase for comparison
-        query_lower = query.lower()
-        context_lower = context.lower()
-        
-        # List of common question words to identify the type of question
-        question_words = ["what", "who", "when", "where", "why", "how", "which", "whose"]
-        
-        # Check if the query is a yes/no question
-        if query_lower.startswith(("is", "are", "was", "were", "can", "could", "will", "would", "do", "does", "did", "have", "has", "had")):
-            # For yes/no questions, check if the context supports a yes or no answer
-            if any(word in context_lower for word in ["yes", "true", "correct", "indeed", "certainly", "definitely", "exactly"]):
-                return f"Based on the provided content, the answer appears to be yes. {context[:200]}{'...' if len(context) > 200 else ''}"
-            elif any(word in context_lower for word in ["no", "false", "incorrect", "not", "never", "none"]):
-                return f"Based on the provided content, the answer appears to be no. {context[:200]}{'...' if len(context) > 200 else ''}"
-            else:
-                return f"Based on the provided content: {context[:300]}{'...' if len(context) > 300 else ''}"
-        
-        # For other questions, try to extract relevant information from the context
-        # Look for sentences in the context that might answer the question
-        sentences = context.split('.')
-        relevant_sentences = []
-        
-        for sentence in sentences:
-            sentence_lower = sentence.lower()
-            # Check if any key terms from the query are in this sentence
-            for word in query_lower.split():
-                if len(word) > 3 and word in sentence_lower:  # Only consider words longer than 3 chars
-                    relevant_sentences.append(sentence.strip())
-                    break
-        
-        if relevant_sentences:
-            response = f"According to the book: {' '.join(relevant_sentences[:2])}"  # Take up to 2 relevant sentences
-            if len(relevant_sentences) > 2:
-                response += "..."
-            return response
-        else:
-            # If no relevant sentences found, return a summary of the context
-            return f"Based on the provided content: {context[:300]}{'...' if len(context) > 300 else ''}"
+        return extract_answer(query, passages, idf=idf)
+
+    @staticmethod
+    async def _book_idf() -> Optional[Callable[[str], float]]:
+        """How rare a term is across the whole book, or None while the lexical index is empty"""
+        lexical_index = await vector_store_manager.get_lexical_index_async()
+        return lexical_index.idf if len(lexical_index) else None
 
-    def process_query(self, chat_request: ChatRequest) -> Dict[str, Any]:
+    async def process_query(self, chat_request: ChatRequest) -> Dict[str, Any]:
         """
         Process a chat request based on the mode specified
         
@@ -165,15 +382,63 @@ class RAGService:
                     "response": "Selected text is required for 'selected_text_only' mode.",
                     "sources": []
                 }
-            return self.generate_response_selected_text_only(
-                query=chat_request.query,
-                selected_text=chat_request.selected_text
+            # Extraction is CPU work proportional to the selection; it runs off
+            # the event loop so identical concurrent requests can share it
+            idf = await self._book_idf()
+            result = await self._coalesce(
+                request_key("selected_text_only", chat_request.query, chat_request.selected_text),
+                lambda: asyncio.to_thread(
+                    self.generate_response_selected_text_only,
+                    query=chat_request.query,
+                    selected_text=chat_request.selected_text,
+                    idf=idf
+                )
             )
+            return {"response": result["response"], "sources": list(result["sources"])}
         elif chat_request.mode == "global":
-            return self.generate_response_global(query=chat_request.query)
+            return await self.generate_response_global(query=chat_request.query, session_id=chat_request.session_id)
         else:
             # Default to global mode if an invalid mode is specified
-            return self.generate_response_global(query=chat_request.query)
+            return await self.generate_response_global(query=chat_request.query, session_id=chat_request.session_id)
+
+    @staticmethod
+    def _stream_tokens(response: str) -> Iterator[str]:
+        """Split a response into word tokens (keeping whitespace) for streaming"""
+        return (match.group(0) for match in TOKEN_PATTERN.finditer(response))
+
+    async def stream_query(self, chat_request: ChatRequest) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Process a chat request, streaming the result as it becomes available
+
+        In global mode sources are emitted as soon as retrieval finishes,
+        before the answer is generated; then the answer is emitted token by
+        token.
+
+        Args:
+            chat_request: Chat request with query and mode
+
+        Yields:
+            {"type": "sources", "sources": [...]} once, then {"type": "token", "text": "..."} events,
+            then in global mode {"type": "turn", "turn": ConversationTurn} for remember_turn
+        """
+        if chat_request.mode == "selected_text_only":
+            # No retrieval step: the answer is computed from the request alone
+            result = await self.process_query(chat_request)
+            yield {"type": "sources", "sources": result["sources"]}
+            for token in self._stream_tokens(result["response"]):
+                yield {"type": "token", "text": token}
+            return
+
+        k = 4
+        standalone_query, retrieval = await self._resolve_global(chat_request.query, k, chat_request.session_id)
+        cached = retrieval["cached"]
+        sources = list(cached["sources"]) if cached is not None else self._sources(retrieval["docs"])
+        yield {"type": "sources", "sources": sources}
+
+        result = await self._complete_shared(standalone_query, k, retrieval)
+        for token in self._stream_tokens(result["response"]):
+            yield {"type": "token", "text": token}
+        yield {"type": "turn", "turn": ConversationTurn(chat_request.query, standalone_query, retrieval["docs"])}
 
 
 # Global instance
@@ -0,0 +1,165 @@
+import time
+from collections import OrderedDict
+from typing import List, Dict, Any, Optional, Awaitable, Callable
+import numpy as np
+from app.core.config import settings
+
+
+class SemanticResponseCache:
+    """
+    Response cache keyed by query meaning rather than query text
+
+    Query embeddings live in a fixed-size float32 matrix so a lookup is a single
+    matrix-vector product. Entries are tied to the collection version they were
+    computed against and the whole cache is dropped when that version changes.
+    """
+
+    def __init__(
+        self,
+        version_fetcher: Callable[[], Awaitable[str]],
+        max_entries: int,
+        distance_threshold: float,
+        ttl_seconds: int = 0,
+        version_check_seconds: float = 5.0
+    ):
+        self.version_fetcher = version_fetcher
+        self.max_entries = max_entries
+        self.distance_threshold = distance_threshold
+        self.ttl_seconds = ttl_seconds
+        self.version_check_seconds = version_check_seconds
+
+        self._vectors = None  # Allocated on first store, once the dimension is known
+        self._used = np.zeros(max_entries, dtype=bool)
+        self._lru = OrderedDict()  # slot -> None, oldest first
+        self._entries = {}  # slot -> (response, created_at)
+        self._version = None
+        self._version_checked_at = 0.0
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+        self._hit_distance_total = 0.0
+
+    async def current_version(self) -> str:
+        """Collection version, refreshed at most every version_check_seconds"""
+        now = time.monotonic()
+        if self._version is None or now - self._version_checked_at >= self.version_check_seconds:
+            version = await self.version_fetcher()
+            self._version_checked_at = now
+            if version != self._version:
+                if self._version is not None:
+                    self.invalidations += 1
+                self.clear()
+                self._version = version
+        return self._version
+
+    def clear(self):
+        """Drop every cached response"""
+        self._used[:] = False
+        self._lru.clear()
+        self._entries.clear()
+
+    @staticmethod
+    def _normalize(vector: List[float]) -> np.ndarray:
+        array = np.asarray(vector, dtype=np.float32)
+        norm = np.linalg.norm(array)
+        return array / norm if norm > 0 else array
+
+    def lookup(self, query_embedding: List[float]) -> Optional[Dict[str, Any]]:
+        """
+        Find a cached response for a semantically equivalent query
+
+        Args:
+            query_embedding: Embedding of the incoming query
+
+        Returns:
+            A copy of the cached response, or None on a miss
+        """
+        if self._vectors is None or not self._lru:
+            self.misses += 1
+            return None
+
+        query = self._normalize(query_embedding)
+        scores = self._vectors @ query
+        scores[~self._used] = -np.inf
+        slot = int(np.argmax(scores))
+        distance = 1.0 - float(scores[slot])
+
+        response, created_at = self._entries.get(slot, (None, 0.0))
+        if response is None or distance > self.distance_threshold:
+            self.misses += 1
+            return None
+
+        if self.ttl_seconds > 0 and time.time() - created_at > self.ttl_seconds:
+            self._release(slot)
+            self.misses += 1
+            return None
+
+        self._lru.move_to_end(slot)
+        self.hits += 1
+        self._hit_distance_total += distance
+        return {"response": response["response"], "sources": list(response["sources"])}
+
+    def store(self, query_embedding: List[float], response: Dict[str, Any]):
+        """
+        Cache a response under the embedding of the query that produced it
+
+        Args:
+            query_embedding: Embedding of the query
+            response: Dictionary with response and sources
+        """
+        query = self._normalize(query_embedding)
+        if self._vectors is None:
+            self._vectors = np.zeros((self.max_entries, query.shape[0]), dtype=np.float32)
+
+        free_slots = np.flatnonzero(~self._used)
+        if free_slots.size:
+            slot = int(free_slots[0])
+        else:
+            # Evict the least recently used entry
+            slot = next(iter(self._lru))
+            self._release(slot)
+            self.evictions += 1
+
+        self._vectors[slot] = query
+        self._used[slot] = True
+        self._lru[slot] = None
+        self._entries[slot] = (
+            {"response": response["response"], "sources": list(response.get("sources", []))},
+            time.time()
+        )
+
+    def _release(self, slot: int):
+        self._used[slot] = False
+        self._lru.pop(slot, None)
+        self._entries.pop(slot, None)
+
+    def stats(self) -> Dict[str, Any]:
+        """Counters for tuning the distance threshold and capacity"""
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._lru),
+            "max_entries": self.max_entries,
+            "distance_threshold": self.distance_threshold,
+            "collection_version": self._version,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "avg_hit_distance": self._hit_distance_total / self.hits if self.hits else 0.0,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
+        }
+
+
+def create_semantic_cache(version_fetcher: Callable[[], Awaitable[str]]) -> Optional[SemanticResponseCache]:
+    """Build the semantic response cache configured in settings (None when disabled)"""
+    if not settings.SEMANTIC_CACHE_ENABLED:
+        return None
+    return SemanticResponseCache(
+        version_fetcher=version_fetcher,
+        max_entries=settings.SEMANTIC_CACHE_MAX_ENTRIES,
+        distance_threshold=settings.SEMANTIC_CACHE_DISTANCE_THRESHOLD,
+        ttl_seconds=settings.SEMANTIC_CACHE_TTL_SECONDS,
+        version_check_seconds=settings.SEMANTIC_CACHE_VERSION_CHECK_SECONDS
+    )
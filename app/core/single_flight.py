@@ -0,0 +1,96 @@
+import asyncio
+import hashlib
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional, Tuple
+from app.core.config import settings
+
+
+def request_key(mode: str, query: str, selected_text: Optional[str] = None) -> Tuple[str, str, str]:
+    """
+    Key under which identical chat requests are coalesced
+
+    The query is lowercased and its whitespace collapsed, which does not
+    change the answer (matching is case-insensitive and word based). The
+    selected text is hashed so long selections are not kept as keys.
+
+    Args:
+        mode: Query mode
+        query: User's question (the standalone form for follow-ups)
+        selected_text: Text the question is about in selected_text_only mode
+
+    Returns:
+        Hashable request key
+    """
+    normalized = " ".join(query.lower().split())
+    text_hash = hashlib.sha256((selected_text or "").encode("utf-8")).hexdigest()
+    return mode, normalized, text_hash
+
+
+class SingleFlight:
+    """
+    Shares one in-flight computation between concurrent identical requests
+
+    The first caller for a key starts the computation as a task; callers
+    arriving while it runs await the same task instead of starting their
+    own. The key is released as soon as the task finishes, so results are
+    never served after the fact (that is the semantic cache's job).
+    """
+
+    def __init__(self):
+        self._in_flight = {}  # key -> asyncio.Task
+
+        self.executions = 0
+        self.coalesced = 0
+        self.failures = 0
+
+    def __len__(self) -> int:
+        return len(self._in_flight)
+
+    async def do(self, key: Hashable, compute: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Run compute for key, or wait for the run already in flight
+
+        The shared task is shielded: a caller that is cancelled (client
+        disconnected) stops waiting without cancelling it for the others.
+        Every caller receives the same result object, or the same exception.
+
+        Args:
+            key: Request key (see request_key)
+            compute: Coroutine function producing the result
+
+        Returns:
+            The computation's result
+        """
+        task = self._in_flight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(compute())
+            self._in_flight[key] = task
+            task.add_done_callback(lambda done: self._release(key, done))
+            self.executions += 1
+        else:
+            self.coalesced += 1
+        return await asyncio.shield(task)
+
+    def _release(self, key: Hashable, task: asyncio.Task):
+        if self._in_flight.get(key) is task:
+            del self._in_flight[key]
+        # Retrieve the exception so it is not reported as unhandled when
+        # every waiter was cancelled before the task failed
+        if not task.cancelled() and task.exception() is not None:
+            self.failures += 1
+
+    def stats(self) -> Dict[str, Any]:
+        requests = self.executions + self.coalesced
+        return {
+            "in_flight": len(self._in_flight),
+            "executions": self.executions,
+            "coalesced": self.coalesced,
+            "coalesced_rate": self.coalesced / requests if requests else 0.0,
+            "failures": self.failures,
+        }
+
+
+def create_single_flight() -> Optional[SingleFlight]:
+    """Build the request coalescer configured in settings (None when disabled)"""
+    if not settings.REQUEST_COALESCING_ENABLED:
+        return None
+    return SingleFlight()
@@ -0,0 +1,269 @@
+import json
+from datetime import datetime, timedelta, timezone
+from typing import AsyncIterator, List, Optional, Tuple
+from sqlalchemy import DateTime, Integer, String, Text, column, insert, select, values
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.chat_session import ChatSession as ChatSessionModel, ChatMessage as ChatMessageModel
+
+
+def session_title(query: str) -> str:
+    """Title of a session created implicitly by its first question"""
+    return query[:50] + "..." if len(query) > 50 else query
+
+
+async def resolve_session(db: AsyncSession, session_id: Optional[int], query: str) -> Optional[int]:
+    """
+    Return the session a chat turn belongs to, creating one if none was given
+
+    Args:
+        db: Database session
+        session_id: ID of an existing chat session, if any
+        query: The user's question, used as the title of a new session
+
+    Returns:
+        The session ID, or None if session_id does not exist
+    """
+    if session_id:
+        result = await db.execute(
+            select(ChatSessionModel.id).where(ChatSessionModel.id == session_id)
+        )
+        return result.scalar_one_or_none()
+
+    # INSERT ... RETURNING instead of add + commit + refresh (one round trip fewer)
+    result = await db.execute(
+        insert(ChatSessionModel)
+        .values(title=session_title(query), user_id="anonymous")
+        .returning(ChatSessionModel.id)
+    )
+    session_id = result.scalar_one()
+    await db.commit()
+    return session_id
+
+
+def turn_timestamps(asked_at: Optional[datetime] = None) -> Tuple[datetime, datetime]:
+    """
+    Timestamps of a turn's question and answer
+
+    Both messages of a turn are written in one transaction, where the
+    server-side now() is the same for every row, so they are set explicitly:
+    the question when it was received and the answer now, at least one
+    microsecond later so the answer always sorts after its question.
+
+    Args:
+        asked_at: When the question was received (defaults to now)
+
+    Returns:
+        (question timestamp, answer timestamp)
+    """
+    answered_at = datetime.now(timezone.utc)
+    asked_at = asked_at or answered_at
+    return asked_at, max(answered_at, asked_at + timedelta(microseconds=1))
+
+
+async def save_chat_turn(
+    db: AsyncSession, session_id: int, query: str, response: str, asked_at: Optional[datetime] = None
+):
+    """
+    Persist a user question and the assistant's answer
+
+    Args:
+        db: Database session
+        session_id: ID of the chat session
+        query: The user's question
+        response: The assistant's answer
+        asked_at: When the question was received (defaults to now)
+    """
+    asked_at, answered_at = turn_timestamps(asked_at)
+    db.add_all([
+        ChatMessageModel(session_id=session_id, role="user", content=query, timestamp=asked_at),
+        ChatMessageModel(session_id=session_id, role="assistant", content=response, timestamp=answered_at),
+    ])
+    await db.commit()
+
+
+def _turn_rows(query: str, response: str, asked_at: Optional[datetime]):
+    """The user/assistant message pair of a turn as an inline VALUES table"""
+    asked_at, answered_at = turn_timestamps(asked_at)
+    return values(
+        column("role", String), column("content", Text), column("timestamp", DateTime(timezone=True)),
+        name="turn"
+    ).data([("user", query, asked_at), ("assistant", response, answered_at)])
+
+
+def _insert_turn(session_ids, turn):
+    """INSERT ... SELECT of both messages for every session ID the selectable yields"""
+    return (
+        insert(ChatMessageModel)
+        .from_select(
+            ["session_id", "role", "content", "timestamp"],
+            select(session_ids.c.id, turn.c.role, turn.c.content, turn.c.timestamp)
+        )
+        .returning(ChatMessageModel.session_id)
+    )
+
+
+async def persist_chat_turn(
+    db: AsyncSession, session_id: Optional[int], query: str, response: str, asked_at: Optional[datetime] = None
+) -> Optional[int]:
+    """
+    Persist a chat turn, creating its session if none was given, in one transaction
+
+    On PostgreSQL the whole turn is a single statement: a new session is
+    created in a data-modifying CTE (INSERT ... RETURNING) feeding the bulk
+    insert of the message pair, and an existing session is checked by
+    selecting the message rows from chat_sessions itself, so an unknown ID
+    simply inserts nothing. Other databases cannot nest the INSERT in a CTE
+    and use two statements in the same transaction.
+
+    Args:
+        db: Database session
+        session_id: ID of an existing chat session, if any
+        query: The user's question
+        response: The assistant's answer
+        asked_at: When the question was received (defaults to now)
+
+    Returns:
+        The session ID, or None if session_id does not exist
+    """
+    turn = _turn_rows(query, response, asked_at)
+    connection = await db.connection()
+
+    if session_id:
+        existing = select(ChatSessionModel.id).where(ChatSessionModel.id == session_id).subquery("existing")
+        statement = _insert_turn(existing, turn)
+    else:
+        new_session = insert(ChatSessionModel).values(
+            title=session_title(query), user_id="anonymous"
+        ).returning(ChatSessionModel.id)
+
+        if connection.dialect.name == "postgresql":
+            created = new_session.cte("new_session")
+            statement = _insert_turn(created, turn).add_cte(created)
+        else:
+            session_id = (await db.execute(new_session)).scalar_one()
+            existing = select(ChatSessionModel.id).where(ChatSessionModel.id == session_id).subquery("existing")
+            statement = _insert_turn(existing, turn)
+
+    result = await db.execute(statement)
+    persisted = result.scalars().first()
+    await db.commit()
+    return persisted
+
+
+def chat_turn_rows(session_id: int, turns: List[Tuple[str, str]], asked_at: datetime) -> List[Tuple[int, str, str, datetime]]:
+    """
+    Message rows for consecutive turns of a session, for insert_chat_messages
+
+    Messages are ordered by timestamp, so the rows are spaced one microsecond
+    apart from asked_at to keep each question before its answer and the
+    turns in the order given.
+
+    Args:
+        session_id: ID of the chat session
+        turns: (question, answer) pairs
+        asked_at: When the questions were received
+
+    Returns:
+        (session ID, role, content, timestamp) of each message
+    """
+    rows = []
+    for i, (query, response) in enumerate(turns):
+        rows.append((session_id, "user", query, asked_at + timedelta(microseconds=2 * i)))
+        rows.append((session_id, "assistant", response, asked_at + timedelta(microseconds=2 * i + 1)))
+    return rows
+
+
+async def insert_chat_messages(db: AsyncSession, rows: List[Tuple[int, str, str, datetime]]) -> int:
+    """
+    Bulk-insert chat messages in one statement, skipping rows whose session does not exist
+
+    Args:
+        db: Database session
+        rows: (session ID, role, content, timestamp) of each message
+
+    Returns:
+        Number of messages inserted
+    """
+    messages = values(
+        column("session_id", Integer), column("role", String), column("content", Text),
+        column("timestamp", DateTime(timezone=True)), name="messages"
+    ).data(rows)
+
+    # Joining against chat_sessions drops messages for unknown sessions instead of
+    # failing the whole batch on the foreign key
+    result = await db.execute(
+        insert(ChatMessageModel)
+        .from_select(
+            ["session_id", "role", "content", "timestamp"],
+            select(messages.c.session_id, messages.c.role, messages.c.content, messages.c.timestamp)
+            .join(ChatSessionModel, ChatSessionModel.id == messages.c.session_id)
+        )
+    )
+    inserted = result.rowcount
+    await db.commit()
+    return inserted
+
+
+async def export_session_ndjson(db: AsyncSession, session_header: str, session_id: int, batch_rows: int) -> AsyncIterator[str]:
+    """
+    Stream a session and its messages as NDJSON
+
+    Messages are read through a server-side cursor batch_rows at a time and
+    each batch is encoded and yielded before the next one is fetched, so
+    memory use does not grow with the length of the history. Plain columns
+    are selected instead of ORM objects to skip identity map bookkeeping.
+
+    Args:
+        db: Database session, kept open for the whole export
+        session_header: JSON object of the session, emitted as the first line
+        session_id: ID of the session whose messages are exported
+        batch_rows: Messages fetched per round trip
+
+    Yields:
+        Chunks of newline-terminated JSON lines, one message per line in conversation order
+    """
+    yield session_header + "\n"
+
+    result = await db.stream(
+        select(
+            ChatMessageModel.id, ChatMessageModel.session_id, ChatMessageModel.role,
+            ChatMessageModel.content, ChatMessageModel.timestamp
+        )
+        .where(ChatMessageModel.session_id == session_id)
+        .order_by(ChatMessageModel.timestamp, ChatMessageModel.id)
+        .execution_options(yield_per=batch_rows)
+    )
+    async for rows in result.partitions():
+        yield "".join(
+            json.dumps({
+                "id": row.id,
+                "session_id": row.session_id,
+                "role": row.role,
+                "content": row.content,
+                "timestamp": row.timestamp.isoformat(),
+            }) + "\n"
+            for row in rows
+        )
+
+
+async def load_recent_queries(db: AsyncSession, session_id: int, limit: int) -> List[str]:
+    """
+    The last user questions of a session, oldest first
+
+    Args:
+        db: Database session
+        session_id: ID of the chat session
+        limit: Maximum number of questions to return
+
+    Returns:
+        Question texts in conversation order (empty for an unknown session)
+    """
+    # Newest first so the (session_id, timestamp, id) index stops after `limit` rows
+    result = await db.execute(
+        select(ChatMessageModel.content)
+        .where(ChatMessageModel.session_id == session_id, ChatMessageModel.role == "user")
+        .order_by(ChatMessageModel.timestamp.desc(), ChatMessageModel.id.desc())
+        .limit(limit)
+    )
+    return list(reversed(result.scalars().all()))
@@ -0,0 +1,55 @@
+import base64
+import json
+from datetime import datetime
+from typing import Any, Callable, List, Optional, Tuple
+
+# Response header carrying the cursor of the next page (absent on the last page)
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+def encode_cursor(timestamp: datetime, row_id: int) -> str:
+    """
+    Opaque keyset cursor pointing just past a row
+
+    Args:
+        timestamp: Sort timestamp of the last row of a page
+        row_id: ID of that row, breaking ties between equal timestamps
+
+    Returns:
+        URL-safe cursor string
+    """
+    payload = json.dumps({"t": timestamp.isoformat(), "id": row_id}, separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    """
+    Decode a cursor made by encode_cursor
+
+    Raises:
+        ValueError: If the cursor is malformed
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+        return datetime.fromisoformat(payload["t"]), int(payload["id"])
+    except (TypeError, KeyError, ValueError, UnicodeError) as e:
+        raise ValueError(f"Invalid cursor: {cursor}") from e
+
+
+def split_page(rows: List[Any], limit: int, sort_key: Callable[[Any], Tuple[datetime, int]]) -> Tuple[List[Any], Optional[str]]:
+    """
+    Trim a keyset query result fetched with LIMIT limit + 1 to one page
+
+    Args:
+        rows: Rows in page order, at most limit + 1
+        limit: Page size
+        sort_key: (timestamp, id) of a row
+
+    Returns:
+        The page and the cursor of the next page (None on the last page)
+    """
+    if len(rows) <= limit:
+        return rows, None
+    page = rows[:limit]
+    return page, encode_cursor(*sort_key(page[-1]))
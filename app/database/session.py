@@ -2,11 +2,20 @@ from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
 from sqlalchemy.orm import sessionmaker
 from sqlalchemy.ext.declarative import declarative_base
 from app.core.config import settings
+from app.database.pool import InstrumentedAsyncPool
 
-# Asynchronous engine for async operations
+# Asynchronous engine for async operations, shared by the whole process
+# (request sessions, the chat history writer and table creation in lifespan)
 engine = create_async_engine(
     settings.database_url,
-    echo=True  # Set to True for SQL query logging
+    echo=settings.DB_ECHO,  # Set to True for SQL query logging
+    poolclass=InstrumentedAsyncPool,
+    pool_size=settings.DB_POOL_SIZE,
+    max_overflow=settings.DB_MAX_OVERFLOW,
+    pool_timeout=settings.DB_POOL_TIMEOUT,
+    pool_recycle=settings.DB_POOL_RECYCLE,
+    pool_pre_ping=settings.DB_POOL_PRE_PING,
+    connect_args={"prepared_statement_cache_size": settings.DB_STATEMENT_CACHE_SIZE}
 )
 
 AsyncSessionLocal = sessionmaker(
@@ -20,4 +29,4 @@ async def get_async_db():
         try:
             yield db
         finally:
-            await db.close()
\ No newline at end of file
+            await db.close()
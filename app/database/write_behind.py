@@ -0,0 +1,181 @@
+import asyncio
+import logging
+import time
+from datetime import datetime, timezone
+from typing import Dict, Any, Optional
+from app.core.config import settings
+from app.database.chat_history import insert_chat_messages
+from app.database.session import AsyncSessionLocal
+
+logger = logging.getLogger(__name__)
+
+
+class ChatHistoryWriter:
+    """
+    Write-behind queue for chat messages
+
+    /chat enqueues each user/assistant message pair and returns; a background
+    task drains the queue and bulk-inserts the messages every flush_interval
+    or as soon as batch_rows messages are waiting. When max_pending turns are
+    queued, enqueue waits for the writer (backpressure) instead of growing
+    without bound.
+
+    Messages carry the time they were produced, so their order does not
+    depend on when they are flushed. Messages for sessions that no longer
+    exist are dropped at flush time and counted.
+    """
+
+    def __init__(
+        self,
+        session_factory=AsyncSessionLocal,
+        flush_interval: float = 0.05,
+        batch_rows: int = 500,
+        max_pending: int = 10000
+    ):
+        self.session_factory = session_factory
+        self.flush_interval = flush_interval
+        self.batch_rows = max(batch_rows, 2)
+        self._queue = None
+        self._max_pending = max_pending
+        self._batch_full = None
+        self._collecting_rows = 0
+        self._task = None
+        self._closed = False
+
+        self.turns_enqueued = 0
+        self.backpressure_waits = 0
+        self.rows_flushed = 0
+        self.rows_dropped = 0
+        self.rows_failed = 0
+        self.flushes = 0
+        self.flush_seconds_total = 0.0
+        self.flush_seconds_max = 0.0
+        self.last_flush_seconds = 0.0
+
+    def start(self):
+        """Start the background flusher (idempotent; needs a running event loop)"""
+        if self._task is None:
+            # Created here so they bind to the serving event loop
+            self._queue = asyncio.Queue(maxsize=self._max_pending)
+            self._batch_full = asyncio.Event()
+            self._task = asyncio.create_task(self._run())
+
+    async def enqueue(self, session_id: int, query: str, response: str, asked_at: Optional[datetime] = None):
+        """
+        Queue a chat turn for persistence
+
+        Args:
+            session_id: ID of the chat session
+            query: The user's question
+            response: The assistant's answer
+            asked_at: When the question was received (defaults to now)
+        """
+        if self._closed:
+            raise RuntimeError("Chat history writer is closed")
+        self.start()
+
+        answered_at = datetime.now(timezone.utc)
+        turn = [
+            (session_id, "user", query, asked_at or answered_at),
+            (session_id, "assistant", response, answered_at),
+        ]
+        if self._queue.full():
+            self.backpressure_waits += 1
+        await self._queue.put(turn)
+        self.turns_enqueued += 1
+        if self._pending_rows() >= self.batch_rows:
+            self._batch_full.set()
+
+    def _pending_rows(self) -> int:
+        """Messages waiting to be flushed, including the batch being collected"""
+        return self._collecting_rows + self._queue.qsize() * 2
+
+    async def close(self):
+        """Flush everything queued so far and stop the background flusher"""
+        if self._closed:
+            return
+        self._closed = True
+        if self._task is None:
+            return
+        # FIFO order: the sentinel is reached once every earlier turn was flushed
+        await self._queue.put(None)
+        self._batch_full.set()
+        await self._task
+        self._task = None
+
+    async def _run(self):
+        while True:
+            first = await self._queue.get()
+            if first is None:
+                return
+            rows = list(first)
+
+            # Give the batch until the flush interval to fill up (enqueue and close
+            # cut the wait short); the condition is re-checked after clearing the
+            # event so a signal sent just before is not lost
+            self._collecting_rows = len(rows)
+            self._batch_full.clear()
+            if not self._closed and self._pending_rows() < self.batch_rows:
+                try:
+                    await asyncio.wait_for(self._batch_full.wait(), self.flush_interval)
+                except asyncio.TimeoutError:
+                    pass
+            self._collecting_rows = 0
+
+            stopping = False
+            while len(rows) < self.batch_rows and not self._queue.empty():
+                turn = self._queue.get_nowait()
+                if turn is None:
+                    stopping = True
+                    break
+                rows.extend(turn)
+
+            await self._flush(rows)
+            if stopping:
+                return
+
+    async def _flush(self, rows):
+        started = time.perf_counter()
+        try:
+            async with self.session_factory() as db:
+                inserted = await insert_chat_messages(db, rows)
+            self.rows_flushed += inserted
+            self.rows_dropped += len(rows) - inserted
+        except Exception:
+            # Keep the writer alive; the batch is lost but counted
+            self.rows_failed += len(rows)
+            logger.exception("Failed to persist %d chat messages", len(rows))
+        elapsed = time.perf_counter() - started
+        self.flushes += 1
+        self.flush_seconds_total += elapsed
+        self.flush_seconds_max = max(self.flush_seconds_max, elapsed)
+        self.last_flush_seconds = elapsed
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "queue_depth": self._queue.qsize() if self._queue is not None else 0,
+            "turns_enqueued": self.turns_enqueued,
+            "backpressure_waits": self.backpressure_waits,
+            "rows_flushed": self.rows_flushed,
+            "rows_dropped": self.rows_dropped,
+            "rows_failed": self.rows_failed,
+            "flushes": self.flushes,
+            "flush_ms_avg": self.flush_seconds_total / self.flushes * 1000 if self.flushes else 0.0,
+            "flush_ms_max": self.flush_seconds_max * 1000,
+            "flush_ms_last": self.last_flush_seconds * 1000,
+        }
+
+
+def create_chat_history_writer() -> Optional[ChatHistoryWriter]:
+    """Build the write-behind writer configured in settings (None when disabled)"""
+    if not settings.CHAT_WRITE_BEHIND_ENABLED:
+        return None
+    return ChatHistoryWriter(
+        flush_interval=settings.CHAT_WRITE_BEHIND_FLUSH_MS / 1000,
+        batch_rows=settings.CHAT_WRITE_BEHIND_BATCH_ROWS,
+        max_pending=settings.CHAT_WRITE_BEHIND_MAX_PENDING
+    )
+
+
+# Global instance
+chat_history_writer = create_chat_history_writer()
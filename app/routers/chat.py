@@ -1,10 +1,25 @@
-from fastapi import APIRouter, HTTPException, Depends
+import asyncio
+import json
+from datetime import datetime, timezone
+from fastapi import APIRouter, HTTPException, Depends, Query, Response
+from fastapi.responses import StreamingResponse
+from sqlalchemy import select, tuple_
 from sqlalchemy.ext.asyncio import AsyncSession
-from typing import List
-
-from app.database.session import get_async_db
-from app.schemas.chat import ChatRequest, ChatResponse, ChatSession, ChatSessionCreate, ChatMessage
-from app.models.chat_session import ChatSession as ChatSessionModel, ChatMessage as ChatMessageModel
+from starlette.background import BackgroundTask
+from typing import List, Dict, Any, Optional
+
+from app.database.session import get_async_db, AsyncSessionLocal
+from app.database.chat_history import (
+    chat_turn_rows, insert_chat_messages, persist_chat_turn, resolve_session, save_chat_turn
+)
+from app.database.write_behind import chat_history_writer
+from app.database.pagination import NEXT_CURSOR_HEADER, decode_cursor, split_page
+from app.schemas.chat import (
+    ChatRequest, ChatResponse, ChatBatchRequest, ChatBatchAnswer, ChatBatchResponse,
+    ChatSession, ChatSessionCreate, ChatMessage
+)
+from app.models.chat_session import ChatSession as ChatSessionModel
+from app.core.config import settings
 from app.core.rag_service import rag_service
 
 router = APIRouter()
@@ -16,95 +31,198 @@ async def chat_endpoint(chat_request: ChatRequest, db: AsyncSession = Depends(ge
     Main chat endpoint that processes user queries using RAG
     """
     try:
+        asked_at = datetime.now(timezone.utc)
+
         # Process the query using the RAG service
-        result = rag_service.process_query(chat_request)
-
-        # If session_id is provided, save the interaction to the database
-        if chat_request.session_id:
-            # Verify session exists
-            result_db = await db.execute(
-                ChatSessionModel.__table__.select().where(
-                    ChatSessionModel.id == chat_request.session_id
-                )
-            )
-            session = result_db.scalar_one_or_none()
-            if not session:
+        result = await rag_service.process_query(chat_request)
+
+        if chat_history_writer is not None:
+            # Write-behind: only the session is resolved inline (a new one's ID is part of
+            # the response, an unknown one is a 404); the messages are bulk-inserted later
+            # by the background writer
+            session_id = await resolve_session(db, chat_request.session_id, chat_request.query)
+            if session_id is None:
                 raise HTTPException(status_code=404, detail="Session not found")
-
-            # Save user message
-            user_message = ChatMessageModel(
-                session_id=chat_request.session_id,
-                role="user",
-                content=chat_request.query
-            )
-            db.add(user_message)
-
-            # Save assistant response
-            assistant_message = ChatMessageModel(
-                session_id=chat_request.session_id,
-                role="assistant",
-                content=result["response"]
-            )
-            db.add(assistant_message)
-
-            await db.commit()
+            await chat_history_writer.enqueue(session_id, chat_request.query, result["response"], asked_at)
         else:
-            # Create a new session if none provided
-            new_session = ChatSessionModel(
-                title=chat_request.query[:50] + "..." if len(chat_request.query) > 50 else chat_request.query,
-                user_id="anonymous"
-            )
-            db.add(new_session)
-            await db.commit()
-            await db.refresh(new_session)
-
-            # Save user message
-            user_message = ChatMessageModel(
-                session_id=new_session.id,
-                role="user",
-                content=chat_request.query
-            )
-            db.add(user_message)
-
-            # Save assistant response
-            assistant_message = ChatMessageModel(
-                session_id=new_session.id,
-                role="assistant",
-                content=result["response"]
+            # Save the turn (creating a session if none was provided) in a single transaction
+            session_id = await persist_chat_turn(
+                db, chat_request.session_id, chat_request.query, result["response"], asked_at
             )
-            db.add(assistant_message)
-
-            await db.commit()
-
-            # Update the result to include the new session ID
-            result["session_id"] = new_session.id
-
-        # Include session_id in the response if not already present
-        if "session_id" not in result:
-            result["session_id"] = chat_request.session_id
+            if session_id is None:
+                raise HTTPException(status_code=404, detail="Session not found")
+        result["session_id"] = session_id
+        rag_service.remember_turn(session_id, result.get("turn"))
 
         return ChatResponse(
             response=result["response"],
             sources=result.get("sources", []),
             session_id=result["session_id"]
         )
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error processing chat request: {str(e)}")
 
 
+@router.post("/chat/batch", response_model=ChatBatchResponse)
+async def chat_batch_endpoint(batch_request: ChatBatchRequest, db: AsyncSession = Depends(get_async_db)):
+    """
+    Answer a list of questions (e.g. end-of-chapter review questions) in one request
+
+    Questions are answered independently in global mode; their retrieval
+    shares one embedding call and one Qdrant round trip. All turns are saved
+    to the session (created if none was provided) in a single statement.
+    """
+    questions = batch_request.questions
+    if not questions:
+        raise HTTPException(status_code=400, detail="At least one question is required")
+    if len(questions) > settings.CHAT_BATCH_MAX_QUESTIONS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"At most {settings.CHAT_BATCH_MAX_QUESTIONS} questions can be asked at once"
+        )
+
+    try:
+        asked_at = datetime.now(timezone.utc)
+        results = await rag_service.answer_batch(questions)
+
+        # Saved inline even in write-behind mode: the whole batch is one INSERT
+        session_id = batch_request.session_id or await resolve_session(db, None, questions[0])
+        rows = chat_turn_rows(
+            session_id, [(query, result["response"]) for query, result in zip(questions, results)], asked_at
+        )
+        if await insert_chat_messages(db, rows) == 0:
+            raise HTTPException(status_code=404, detail="Session not found")
+
+        for result in results:
+            rag_service.remember_turn(session_id, result["turn"])
+
+        return ChatBatchResponse(
+            answers=[
+                ChatBatchAnswer(query=query, response=result["response"], sources=result["sources"])
+                for query, result in zip(questions, results)
+            ],
+            session_id=session_id
+        )
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error processing chat batch request: {str(e)}")
+
+
+def _sse_event(event: str, data: Dict[str, Any]) -> str:
+    """Format one Server-Sent Event"""
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+
+async def _resolve_stream_session(session_id: Optional[int], query: str) -> Optional[int]:
+    async with AsyncSessionLocal() as db:
+        return await resolve_session(db, session_id, query)
+
+
+async def _persist_stream_turn(turn: Dict[str, Any]):
+    """Save a streamed chat turn once the stream has closed"""
+    if turn.get("session_id") is None or turn.get("response") is None:
+        # The stream failed or was abandoned before the answer was complete
+        return
+    async with AsyncSessionLocal() as db:
+        await save_chat_turn(db, turn["session_id"], turn["query"], turn["response"], turn["asked_at"])
+
+
+@router.post("/chat/stream")
+async def chat_stream_endpoint(chat_request: ChatRequest):
+    """
+    Streaming variant of the chat endpoint using Server-Sent Events
+
+    Emits a `sources` event as soon as retrieval finishes, `token` events as
+    the answer is produced and a final `done` event with the session ID. The
+    messages are persisted after the stream closes.
+    """
+    turn = {
+        "query": chat_request.query, "asked_at": datetime.now(timezone.utc), "session_id": None, "response": None
+    }
+
+    # Session lookup/creation runs concurrently with retrieval
+    session_task = asyncio.create_task(
+        _resolve_stream_session(chat_request.session_id, chat_request.query)
+    )
+
+    async def event_stream():
+        tokens = []
+        conversation_turn = None
+        try:
+            async for event in rag_service.stream_query(chat_request):
+                if event["type"] == "sources":
+                    session_id = await session_task
+                    if session_id is None:
+                        yield _sse_event("error", {"detail": "Session not found"})
+                        return
+                    yield _sse_event("sources", {"sources": event["sources"]})
+                elif event["type"] == "turn":
+                    conversation_turn = event["turn"]
+                else:
+                    tokens.append(event["text"])
+                    yield _sse_event("token", {"text": event["text"]})
+
+            turn["session_id"] = await session_task
+            turn["response"] = "".join(tokens)
+            rag_service.remember_turn(turn["session_id"], conversation_turn)
+            yield _sse_event("done", {"session_id": turn["session_id"]})
+        except Exception as e:
+            yield _sse_event("error", {"detail": f"Error processing chat request: {str(e)}"})
+        finally:
+            if not session_task.done():
+                session_task.cancel()
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        background=BackgroundTask(_persist_stream_turn, turn)
+    )
+
+
 @router.get("/sessions", response_model=List[ChatSession])
-async def get_sessions(skip: int = 0, limit: int = 100, db: AsyncSession = Depends(get_async_db)):
+async def get_sessions(
+    response: Response,
+    limit: int = Query(100, ge=1, le=1000),
+    cursor: Optional[str] = None,
+    user_id: Optional[str] = None,
+    skip: int = 0,
+    db: AsyncSession = Depends(get_async_db)
+):
     """
-    Retrieve a list of chat sessions
+    Retrieve a list of chat sessions, newest first
+
+    Results are keyset-paginated: while more sessions remain, the
+    X-Next-Cursor response header holds the `cursor` of the next page.
+    `skip` is still honoured when no cursor is given, but it makes the
+    database walk every skipped row.
     """
     try:
-        result = await db.execute(
-            ChatSessionModel.__table__.select()
-            .offset(skip)
-            .limit(limit)
+        query = (
+            select(ChatSessionModel)
+            .order_by(ChatSessionModel.created_at.desc(), ChatSessionModel.id.desc())
+            .limit(limit + 1)
+        )
+        if user_id is not None:
+            query = query.where(ChatSessionModel.user_id == user_id)
+        if cursor:
+            created_at, session_id = decode_cursor(cursor)
+            query = query.where(tuple_(ChatSessionModel.created_at, ChatSessionModel.id) < (created_at, session_id))
+        elif skip:
+            query = query.offset(skip)
+
+        result = await db.execute(query)
+        sessions, next_cursor = split_page(
+            result.scalars().all(), limit, lambda session: (session.created_at, session.id)
         )
-        sessions = result.scalars().all()
+        if next_cursor:
+            response.headers[NEXT_CURSOR_HEADER] = next_cursor
         return sessions
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error retrieving sessions: {str(e)}")
 
@@ -1,22 +1,53 @@
-from fastapi import APIRouter, HTTPException, Depends
+from fastapi import APIRouter, HTTPException, Depends, Query, Response
+from fastapi.responses import StreamingResponse
+from sqlalchemy import select, tuple_
 from sqlalchemy.ext.asyncio import AsyncSession
-from typing import List
+from typing import List, Optional
 
-from app.database.session import get_async_db
+from app.core.config import settings
+from app.database.session import get_async_db, AsyncSessionLocal
+from app.database.chat_history import export_session_ndjson
+from app.database.pagination import NEXT_CURSOR_HEADER, decode_cursor, split_page
 from app.schemas.chat import ChatSession, ChatSessionCreate, ChatSessionUpdate, ChatSessionWithMessages, ChatMessage
 from app.models.chat_session import ChatSession as ChatSessionModel, ChatMessage as ChatMessageModel
 
 router = APIRouter()
 
 
+def _session_messages_query(session_id: int, limit: int, cursor: Optional[str]):
+    """Keyset page of a session's messages in conversation order (served by ix_chat_messages_session_id_timestamp)"""
+    query = (
+        select(ChatMessageModel)
+        .where(ChatMessageModel.session_id == session_id)
+        .order_by(ChatMessageModel.timestamp, ChatMessageModel.id)
+        .limit(limit + 1)
+    )
+    if cursor:
+        timestamp, message_id = decode_cursor(cursor)
+        query = query.where(tuple_(ChatMessageModel.timestamp, ChatMessageModel.id) > (timestamp, message_id))
+    return query
+
+
+def _message_sort_key(message):
+    return message.timestamp, message.id
+
+
 @router.get("/sessions/{session_id}", response_model=ChatSessionWithMessages)
-async def get_session(session_id: int, db: AsyncSession = Depends(get_async_db)):
+async def get_session(
+    session_id: int,
+    response: Response,
+    messages_limit: int = Query(100, ge=1, le=1000),
+    db: AsyncSession = Depends(get_async_db)
+):
     """
-    Retrieve a specific chat session with its messages
+    Retrieve a specific chat session with its first page of messages
+
+    If the session has more messages, the X-Next-Cursor header holds the
+    cursor for /sessions/{session_id}/messages.
     """
     try:
         result = await db.execute(
-            ChatSessionModel.__table__.select().where(
+            select(ChatSessionModel).where(
                 ChatSessionModel.id == session_id
             )
         )
@@ -24,18 +55,18 @@ async def get_session(session_id: int, db: AsyncSession = Depends(get_async_db))
         if not session:
             raise HTTPException(status_code=404, detail="Session not found")
 
-        messages_result = await db.execute(
-            ChatMessageModel.__table__.select().where(
-                ChatMessageModel.session_id == session_id
-            ).order_by(ChatMessageModel.timestamp)
-        )
-        messages = messages_result.scalars().all()
+        messages_result = await db.execute(_session_messages_query(session_id, messages_limit, None))
+        messages, next_cursor = split_page(messages_result.scalars().all(), messages_limit, _message_sort_key)
+        if next_cursor:
+            response.headers[NEXT_CURSOR_HEADER] = next_cursor
 
         # Convert to Pydantic model
         session_data = ChatSessionWithMessages.from_orm(session)
         session_data.messages = messages
 
         return session_data
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error retrieving session: {str(e)}")
 
@@ -97,18 +128,64 @@ async def delete_session(session_id: int, db: AsyncSession = Depends(get_async_d
 
 
 @router.get("/sessions/{session_id}/messages", response_model=List[ChatMessage])
-async def get_session_messages(session_id: int, db: AsyncSession = Depends(get_async_db)):
+async def get_session_messages(
+    session_id: int,
+    response: Response,
+    limit: int = Query(100, ge=1, le=1000),
+    cursor: Optional[str] = None,
+    db: AsyncSession = Depends(get_async_db)
+):
     """
-    Retrieve all messages for a specific session
+    Retrieve the messages of a specific session in conversation order
+
+    Results are keyset-paginated: while more messages remain, the
+    X-Next-Cursor response header holds the `cursor` of the next page.
     """
     try:
-        messages_result = await db.execute(
-            ChatMessageModel.__table__.select().where(
-                ChatMessageModel.session_id == session_id
-            ).order_by(ChatMessageModel.timestamp)
-        )
-        messages = messages_result.scalars().all()
+        messages_result = await db.execute(_session_messages_query(session_id, limit, cursor))
+        messages, next_cursor = split_page(messages_result.scalars().all(), limit, _message_sort_key)
+        if next_cursor:
+            response.headers[NEXT_CURSOR_HEADER] = next_cursor
 
         return messages
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Error retrieving session messages: {str(e)}")
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=f"Error retrieving session messages: {str(e)}")
+
+
+async def _stream_session_export(session_header: str, session_id: int):
+    # The request's database session may be closed before the body is sent,
+    # so the stream holds its own connection until the last message is out
+    async with AsyncSessionLocal() as db:
+        async for chunk in export_session_ndjson(db, session_header, session_id, settings.SESSION_EXPORT_BATCH_ROWS):
+            yield chunk
+
+
+@router.get("/sessions/{session_id}/export")
+async def export_session(session_id: int, db: AsyncSession = Depends(get_async_db)):
+    """
+    Export a session and its full message history as NDJSON
+
+    The first line is the session, every following line one message in
+    conversation order. Messages are streamed from a server-side cursor,
+    so memory use stays flat however long the history is.
+    """
+    try:
+        result = await db.execute(
+            select(ChatSessionModel).where(ChatSessionModel.id == session_id)
+        )
+        session = result.scalar_one_or_none()
+        if not session:
+            raise HTTPException(status_code=404, detail="Session not found")
+        session_header = ChatSession.model_validate(session).model_dump_json()
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error exporting session: {str(e)}")
+
+    return StreamingResponse(
+        _stream_session_export(session_header, session_id),
+        media_type="application/x-ndjson",
+        headers={"Content-Disposition": f'attachment; filename="session-{session_id}.ndjson"'}
+    )
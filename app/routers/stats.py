@@ -0,0 +1,34 @@
+from fastapi import APIRouter
+
+from app.core.rag_service import rag_service
+from app.database.session import engine
+from app.database.write_behind import chat_history_writer
+from app.utils.local_index import LocalVectorIndex
+from app.utils.vector_store import vector_store_manager
+
+router = APIRouter()
+
+
+@router.get("/stats")
+async def get_stats():
+    """
+    Cache, pipeline, persistence and connection pool counters for tuning
+    """
+    embedding_cache = vector_store_manager.query_cache
+    embedding_batcher = vector_store_manager.query_batcher
+    semantic_cache = rag_service.semantic_cache
+    conversation_memory = rag_service.conversation_memory
+    single_flight = rag_service.single_flight
+    reranker = rag_service.reranker
+    vector_client = vector_store_manager.client
+    return {
+        "embedding_cache": embedding_cache.stats() if embedding_cache is not None else None,
+        "embedding_batcher": embedding_batcher.stats() if embedding_batcher is not None else None,
+        "semantic_cache": semantic_cache.stats() if semantic_cache is not None else None,
+        "request_coalescing": single_flight.stats() if single_flight is not None else None,
+        "conversation_memory": conversation_memory.stats() if conversation_memory is not None else None,
+        "reranker": reranker.stats() if reranker is not None else None,
+        "vector_index": vector_client.stats() if isinstance(vector_client, LocalVectorIndex) else None,
+        "chat_history_writer": chat_history_writer.stats() if chat_history_writer is not None else None,
+        "database_pool": engine.pool.stats(),
+    }
@@ -1,5 +1,5 @@
 from pydantic import BaseModel
-from typing import List, Optional
+from typing import List, Dict, Any, Optional
 from datetime import datetime
 
 
@@ -22,7 +22,7 @@ class ChatSessionUpdate(BaseModel):
 class ChatSession(ChatSessionBase):
     id: int
     created_at: datetime
-    updated_at: datetime
+    updated_at: Optional[datetime] = None  # Only set once the session has been modified
 
     class Config:
         from_attributes = True
@@ -61,5 +61,21 @@ class ChatRequest(BaseModel):
 
 class ChatResponse(BaseModel):
     response: str
-    sources: List[str] = []
-    session_id: int
\ No newline at end of file
+    sources: List[Dict[str, Any]] = []
+    session_id: int
+
+
+class ChatBatchRequest(BaseModel):
+    session_id: Optional[int] = None
+    questions: List[str]  # Answered independently, in global mode
+
+
+class ChatBatchAnswer(BaseModel):
+    query: str
+    response: str
+    sources: List[Dict[str, Any]] = []
+
+
+class ChatBatchResponse(BaseModel):
+    answers: List[ChatBatchAnswer]
+    session_id: int
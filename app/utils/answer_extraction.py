@@ -0,0 +1,235 @@
+import math
+import re
+from bisect import bisect_right
+from typing import List, Dict, Any, Callable, Optional, Tuple
+from app.utils.text_processing import TERM_PATTERN, STOPWORDS
+
+# A sentence starts at a non-space character and runs up to and including its
+# terminal punctuation (or the end of the text), without surrounding whitespace
+SENTENCE_PATTERN = re.compile(r"[^.!?\s](?:[^.!?]*[^.!?\s])?[.!?]*")
+
+NON_SPACE_PATTERN = re.compile(r"\S")
+
+# Metadata written at ingest time for the extractor; not meant for API clients
+SENTENCE_METADATA_KEYS = ("sentence_starts", "sentence_ends")
+
+YES_NO_STARTERS = frozenset(
+    "is are was were can could will would do does did have has had".split()
+)
+AFFIRMATIVE_TERMS = ("yes", "true", "correct", "indeed", "certainly", "definitely", "exactly")
+NEGATIVE_TERMS = ("no", "false", "incorrect", "not", "never", "none")
+
+MIN_TERM_LENGTH = 3  # Shorter query terms carry too little signal to match on
+MAX_ANSWER_SENTENCES = 2
+
+
+def index_sentences(text: str) -> Dict[str, List[int]]:
+    """
+    Pre-split a chunk into sentences for the extractive answer engine (runs at ingest)
+
+    Args:
+        text: Chunk text
+
+    Returns:
+        Metadata with the start and end offset of each sentence
+    """
+    starts = []
+    ends = []
+    for match in SENTENCE_PATTERN.finditer(text):
+        starts.append(match.start())
+        ends.append(match.end())
+    return {"sentence_starts": starts, "sentence_ends": ends}
+
+
+def _fold_terminators(text: str) -> str:
+    """The text with every sentence terminator replaced by "." (str.replace beats str.translate here)"""
+    return text.replace("!", ".").replace("?", ".")
+
+
+def count_sentences(text: str) -> int:
+    """
+    Number of sentences index_sentences finds in a text
+
+    Every run of text between terminators that is not blank holds exactly
+    one sentence; counting those with str methods is several times faster
+    than running SENTENCE_PATTERN over the text.
+    """
+    return sum(1 for segment in _fold_terminators(text).split(".") if segment and not segment.isspace())
+
+
+def public_metadata(metadata: Dict[str, Any]) -> Dict[str, Any]:
+    """Chunk metadata without the extractor's internal keys, for returning as a source"""
+    return {key: value for key, value in metadata.items() if key not in SENTENCE_METADATA_KEYS}
+
+
+def _is_word_char(char: str) -> bool:
+    return char.isalnum() or char == "_"
+
+
+def find_word(lowered: str, term: str, start: int = 0) -> int:
+    """
+    Position of the next whole-word occurrence of a lowercase term, or -1
+
+    str.find runs in C and is several times faster than an alternation regex
+    over the same text, so candidates are located with it and only the two
+    neighbouring characters are checked in Python.
+    """
+    position = lowered.find(term, start)
+    while position != -1:
+        end = position + len(term)
+        if (position == 0 or not _is_word_char(lowered[position - 1])) and \
+                (end == len(lowered) or not _is_word_char(lowered[end])):
+            return position
+        position = lowered.find(term, position + 1)
+    return -1
+
+
+class QueryMatcher:
+    """
+    A query compiled once per request: its distinct content terms and whether
+    it asks a yes/no question
+    """
+
+    def __init__(self, query: str):
+        words = TERM_PATTERN.findall(query.lower())
+        self.is_yes_no = bool(words) and words[0] in YES_NO_STARTERS
+        self.terms = list(dict.fromkeys(
+            word for word in words if len(word) >= MIN_TERM_LENGTH and word not in STOPWORDS
+        ))
+
+    def sentence_hits(self, text: str, starts: List[int], ends: List[int]) -> Dict[int, set]:
+        """
+        Query terms found in each sentence of a text
+
+        Each term is located with a substring scan of the whole text and
+        every hit is mapped to its sentence by binary search over the
+        sentence starts, instead of scanning every sentence for every term.
+
+        Returns:
+            Sentence index -> set of query terms it contains (matching sentences only)
+        """
+        hits = {}
+        if not self.terms or not starts:
+            return hits
+        lowered = text.lower()
+        for term in self.terms:
+            position = find_word(lowered, term)
+            while position != -1:
+                index = bisect_right(starts, position) - 1
+                if index >= 0 and position < ends[index]:
+                    hits.setdefault(index, set()).add(term)
+                position = find_word(lowered, term, position + len(term))
+        return hits
+
+    def raw_sentence_hits(self, text: str) -> Dict[Tuple[int, int], set]:
+        """
+        Query terms found in each sentence of a text without sentence metadata
+
+        Terms are located first, and only the sentences around their hits are
+        delimited, so text that does not match costs no sentence splitting.
+
+        Returns:
+            (sentence start, sentence end) -> set of query terms it contains (matching sentences only)
+        """
+        hits = {}
+        if not self.terms:
+            return hits
+        # Terminators are not word characters, so folding them keeps whole-word matches
+        lowered = _fold_terminators(text.lower())
+        sentences = {}  # offset of the terminator before a hit -> the hit's sentence
+        for term in self.terms:
+            position = find_word(lowered, term)
+            while position != -1:
+                previous = lowered.rfind(".", 0, position)
+                sentence = sentences.get(previous)
+                if sentence is None:
+                    # A sentence starts at the first non-space character after a terminator
+                    start = NON_SPACE_PATTERN.search(text, previous + 1).start()
+                    sentence = sentences[previous] = (start, SENTENCE_PATTERN.match(text, start).end())
+                hits.setdefault(sentence, set()).add(term)
+                position = find_word(lowered, term, position + len(term))
+        return hits
+
+
+def _context(passages: List[Tuple[str, Optional[Dict[str, Any]]]]) -> str:
+    return "\n\n".join(text for text, _ in passages)
+
+
+def _preview(context: str, length: int) -> str:
+    return f"{context[:length]}{'...' if len(context) > length else ''}"
+
+
+def extract_answer(
+    query: str,
+    passages: List[Tuple[str, Optional[Dict[str, Any]]]],
+    idf: Optional[Callable[[str], float]] = None
+) -> str:
+    """
+    Answer a query from context passages without a language model
+
+    Yes/no questions are answered from affirmative and negative words in the
+    context; other questions get the sentences that best match the query,
+    scored by the summed IDF of the query terms they contain.
+
+    Args:
+        query: User's question
+        passages: (text, chunk metadata or None) pairs making up the context
+        idf: Corpus IDF function (optional, defaults to IDF across the context sentences)
+
+    Returns:
+        Extracted answer text
+    """
+    matcher = QueryMatcher(query)
+
+    if matcher.is_yes_no:
+        context = _context(passages)
+        lowered = context.lower()
+        if any(find_word(lowered, term) != -1 for term in AFFIRMATIVE_TERMS):
+            return f"Based on the provided content, the answer appears to be yes. {_preview(context, 200)}"
+        if any(find_word(lowered, term) != -1 for term in NEGATIVE_TERMS):
+            return f"Based on the provided content, the answer appears to be no. {_preview(context, 200)}"
+        return f"Based on the provided content: {_preview(context, 300)}"
+
+    # (passage, sentence start, sentence end) -> matched terms, for sentences matching any query term
+    matches = {}
+    sentence_count = 0
+    for position, (text, metadata) in enumerate(passages):
+        if not metadata or "sentence_starts" not in metadata:
+            # Selected text and chunks ingested before sentence indexing carry no
+            # sentence offsets; only the sentences that match are delimited
+            if idf is None:
+                sentence_count += count_sentences(text)
+            for (start, end), terms in matcher.raw_sentence_hits(text).items():
+                matches[(position, start, end)] = terms
+            continue
+        starts = metadata["sentence_starts"]
+        ends = metadata["sentence_ends"]
+        sentence_count += len(starts)
+        for index, terms in matcher.sentence_hits(text, starts, ends).items():
+            matches[(position, starts[index], ends[index])] = terms
+
+    if not matches:
+        return f"Based on the provided content: {_preview(_context(passages), 300)}"
+
+    if idf is None:
+        # IDF of each term across the context sentences themselves
+        frequencies = {}
+        for terms in matches.values():
+            for term in terms:
+                frequencies[term] = frequencies.get(term, 0) + 1
+        weights = {term: math.log(1 + sentence_count / frequency) for term, frequency in frequencies.items()}
+    else:
+        weights = {term: idf(term) for term in matcher.terms}
+
+    # Best sentences first; ties go to the earlier sentence. Few sentences
+    # match, and sorting them in C beats heapq.nsmallest's Python-level loop
+    best = sorted(
+        matches.items(),
+        key=lambda item: (-sum(weights[term] for term in item[1]), item[0])
+    )[:MAX_ANSWER_SENTENCES]
+    response = "According to the book: " + " ".join(
+        passages[position][0][start:end] for (position, start, end), _ in best
+    )
+    if len(matches) > MAX_ANSWER_SENTENCES:
+        response += "..."
+    return response
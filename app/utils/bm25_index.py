@@ -0,0 +1,171 @@
+import heapq
+import math
+import os
+import pickle
+from collections import Counter
+from typing import List, Dict, Any, Tuple
+from langchain_core.documents import Document
+from app.utils.text_processing import tokenize_terms
+
+
+class BM25Index:
+    """
+    In-memory inverted index scored with Okapi BM25
+
+    Postings map each term to {chunk ID: term frequency}. Chunks use the same
+    IDs as their Qdrant points, so the index can be kept in step with the
+    vector store and persisted next to it.
+    """
+
+    def __init__(self, k1: float = 1.5, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self.documents = {}  # chunk ID -> {"text", "metadata", "length"}
+        self.postings = {}  # term -> {chunk ID: term frequency}
+        self.total_length = 0
+
+    def __len__(self) -> int:
+        return len(self.documents)
+
+    def add(self, doc_id: str, text: str, metadata: Dict[str, Any]):
+        """Index a chunk, replacing any previous version with the same ID"""
+        if doc_id in self.documents:
+            self.remove(doc_id)
+
+        terms = Counter(tokenize_terms(text))
+        length = sum(terms.values())
+        self.documents[doc_id] = {"text": text, "metadata": metadata, "length": length}
+        self.total_length += length
+        for term, frequency in terms.items():
+            self.postings.setdefault(term, {})[doc_id] = frequency
+
+    def remove(self, doc_id: str):
+        """Drop a chunk from the index"""
+        document = self.documents.pop(doc_id, None)
+        if document is None:
+            return
+
+        self.total_length -= document["length"]
+        for term in set(tokenize_terms(document["text"])):
+            postings = self.postings.get(term)
+            if postings is not None:
+                postings.pop(doc_id, None)
+                if not postings:
+                    del self.postings[term]
+
+    def update_metadata(self, doc_id: str, metadata: Dict[str, Any]):
+        if doc_id in self.documents:
+            self.documents[doc_id]["metadata"] = metadata
+
+    def clear(self):
+        self.documents.clear()
+        self.postings.clear()
+        self.total_length = 0
+
+    def idf(self, term: str) -> float:
+        """Inverse document frequency (BM25 variant, always positive)"""
+        frequency = len(self.postings.get(term, ()))
+        return math.log(1 + (len(self.documents) - frequency + 0.5) / (frequency + 0.5))
+
+    def query_terms(self, query: str) -> List[str]:
+        """Distinct index terms of a query, in order"""
+        return list(dict.fromkeys(tokenize_terms(query)))
+
+    def search(self, query: str, k: int = 4) -> List[Tuple[Document, float, float]]:
+        """
+        Rank chunks for a query
+
+        Args:
+            query: Query text
+            k: Number of results to return
+
+        Returns:
+            List of (Document, BM25 score, fraction of query terms matched), best first
+        """
+        terms = self.query_terms(query)
+        if not terms or not self.documents:
+            return []
+
+        average_length = self.total_length / len(self.documents) or 1.0
+        scores = {}
+        matched = Counter()
+
+        # Term-at-a-time accumulation over the postings of the query terms only
+        for term in terms:
+            postings = self.postings.get(term)
+            if not postings:
+                continue
+            idf = self.idf(term)
+            for doc_id, frequency in postings.items():
+                length = self.documents[doc_id]["length"]
+                norm = self.k1 * (1 - self.b + self.b * length / average_length)
+                scores[doc_id] = scores.get(doc_id, 0.0) + idf * frequency * (self.k1 + 1) / (frequency + norm)
+                matched[doc_id] += 1
+
+        best = heapq.nlargest(k, scores.items(), key=lambda item: item[1])
+        return [
+            (
+                Document(
+                    page_content=self.documents[doc_id]["text"],
+                    metadata=self.documents[doc_id]["metadata"]
+                ),
+                score,
+                matched[doc_id] / len(terms)
+            )
+            for doc_id, score in best
+        ]
+
+    def save(self, path: str):
+        """Persist the index atomically"""
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'wb') as file:
+            pickle.dump(
+                {"k1": self.k1, "b": self.b, "documents": self.documents, "postings": self.postings,
+                 "total_length": self.total_length},
+                file,
+                protocol=pickle.HIGHEST_PROTOCOL
+            )
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: str) -> "BM25Index":
+        """Load an index written by save"""
+        with open(path, 'rb') as file:
+            state = pickle.load(file)
+        index = cls(k1=state["k1"], b=state["b"])
+        index.documents = state["documents"]
+        index.postings = state["postings"]
+        index.total_length = state["total_length"]
+        return index
+
+
+def reciprocal_rank_fusion(
+    result_lists: List[List[Document]],
+    k: int,
+    rrf_k: int = 60
+) -> List[Tuple[Document, float]]:
+    """
+    Fuse ranked result lists with reciprocal rank fusion
+
+    Each document scores sum(1 / (rrf_k + rank)) over the lists it appears in;
+    documents are identified by their text.
+
+    Args:
+        result_lists: Ranked lists of Documents, best first
+        k: Number of fused results to return
+        rrf_k: Rank offset damping the weight of top ranks
+
+    Returns:
+        List of (Document, fused score), best first
+    """
+    fused = {}
+    for results in result_lists:
+        for rank, doc in enumerate(results, start=1):
+            entry = fused.setdefault(doc.page_content, [doc, 0.0])
+            entry[1] += 1.0 / (rrf_k + rank)
+
+    ranked = sorted(fused.values(), key=lambda entry: entry[1], reverse=True)
+    return [(doc, score) for doc, score in ranked[:k]]
@@ -0,0 +1,53 @@
+from typing import List, Tuple
+from langchain_core.documents import Document
+
+# "\n\n" between chunks is a single token in the OpenAI encodings
+SEPARATOR_TOKENS = 1
+
+
+def chunk_token_count(doc: Document) -> int:
+    """
+    Token count of a retrieved chunk, as recorded at ingest time
+
+    Chunks ingested before token counts were stored fall back to a ~4
+    characters per token estimate rather than tokenizing on the request path.
+    """
+    token_count = doc.metadata.get("token_count")
+    if token_count is None:
+        return max(1, len(doc.page_content) // 4)
+    return token_count
+
+
+def pack_context(scored_docs: List[Tuple[Document, float]], max_tokens: int) -> List[Document]:
+    """
+    Greedily pack the highest-scoring distinct chunks into a token budget
+
+    Chunks are taken best score first; a chunk that does not fit is skipped so
+    smaller lower-ranked chunks can still use the remaining budget. Whole
+    chunks are kept, never cut mid-sentence.
+
+    Args:
+        scored_docs: (Document, score) pairs from retrieval
+        max_tokens: Token budget for the joined context
+
+    Returns:
+        The selected Documents, best score first
+    """
+    packed = []
+    seen = set()
+    used = 0
+
+    for doc, _ in sorted(scored_docs, key=lambda pair: pair[1], reverse=True):
+        key = doc.page_content.strip()
+        if not key or key in seen:
+            continue
+
+        cost = chunk_token_count(doc) + (SEPARATOR_TOKENS if packed else 0)
+        if used + cost > max_tokens:
+            continue
+
+        seen.add(key)
+        packed.append(doc)
+        used += cost
+
+    return packed
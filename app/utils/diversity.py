@@ -0,0 +1,216 @@
+from functools import lru_cache
+from itertools import chain
+from typing import List, Optional, Tuple
+import numpy as np
+from langchain_core.documents import Document
+from app.utils.text_processing import TERM_PATTERN
+
+# Metadata key under which searches made with_vectors attach each chunk's
+# embedding; removed again by select_diverse before chunks are used
+VECTOR_METADATA_KEY = "vector"
+
+# MinHash permutations of the 32-bit shingle hashes are x = a * h + b with
+# odd a followed by x ^ (x >> 16), both bijections in uint32 arithmetic
+# (several times faster than a modulus in uint64)
+MINHASH_PERMUTATIONS = 64
+SHINGLE_WORDS = 3
+SHINGLE_MULTIPLIER = 1000003
+
+
+@lru_cache(maxsize=None)
+def _permutations(permutations: int, seed: int) -> Tuple[np.ndarray, np.ndarray]:
+    rng = np.random.default_rng(seed)
+    a = rng.integers(0, 2 ** 32, size=(permutations, 1), dtype=np.uint32) | np.uint32(1)
+    b = rng.integers(0, 2 ** 32, size=(permutations, 1), dtype=np.uint32)
+    return a, b
+
+
+def minhash_signatures(
+    texts: List[str],
+    permutations: int = MINHASH_PERMUTATIONS,
+    shingle_size: int = SHINGLE_WORDS,
+    seed: int = 0
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    MinHash signatures of the word shingles of texts
+
+    The share of positions where two signatures agree estimates the
+    Jaccard similarity of the two texts' shingle sets. Shingle hashes are
+    polynomials of word hashes, and the shingles of all texts are
+    deduplicated and min-hashed as one array. Words are hashed with
+    Python's hash, which is salted per process: signatures can be compared
+    within a process, not stored.
+
+    Args:
+        texts: Texts to sign
+        permutations: Signature length
+        shingle_size: Words per shingle
+        seed: Seed of the hash permutations
+
+    Returns:
+        (texts, permutations) uint32 signatures and the number of distinct shingles of each text
+    """
+    # A text shorter than a shingle is padded to form one shingle
+    word_lists = [TERM_PATTERN.findall(text.lower()) for text in texts]
+    word_lists = [words + [""] * (shingle_size - len(words)) for words in word_lists]
+    lengths = np.array([len(words) for words in word_lists], dtype=np.int64)
+    word_hashes = np.fromiter(
+        map(hash, chain.from_iterable(word_lists)), dtype=np.int64, count=int(lengths.sum())
+    ).view(np.uint64)
+
+    # uint64 arithmetic wraps around, which keeps the low 32 bits exact
+    windows = len(word_hashes) - shingle_size + 1
+    shingles = np.zeros(windows, dtype=np.uint64)
+    for offset in range(shingle_size):
+        shingles = shingles * np.uint64(SHINGLE_MULTIPLIER) + word_hashes[offset:offset + windows]
+    shingles &= np.uint64(2 ** 32 - 1)
+
+    # Keep the windows that lie within one text, keyed by (text, shingle hash)
+    counts = lengths - shingle_size + 1
+    text_of = np.repeat(np.arange(len(texts), dtype=np.uint64), counts)
+    positions = np.repeat(np.cumsum(lengths) - lengths, counts) + (
+        np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+    )
+    keys = np.unique((text_of << np.uint64(32)) | shingles[positions])
+    sizes = np.bincount((keys >> np.uint64(32)).astype(np.int64), minlength=len(texts))
+
+    a, b = _permutations(permutations, seed)
+    permuted = a * (keys & np.uint64(2 ** 32 - 1)).astype(np.uint32)[None, :] + b
+    permuted ^= permuted >> np.uint32(16)
+    signatures = np.minimum.reduceat(permuted, np.cumsum(sizes) - sizes, axis=1).T
+    return signatures, sizes
+
+
+def drop_near_duplicates(
+    scored_docs: List[Tuple[Document, float]],
+    threshold: float = 0.8
+) -> List[Tuple[Document, float]]:
+    """
+    Drop chunks that mostly repeat a better-scoring chunk
+
+    Two chunks are near-duplicates when the estimated share of the smaller
+    one's shingles that also occur in the other reaches the threshold, so a
+    passage repeated inside a longer chunk counts as well as a reprinted
+    one. Chunks are kept best score first.
+
+    Args:
+        scored_docs: (Document, score) pairs
+        threshold: Estimated containment at or above which a chunk is dropped
+
+    Returns:
+        The kept pairs, best score first
+    """
+    ranked = sorted(scored_docs, key=lambda pair: pair[1], reverse=True)
+    if len(ranked) < 2:
+        return ranked
+
+    signatures, sizes = minhash_signatures([doc.page_content for doc, _ in ranked])
+    jaccard = (signatures[:, None, :] == signatures[None, :, :]).mean(axis=2)
+    # |A & B| = J * (|A| + |B|) / (1 + J), relative to the smaller set
+    total = sizes[:, None] + sizes[None, :]
+    smaller = np.maximum(np.minimum(sizes[:, None], sizes[None, :]), 1)
+    containment = jaccard * total / ((1 + jaccard) * smaller)
+
+    kept = []
+    for row in range(len(ranked)):
+        if not kept or containment[row, kept].max() < threshold:
+            kept.append(row)
+    return [ranked[row] for row in kept]
+
+
+def mmr_select(
+    scored_docs: List[Tuple[Document, float]],
+    vectors: List[Optional[List[float]]],
+    k: int,
+    lambda_mult: float = 0.7
+) -> List[Tuple[Document, float]]:
+    """
+    Pick k chunks by Maximal Marginal Relevance
+
+    Each step takes the chunk maximizing
+    lambda_mult * relevance - (1 - lambda_mult) * (highest cosine similarity
+    to a chunk already taken). Relevance is the retrieval (or reranker)
+    score scaled to [0, 1], so fused and reranked results work alike. The
+    similarity matrix is computed once; a step is a vector update. Chunks
+    without a vector (e.g. found by the lexical index only) count as
+    dissimilar to every other chunk.
+
+    Args:
+        scored_docs: (Document, score) pairs
+        vectors: Embedding of each chunk, or None
+        k: Number of chunks to pick
+        lambda_mult: 1 ranks by relevance only, 0 by diversity only
+
+    Returns:
+        The picked (Document, score) pairs, in the order they were picked
+    """
+    if len(scored_docs) <= 1 or k <= 0:
+        return list(scored_docs[:k])
+
+    scores = np.array([score for _, score in scored_docs], dtype=np.float32)
+    spread = scores.max() - scores.min()
+    relevance = (scores - scores.min()) / spread if spread > 0 else np.ones_like(scores)
+
+    dimension = next((len(vector) for vector in vectors if vector is not None), 0)
+    matrix = np.zeros((len(scored_docs), dimension), dtype=np.float32)
+    for row, vector in enumerate(vectors):
+        if vector is not None:
+            matrix[row] = vector
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    matrix /= np.where(norms > 0, norms, 1.0)
+    similarity = matrix @ matrix.T
+
+    redundancy = np.zeros(len(scored_docs), dtype=np.float32)
+    available = np.ones(len(scored_docs), dtype=bool)
+    picked = []
+    for _ in range(min(k, len(scored_docs))):
+        marginal = np.where(available, lambda_mult * relevance - (1 - lambda_mult) * redundancy, -np.inf)
+        best = int(marginal.argmax())
+        picked.append(best)
+        available[best] = False
+        redundancy = np.maximum(redundancy, similarity[best])
+    return [scored_docs[row] for row in picked]
+
+
+def select_diverse(
+    scored_docs: List[Tuple[Document, float]],
+    k: int,
+    duplicate_threshold: Optional[float] = 0.8,
+    lambda_mult: Optional[float] = None
+) -> List[Tuple[Document, float]]:
+    """
+    Choose k chunks that each add new information
+
+    Near-duplicates are dropped first, then, with lambda_mult set, MMR
+    picks k of the remaining chunks using the vectors attached under
+    VECTOR_METADATA_KEY. Attached vectors are removed from the returned
+    Documents. Scores are rewritten to decrease in selection order, so
+    that packing the context (best score first) keeps the MMR order.
+
+    Args:
+        scored_docs: (Document, score) pairs, possibly with attached vectors
+        k: Number of chunks to return
+        duplicate_threshold: Containment for dropping near-duplicates (None keeps them)
+        lambda_mult: MMR trade-off (None keeps the k best after deduplication)
+
+    Returns:
+        Up to k (Document, score) pairs, best first
+    """
+    vectors = {}
+    stripped = []
+    for doc, score in scored_docs:
+        if VECTOR_METADATA_KEY in doc.metadata:
+            metadata = dict(doc.metadata)
+            vectors[doc.page_content] = metadata.pop(VECTOR_METADATA_KEY)
+            doc = Document(page_content=doc.page_content, metadata=metadata)
+        stripped.append((doc, score))
+
+    if duplicate_threshold is not None:
+        stripped = drop_near_duplicates(stripped, duplicate_threshold)
+    else:
+        stripped = sorted(stripped, key=lambda pair: pair[1], reverse=True)
+    if lambda_mult is None:
+        return stripped[:k]
+
+    picked = mmr_select(stripped, [vectors.get(doc.page_content) for doc, _ in stripped], k, lambda_mult)
+    return [(doc, float(len(picked) - rank)) for rank, (doc, _) in enumerate(picked)]
@@ -0,0 +1,112 @@
+import asyncio
+from typing import List, Dict, Any, Awaitable, Callable, Optional
+from app.core.config import settings
+
+
+class EmbeddingMicroBatcher:
+    """
+    Merges query embeddings requested by concurrent requests into one API call
+
+    The first query to arrive opens a batch; the batch is sent as a single
+    embed_documents call once max_wait has passed or max_batch queries have
+    joined, whichever comes first, and each waiting request receives its own
+    vector. Identical queries in a batch are embedded once.
+    """
+
+    def __init__(
+        self,
+        embed_batch: Callable[[List[str]], Awaitable[List[List[float]]]],
+        max_wait: float = 0.005,
+        max_batch: int = 64
+    ):
+        self.embed_batch = embed_batch
+        self.max_wait = max_wait
+        self.max_batch = max(max_batch, 1)
+        self._pending = []  # (text, future) of the batch being collected
+        self._timer = None
+        self._in_flight = set()  # Tasks of batches sent but not answered yet
+
+        self.requests = 0
+        self.batches = 0
+        self.texts_embedded = 0
+        self.max_batch_seen = 0
+        self.failures = 0
+
+    async def embed(self, text: str) -> List[float]:
+        """
+        Embed one query as part of the next batch
+
+        Args:
+            text: Query text
+
+        Returns:
+            Embedding vector for the query
+        """
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((text, future))
+        self.requests += 1
+
+        if len(self._pending) >= self.max_batch:
+            self._send()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.max_wait, self._send)
+        return await future
+
+    def _send(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        # Requests cancelled while waiting (client disconnected) are left out
+        batch = [(text, future) for text, future in self._pending if not future.done()]
+        self._pending = []
+        if not batch:
+            return
+        task = asyncio.ensure_future(self._run(batch))
+        self._in_flight.add(task)
+        task.add_done_callback(self._in_flight.discard)
+
+    async def _run(self, batch):
+        texts = list(dict.fromkeys(text for text, _ in batch))
+        self.batches += 1
+        self.texts_embedded += len(texts)
+        self.max_batch_seen = max(self.max_batch_seen, len(texts))
+        try:
+            vectors = await self.embed_batch(texts)
+        except Exception as e:
+            # Every request of the batch fails the way a single call would have
+            self.failures += 1
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        by_text = dict(zip(texts, vectors))
+        for text, future in batch:
+            if not future.done():
+                future.set_result(by_text[text])
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "requests": self.requests,
+            "batches": self.batches,
+            "texts_embedded": self.texts_embedded,
+            "avg_batch_size": self.texts_embedded / self.batches if self.batches else 0.0,
+            "max_batch_size": self.max_batch_seen,
+            "pending": len(self._pending),
+            "in_flight_batches": len(self._in_flight),
+            "failures": self.failures,
+        }
+
+
+def create_embedding_batcher(
+    embed_batch: Callable[[List[str]], Awaitable[List[List[float]]]]
+) -> Optional[EmbeddingMicroBatcher]:
+    """Build the query embedding micro-batcher configured in settings (None when disabled)"""
+    if not settings.EMBEDDING_BATCHING_ENABLED:
+        return None
+    return EmbeddingMicroBatcher(
+        embed_batch,
+        max_wait=settings.EMBEDDING_BATCH_MAX_WAIT_MS / 1000,
+        max_batch=settings.EMBEDDING_BATCH_MAX_SIZE
+    )
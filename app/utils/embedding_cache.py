@@ -0,0 +1,270 @@
+import asyncio
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from array import array
+from collections import OrderedDict
+from typing import List, Dict, Any, Optional
+from app.core.config import settings
+from app.utils.text_processing import normalize_query
+
+
+def make_cache_key(query: str, model: str) -> str:
+    """
+    Build the cache key for a query embedding
+
+    Args:
+        query: Raw query text
+        model: Name of the embedding model that produced the vector
+
+    Returns:
+        Hex digest of the model name and normalized query text
+    """
+    raw = f"{model}\x00{normalize_query(query)}"
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class EmbeddingCache(ABC):
+    """Base class for query embedding caches with hit/miss accounting"""
+
+    backend = "base"
+
+    def __init__(self, ttl_seconds: int = 0):
+        self.ttl_seconds = ttl_seconds
+        self.hits = 0
+        self.misses = 0
+
+    def _expires_at(self) -> float:
+        return time.time() + self.ttl_seconds if self.ttl_seconds > 0 else 0.0
+
+    async def get(self, key: str) -> Optional[List[float]]:
+        """Return the cached vector for key, or None on a miss"""
+        vector = await self._get(key)
+        if vector is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return vector
+
+    async def set(self, key: str, vector: List[float]):
+        """Store a vector under key"""
+        await self._set(key, vector)
+
+    @abstractmethod
+    async def _get(self, key: str) -> Optional[List[float]]:
+        """Look up the vector stored under key (None when absent or expired)"""
+
+    @abstractmethod
+    async def _set(self, key: str, vector: List[float]):
+        """Store a vector under key"""
+
+    def stats(self) -> Dict[str, Any]:
+        """Counters for tuning the cache"""
+        lookups = self.hits + self.misses
+        return {
+            "backend": self.backend,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+
+
+class InMemoryEmbeddingCache(EmbeddingCache):
+    """In-process LRU cache bounded by entry count and vector bytes"""
+
+    backend = "memory"
+
+    def __init__(self, max_entries: int, max_bytes: int, ttl_seconds: int = 0):
+        super().__init__(ttl_seconds)
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.current_bytes = 0
+        self.evictions = 0
+        # key -> (float32 vector, expiry timestamp or 0)
+        self._entries = OrderedDict()
+
+    async def _get(self, key: str) -> Optional[List[float]]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+
+        vector, expires_at = entry
+        if expires_at and expires_at < time.time():
+            self._remove(key)
+            return None
+
+        self._entries.move_to_end(key)
+        return vector.tolist()
+
+    async def _set(self, key: str, vector: List[float]):
+        if key in self._entries:
+            self._remove(key)
+
+        stored = array("f", vector)
+        size = stored.itemsize * len(stored)
+        if size > self.max_bytes:
+            return
+
+        self._entries[key] = (stored, self._expires_at())
+        self.current_bytes += size
+
+        # Evict least recently used entries until both bounds hold
+        while len(self._entries) > self.max_entries or self.current_bytes > self.max_bytes:
+            oldest_key = next(iter(self._entries))
+            self._remove(oldest_key)
+            self.evictions += 1
+
+    def _remove(self, key: str):
+        stored, _ = self._entries.pop(key)
+        self.current_bytes -= stored.itemsize * len(stored)
+
+    def stats(self) -> Dict[str, Any]:
+        stats = super().stats()
+        stats.update({
+            "entries": len(self._entries),
+            "bytes": self.current_bytes,
+            "evictions": self.evictions,
+        })
+        return stats
+
+
+class DiskEmbeddingCache(EmbeddingCache):
+    """
+    SQLite-backed cache that survives restarts and is shared by local workers
+
+    Lookups run in asyncio.to_thread workers that share one connection, so
+    the lazy connect and every statement (including the read-then-update of
+    a hit) are serialized by a lock.
+    """
+
+    backend = "disk"
+
+    def __init__(self, path: str, max_entries: int, ttl_seconds: int = 0):
+        super().__init__(ttl_seconds)
+        self.path = path
+        self.max_entries = max_entries
+        self._conn = None
+        self._lock = threading.Lock()
+
+    def _connection(self) -> sqlite3.Connection:
+        if self._conn is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._conn = sqlite3.connect(self.path, check_same_thread=False)
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS query_embeddings ("
+                "key TEXT PRIMARY KEY, vector BLOB NOT NULL, "
+                "expires_at REAL NOT NULL, accessed_at REAL NOT NULL)"
+            )
+            self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS ix_query_embeddings_accessed_at "
+                "ON query_embeddings (accessed_at)"
+            )
+        return self._conn
+
+    def _get_sync(self, key: str) -> Optional[List[float]]:
+        with self._lock:
+            conn = self._connection()
+            row = conn.execute(
+                "SELECT vector, expires_at FROM query_embeddings WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+
+            blob, expires_at = row
+            now = time.time()
+            if expires_at and expires_at < now:
+                conn.execute("DELETE FROM query_embeddings WHERE key = ?", (key,))
+                conn.commit()
+                return None
+
+            conn.execute("UPDATE query_embeddings SET accessed_at = ? WHERE key = ?", (now, key))
+            conn.commit()
+        vector = array("f")
+        vector.frombytes(blob)
+        return vector.tolist()
+
+    def _set_sync(self, key: str, vector: List[float]):
+        blob = array("f", vector).tobytes()
+        with self._lock:
+            conn = self._connection()
+            conn.execute(
+                "INSERT OR REPLACE INTO query_embeddings (key, vector, expires_at, accessed_at) "
+                "VALUES (?, ?, ?, ?)",
+                (key, blob, self._expires_at(), time.time())
+            )
+            # Trim the least recently used rows beyond the entry bound
+            conn.execute(
+                "DELETE FROM query_embeddings WHERE key IN ("
+                "SELECT key FROM query_embeddings ORDER BY accessed_at DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,)
+            )
+            conn.commit()
+
+    async def _get(self, key: str) -> Optional[List[float]]:
+        return await asyncio.to_thread(self._get_sync, key)
+
+    async def _set(self, key: str, vector: List[float]):
+        await asyncio.to_thread(self._set_sync, key, vector)
+
+
+class RedisEmbeddingCache(EmbeddingCache):
+    """Cache shared across workers and hosts through any Redis-compatible server"""
+
+    backend = "redis"
+
+    def __init__(self, url: str, ttl_seconds: int = 0, prefix: str = "query_embedding:"):
+        super().__init__(ttl_seconds)
+        try:
+            import redis.asyncio as redis
+        except ImportError as e:
+            raise ImportError("The 'redis' package is required for EMBEDDING_CACHE_BACKEND=redis") from e
+
+        self.prefix = prefix
+        self._client = redis.from_url(url)
+
+    async def _get(self, key: str) -> Optional[List[float]]:
+        blob = await self._client.get(self.prefix + key)
+        if blob is None:
+            return None
+        vector = array("f")
+        vector.frombytes(blob)
+        return vector.tolist()
+
+    async def _set(self, key: str, vector: List[float]):
+        await self._client.set(
+            self.prefix + key,
+            array("f", vector).tobytes(),
+            ex=self.ttl_seconds or None
+        )
+
+
+def create_embedding_cache() -> Optional[EmbeddingCache]:
+    """Build the query embedding cache selected in settings (None when disabled)"""
+    backend = settings.EMBEDDING_CACHE_BACKEND.lower()
+    ttl = settings.EMBEDDING_CACHE_TTL_SECONDS
+
+    if backend == "none":
+        return None
+    if backend == "memory":
+        return InMemoryEmbeddingCache(
+            max_entries=settings.EMBEDDING_CACHE_MAX_ENTRIES,
+            max_bytes=settings.EMBEDDING_CACHE_MAX_BYTES,
+            ttl_seconds=ttl
+        )
+    if backend == "disk":
+        return DiskEmbeddingCache(
+            path=settings.EMBEDDING_CACHE_PATH,
+            max_entries=settings.EMBEDDING_CACHE_MAX_ENTRIES,
+            ttl_seconds=ttl
+        )
+    if backend == "redis":
+        if not settings.EMBEDDING_CACHE_REDIS_URL:
+            raise ValueError("EMBEDDING_CACHE_REDIS_URL must be set for the redis embedding cache")
+        return RedisEmbeddingCache(settings.EMBEDDING_CACHE_REDIS_URL, ttl_seconds=ttl)
+
+    raise ValueError(f"Unknown EMBEDDING_CACHE_BACKEND: {settings.EMBEDDING_CACHE_BACKEND}")
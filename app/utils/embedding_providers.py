@@ -0,0 +1,193 @@
+import asyncio
+import hashlib
+from abc import abstractmethod
+from typing import List, Optional
+import numpy as np
+from langchain_core.embeddings import Embeddings
+from langchain_openai import OpenAIEmbeddings
+from app.core.config import settings
+from app.utils.text_processing import TERM_PATTERN, STOPWORDS
+
+# Output size of the OpenAI embedding models at their default dimensions
+OPENAI_DIMENSIONS = {
+    "text-embedding-ada-002": 1536,
+    "text-embedding-3-small": 1536,
+    "text-embedding-3-large": 3072,
+}
+
+
+class EmbeddingProvider(Embeddings):
+    """
+    An embedding model the vector store can be built with
+
+    On top of the LangChain Embeddings interface, a provider knows the size
+    of its vectors (used to create the Qdrant collection) and an identifier
+    that changes whenever its vectors would (used to key embedding caches).
+    Embeddings is an ABC, so a provider missing any of these fails when it
+    is created.
+    """
+
+    name = "base"
+
+    @property
+    @abstractmethod
+    def model_id(self) -> str:
+        """Identifier of the model and its settings that determine the vectors"""
+
+    @property
+    @abstractmethod
+    def dimension(self) -> int:
+        """Size of the vectors"""
+
+    def load(self):
+        """Prepare the model; may block, so it is called off the event loop at startup"""
+
+
+class OpenAIEmbeddingProvider(EmbeddingProvider):
+    """OpenAI embeddings API (a network round trip per call)"""
+
+    name = "openai"
+
+    def __init__(self, model: str, api_key: Optional[str], dimensions: Optional[int] = None):
+        if dimensions is None and model not in OPENAI_DIMENSIONS:
+            raise ValueError(f"EMBEDDING_DIMENSION must be set for the OpenAI model {model}")
+        self.model = model
+        self.api_key = api_key
+        self.dimensions = dimensions
+        self._client = None
+
+    @property
+    def model_id(self) -> str:
+        return self.model if self.dimensions is None else f"{self.model}@{self.dimensions}"
+
+    @property
+    def dimension(self) -> int:
+        return self.dimensions or OPENAI_DIMENSIONS[self.model]
+
+    @property
+    def client(self):
+        # Created on first use so the API key is only needed when OpenAI is actually called
+        if self._client is None:
+            if not self.api_key:
+                raise ValueError("OPENAI_API_KEY must be set for EMBEDDING_PROVIDER=openai")
+            self._client = OpenAIEmbeddings(
+                model=self.model, openai_api_key=self.api_key, dimensions=self.dimensions
+            )
+        return self._client
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self.client.embed_documents(texts)
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.client.embed_query(text)
+
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        return await self.client.aembed_documents(texts)
+
+    async def aembed_query(self, text: str) -> List[float]:
+        return await self.client.aembed_query(text)
+
+
+class SentenceTransformerEmbeddingProvider(EmbeddingProvider):
+    """Local sentence-transformers model on the CPU (no network, a few ms per query)"""
+
+    name = "sentence-transformers"
+
+    def __init__(self, model: str, batch_size: int = 32):
+        try:
+            import sentence_transformers  # noqa: F401
+        except ImportError as e:
+            raise ImportError(
+                "The 'sentence-transformers' package is required for EMBEDDING_PROVIDER=sentence-transformers"
+            ) from e
+        self.model = model
+        self.batch_size = batch_size
+        self._model = None
+
+    @property
+    def model_id(self) -> str:
+        return f"sentence-transformers/{self.model}"
+
+    def load(self):
+        if self._model is None:
+            from sentence_transformers import SentenceTransformer
+            self._model = SentenceTransformer(self.model, device="cpu")
+
+    @property
+    def dimension(self) -> int:
+        self.load()
+        return self._model.get_sentence_embedding_dimension()
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        self.load()
+        vectors = self._model.encode(texts, batch_size=self.batch_size, normalize_embeddings=True)
+        return vectors.tolist()
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.embed_documents([text])[0]
+
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        # Inference is CPU-bound; keep it off the event loop
+        return await asyncio.to_thread(self.embed_documents, texts)
+
+    async def aembed_query(self, text: str) -> List[float]:
+        return await asyncio.to_thread(self.embed_query, text)
+
+
+class HashingEmbeddingProvider(EmbeddingProvider):
+    """
+    Deterministic embeddings from hashed terms and term bigrams
+
+    Needs no model and no network, so it suits tests and offline
+    development. Vectors only capture shared vocabulary, not meaning.
+    """
+
+    name = "hashing"
+
+    def __init__(self, dimension: int = 384):
+        self._dimension = dimension
+
+    @property
+    def model_id(self) -> str:
+        return f"hashing-{self._dimension}"
+
+    @property
+    def dimension(self) -> int:
+        return self._dimension
+
+    def _embed(self, text: str) -> List[float]:
+        terms = [term for term in TERM_PATTERN.findall(text.lower()) if term not in STOPWORDS]
+        features = terms + [f"{first} {second}" for first, second in zip(terms, terms[1:])]
+        vector = np.zeros(self._dimension, dtype=np.float32)
+        for feature in features:
+            digest = int.from_bytes(hashlib.blake2b(feature.encode("utf-8"), digest_size=8).digest(), "little")
+            # The top bit picks the sign so colliding features tend to cancel out
+            vector[digest % self._dimension] += -1.0 if digest >> 63 else 1.0
+        norm = np.linalg.norm(vector)
+        if norm > 0:
+            vector /= norm
+        return vector.tolist()
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return [self._embed(text) for text in texts]
+
+    def embed_query(self, text: str) -> List[float]:
+        return self._embed(text)
+
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self.embed_documents(texts)
+
+    async def aembed_query(self, text: str) -> List[float]:
+        return self._embed(text)
+
+
+def create_embedding_provider() -> EmbeddingProvider:
+    """Build the embedding provider configured in settings"""
+    provider = settings.EMBEDDING_PROVIDER.lower()
+    if provider == "openai":
+        return OpenAIEmbeddingProvider(settings.EMBEDDING_MODEL, settings.OPENAI_API_KEY, settings.EMBEDDING_DIMENSION)
+    if provider == "sentence-transformers":
+        return SentenceTransformerEmbeddingProvider(settings.LOCAL_EMBEDDING_MODEL)
+    if provider == "hashing":
+        return HashingEmbeddingProvider(settings.EMBEDDING_DIMENSION or 384)
+    raise ValueError(f"Unknown EMBEDDING_PROVIDER: {settings.EMBEDDING_PROVIDER}")
@@ -0,0 +1,152 @@
+import hashlib
+import json
+import os
+import re
+from typing import List, Dict, Any, Optional
+import numpy as np
+from app.core.config import settings
+
+HASH_SIZE = 16  # Bytes per text digest
+
+
+def text_hash(text: str) -> bytes:
+    """Digest identifying a chunk text in the embedding store"""
+    return hashlib.blake2b(text.encode("utf-8"), digest_size=HASH_SIZE).digest()
+
+
+class EmbeddingStore:
+    """
+    Append-only on-disk store of document embeddings keyed by text hash
+
+    Vectors are appended as raw float32 rows to vectors.f32 and memory-mapped
+    for reads; hashes.bin holds the matching 16-byte text digests in the same
+    row order. Vectors are written before their digest, so a crash can at
+    worst leave a trailing partial row, which is truncated on the next load.
+    """
+
+    def __init__(self, directory: str, model: str):
+        # One store per embedding model, since vectors are not interchangeable
+        self.directory = os.path.join(directory, re.sub(r"[^A-Za-z0-9_.-]", "_", model))
+        self.model = model
+        self.vectors_path = os.path.join(self.directory, "vectors.f32")
+        self.hashes_path = os.path.join(self.directory, "hashes.bin")
+        self.meta_path = os.path.join(self.directory, "meta.json")
+
+        self.dimension = None
+        self._index = {}  # text digest -> row
+        self._vectors = None
+        self._mapped_rows = 0
+        self._loaded = False
+        self.hits = 0
+        self.misses = 0
+
+    def _load(self):
+        if self._loaded:
+            return
+        self._loaded = True
+
+        if not os.path.exists(self.meta_path):
+            return
+
+        with open(self.meta_path, 'r', encoding='utf-8') as file:
+            self.dimension = json.load(file)["dimension"]
+
+        row_bytes = self.dimension * 4
+        vector_rows = os.path.getsize(self.vectors_path) // row_bytes if os.path.exists(self.vectors_path) else 0
+        hash_rows = os.path.getsize(self.hashes_path) // HASH_SIZE if os.path.exists(self.hashes_path) else 0
+        rows = min(vector_rows, hash_rows)
+
+        # Drop anything written past the last complete row
+        for path, size in ((self.vectors_path, rows * row_bytes), (self.hashes_path, rows * HASH_SIZE)):
+            if os.path.exists(path) and os.path.getsize(path) != size:
+                with open(path, 'r+b') as file:
+                    file.truncate(size)
+
+        if not rows:
+            return
+
+        with open(self.hashes_path, 'rb') as file:
+            digests = file.read()
+        self._index = {digests[i * HASH_SIZE:(i + 1) * HASH_SIZE]: i for i in range(rows)}
+
+    def _mapped(self) -> np.ndarray:
+        rows = len(self._index)
+        if self._vectors is None or self._mapped_rows != rows:
+            self._vectors = np.memmap(self.vectors_path, dtype=np.float32, mode='r', shape=(rows, self.dimension))
+            self._mapped_rows = rows
+        return self._vectors
+
+    def get_many(self, texts: List[str]) -> List[Optional[List[float]]]:
+        """
+        Look up stored embeddings
+
+        Args:
+            texts: Chunk texts to look up
+
+        Returns:
+            The stored vector for each text, or None where it is missing
+        """
+        self._load()
+        rows = [self._index.get(text_hash(text)) for text in texts]
+        found = sum(row is not None for row in rows)
+        self.hits += found
+        self.misses += len(rows) - found
+        if not found:
+            return [None] * len(texts)
+
+        vectors = self._mapped()
+        return [vectors[row].tolist() if row is not None else None for row in rows]
+
+    def put_many(self, texts: List[str], vectors: List[List[float]]):
+        """
+        Append embeddings for texts that are not stored yet
+
+        Args:
+            texts: Chunk texts
+            vectors: Embedding of each text
+        """
+        self._load()
+        new_rows = {}
+        for text, vector in zip(texts, vectors):
+            digest = text_hash(text)
+            if digest not in self._index and digest not in new_rows:
+                new_rows[digest] = vector
+        if not new_rows:
+            return
+
+        matrix = np.asarray(list(new_rows.values()), dtype=np.float32)
+        if self.dimension is None:
+            os.makedirs(self.directory, exist_ok=True)
+            self.dimension = int(matrix.shape[1])
+            with open(self.meta_path, 'w', encoding='utf-8') as file:
+                json.dump({"dimension": self.dimension, "model": self.model}, file)
+
+        with open(self.vectors_path, 'ab') as file:
+            file.write(matrix.tobytes())
+            file.flush()
+            os.fsync(file.fileno())
+        with open(self.hashes_path, 'ab') as file:
+            file.write(b"".join(new_rows.keys()))
+
+        start = len(self._index)
+        for offset, digest in enumerate(new_rows):
+            self._index[digest] = start + offset
+
+    def __len__(self) -> int:
+        self._load()
+        return len(self._index)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "entries": len(self),
+            "dimension": self.dimension,
+            "hits": self.hits,
+            "misses": self.misses,
+        }
+
+
+def create_embedding_store(model: str) -> Optional[EmbeddingStore]:
+    """Build the document embedding store configured in settings (None when disabled)"""
+    if not settings.EMBEDDING_STORE_ENABLED:
+        return None
+    return EmbeddingStore(settings.EMBEDDING_STORE_PATH, model)
@@ -0,0 +1,414 @@
+import asyncio
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Dict, Any, Callable, Iterator, Optional, Tuple
+from app.core.config import settings
+from app.utils.text_processing import split_text, preprocess_text, count_tokens
+from app.utils.answer_extraction import index_sentences
+from app.utils.vector_store import vector_store_manager, chunk_point_id
+
+
+def iter_text_blocks(file_path: str, block_size: int) -> Iterator[str]:
+    """
+    Stream a text file in blocks instead of reading it whole
+
+    Blocks end on a blank line (paragraph boundary) once they reach block_size
+    characters, and are cut regardless once they reach twice that size.
+
+    Args:
+        file_path: Path to the text file
+        block_size: Target number of characters per block
+
+    Yields:
+        Consecutive blocks of the file's text
+    """
+    lines = []
+    size = 0
+    with open(file_path, 'r', encoding='utf-8') as file:
+        for line in file:
+            lines.append(line)
+            size += len(line)
+            if (size >= block_size and not line.strip()) or size >= 2 * block_size:
+                yield ''.join(lines)
+                lines = []
+                size = 0
+    if lines:
+        yield ''.join(lines)
+
+
+def file_fingerprint(file_path: str) -> str:
+    """Cheap change detector for a file (size and modification time)"""
+    stat = os.stat(file_path)
+    return f"{stat.st_size}:{stat.st_mtime_ns}"
+
+
+def source_path_of(file_path: str, root: Optional[str] = None) -> str:
+    """
+    Identity of a file within an ingestion: its path relative to the ingest root
+
+    Files with the same name in different subdirectories must not share
+    chunk IDs or be diffed against each other's chunks. Without a root (a
+    single ingested file) this is the file name.
+
+    Args:
+        file_path: Path to the text file
+        root: Directory the ingestion walked (optional)
+
+    Returns:
+        "/"-separated relative path
+    """
+    if root is None:
+        return os.path.basename(file_path)
+    return os.path.relpath(file_path, root).replace(os.sep, "/")
+
+
+def prepare_file(
+    file_path: str,
+    metadata: Optional[Dict[str, Any]],
+    block_size: int,
+    source_path: Optional[str] = None
+) -> Dict[str, Any]:
+    """
+    Read, preprocess and split one file into chunks (runs in a worker process)
+
+    Args:
+        file_path: Path to the text file
+        metadata: Metadata copied onto every chunk
+        block_size: Characters read from the file before splitting
+        source_path: Path of the file relative to the ingest root (defaults to the file name)
+
+    Returns:
+        Dictionary with the file's fingerprint, chunks, chunk IDs, chunk metadata and token counts
+    """
+    fingerprint = file_fingerprint(file_path)
+    source_file = os.path.basename(file_path)
+    source_path = source_path or source_file
+    chunks = []
+    ids = []
+    chunk_metadata = []
+    token_counts = []
+
+    for block in iter_text_blocks(file_path, block_size):
+        for chunk in split_text(preprocess_text(block)):
+            chunk_meta = dict(metadata or {})
+            chunk_meta['chunk_id'] = len(chunks)
+            chunk_meta['source_file'] = source_file
+            chunk_meta['source_path'] = source_path
+            chunk_meta['token_count'] = count_tokens(chunk)
+            chunk_meta.update(index_sentences(chunk))
+            chunks.append(chunk)
+            ids.append(chunk_point_id(source_path, chunk))
+            chunk_metadata.append(chunk_meta)
+            token_counts.append(chunk_meta['token_count'])
+
+    return {
+        "file_path": file_path,
+        "fingerprint": fingerprint,
+        "chunks": chunks,
+        "ids": ids,
+        "metadatas": chunk_metadata,
+        "token_counts": token_counts
+    }
+
+
+class IngestionManifest:
+    """
+    Checkpoint of completed files and batches so a crashed run can resume
+
+    Batch indices only identify the same chunks under the same batch size,
+    so each file entry records the batch size its batches were cut with and
+    progress made with another one is discarded.
+    """
+
+    def __init__(self, path: str, resume: bool = True, batch_size: int = None):
+        self.path = path
+        self.batch_size = batch_size or settings.INGEST_BATCH_SIZE
+        self.files = {}
+        if resume and os.path.exists(path):
+            with open(path, 'r', encoding='utf-8') as file:
+                self.files = json.load(file).get("files", {})
+
+    def _entry(self, file_path: str, fingerprint: str) -> Dict[str, Any]:
+        entry = self.files.get(file_path)
+        if entry is None or entry["fingerprint"] != fingerprint or entry.get("batch_size") != self.batch_size:
+            # New or modified file, or batches cut differently: any previous progress is void
+            entry = {
+                "fingerprint": fingerprint, "batch_size": self.batch_size, "completed_batches": [], "complete": False
+            }
+            self.files[file_path] = entry
+        return entry
+
+    def is_complete(self, file_path: str, fingerprint: str) -> bool:
+        # A finished file is finished whatever its batches were
+        entry = self.files.get(file_path)
+        return entry is not None and entry["fingerprint"] == fingerprint and entry["complete"]
+
+    def completed_batches(self, file_path: str, fingerprint: str) -> set:
+        return set(self._entry(file_path, fingerprint)["completed_batches"])
+
+    def mark_batch(self, file_path: str, fingerprint: str, batch_index: int):
+        self._entry(file_path, fingerprint)["completed_batches"].append(batch_index)
+        self.save()
+
+    def mark_complete(self, file_path: str, fingerprint: str):
+        entry = self._entry(file_path, fingerprint)
+        entry["complete"] = True
+        entry["completed_batches"] = []
+        self.save()
+
+    def save(self):
+        """Write the manifest atomically so a crash never leaves it half-written"""
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as file:
+            json.dump({"files": self.files}, file)
+        os.replace(tmp_path, self.path)
+
+
+class IngestionStats:
+    """Counters and throughput of an ingestion run"""
+
+    def __init__(self):
+        self.started_at = time.perf_counter()
+        self.elapsed = 0.0
+        self.files_processed = 0
+        self.files_skipped = 0
+        self.files_failed = 0
+        self.chunks = 0
+        self.tokens = 0
+        self.batches = 0
+        self.batches_skipped = 0
+        self.batches_failed = 0
+        self.chunks_unchanged = 0
+        self.chunks_deleted = 0
+        self.metadata_updated = 0
+        self.lexical_repaired = 0
+
+    @property
+    def changed(self) -> bool:
+        """Whether the run modified the collection"""
+        return bool(self.batches or self.chunks_deleted or self.metadata_updated or self.lexical_repaired)
+
+    def finish(self):
+        self.elapsed = time.perf_counter() - self.started_at
+
+    @property
+    def failed(self) -> int:
+        return self.files_failed
+
+    def report(self) -> str:
+        elapsed = self.elapsed or 1e-9
+        return (
+            f"Ingested {self.chunks} chunks ({self.tokens} tokens) from {self.files_processed} files "
+            f"in {self.elapsed:.2f}s: {self.chunks / elapsed:.1f} chunks/s, {self.tokens / elapsed:.1f} tokens/s. "
+            f"Skipped {self.files_skipped} unchanged files and {self.batches_skipped} checkpointed batches; "
+            f"kept {self.chunks_unchanged} unchanged chunks and deleted {self.chunks_deleted} stale ones; "
+            f"{self.files_failed} files and {self.batches_failed} batches failed."
+        )
+
+
+class IngestionPipeline:
+    """
+    Streaming ingestion: files are read and split in a process pool while
+    bounded-size embedding batches run concurrently and are upserted in chunks
+
+    In incremental mode each file is diffed against the chunks already stored
+    for it: only new or changed chunks are embedded and stale ones are deleted.
+
+    Finished batches and files are recorded in the resume manifest only at
+    checkpoints (every checkpoint_seconds and at the end of the run), after
+    the vector store has made them durable, so a crash loses at most the
+    work since the last checkpoint and never leaves the manifest ahead of
+    the stored chunks.
+    """
+
+    def __init__(
+        self,
+        workers: int = None,
+        batch_size: int = None,
+        embed_concurrency: int = None,
+        manifest_path: str = None,
+        resume: bool = True,
+        incremental: bool = None,
+        block_size: int = None,
+        checkpoint_seconds: float = None,
+        progress: Callable[[str], None] = print
+    ):
+        self.workers = workers or settings.INGEST_WORKERS
+        self.batch_size = batch_size or settings.INGEST_BATCH_SIZE
+        self.embed_concurrency = embed_concurrency or settings.INGEST_EMBED_CONCURRENCY
+        self.block_size = block_size or settings.INGEST_READ_BLOCK_SIZE
+        self.incremental = settings.INGEST_INCREMENTAL if incremental is None else incremental
+        self.manifest = IngestionManifest(
+            manifest_path or settings.INGEST_MANIFEST_PATH, resume=resume, batch_size=self.batch_size
+        )
+        self.checkpoint_seconds = (
+            settings.INGEST_CHECKPOINT_SECONDS if checkpoint_seconds is None else checkpoint_seconds
+        )
+        self.progress = progress
+        # (file path, fingerprint, batch index or None for a finished file) awaiting a checkpoint
+        self._unrecorded = []
+        self._checkpoint_lock = None
+        self._checkpointed_at = 0.0
+
+    async def run(
+        self,
+        files: List[Tuple[str, Optional[Dict[str, Any]]]],
+        root: Optional[str] = None
+    ) -> IngestionStats:
+        """
+        Ingest files into the vector store
+
+        Args:
+            files: (file path, metadata) pairs to ingest
+            root: Directory the files were collected from; chunks are identified
+                by their file's path relative to it (defaults to the file name)
+
+        Returns:
+            Statistics of the run
+        """
+        stats = IngestionStats()
+        loop = asyncio.get_running_loop()
+        self._checkpoint_lock = asyncio.Lock()
+        self._checkpointed_at = time.monotonic()
+        embed_slots = asyncio.Semaphore(self.embed_concurrency)
+        # Bound the number of split files held in memory while they wait for embedding
+        file_slots = asyncio.Semaphore(self.workers * 2)
+
+        with ProcessPoolExecutor(max_workers=self.workers) as executor:
+            tasks = []
+            for file_path, metadata in files:
+                try:
+                    fingerprint = file_fingerprint(file_path)
+                except OSError as e:
+                    stats.files_failed += 1
+                    self.progress(f"Failed to process {file_path}: {str(e)}")
+                    continue
+                if self.manifest.is_complete(file_path, fingerprint):
+                    stats.files_skipped += 1
+                    continue
+                await file_slots.acquire()
+                tasks.append(asyncio.create_task(
+                    self._ingest_file(loop, executor, file_path, metadata, root, embed_slots, file_slots, stats)
+                ))
+            await asyncio.gather(*tasks)
+
+        if vector_store_manager.embedding_store is not None:
+            store = vector_store_manager.embedding_store.stats()
+            self.progress(f"Embedding store: reused {store['hits']} stored embeddings, embedded {store['misses']} new chunks")
+
+        if self._unrecorded or stats.changed:
+            await self._checkpoint()
+        if stats.changed:
+            # Cluster the final collection once rather than after every batch
+            await vector_store_manager.build_vector_index()
+            # Invalidate caches in the serving processes once, at the end of the run
+            await vector_store_manager.bump_collection_version()
+
+        stats.finish()
+        return stats
+
+    async def _checkpoint(self):
+        """Make the work done so far durable, then record it in the manifest"""
+        async with self._checkpoint_lock:
+            # Everything recorded here finished before the store is flushed
+            unrecorded, self._unrecorded = self._unrecorded, []
+            await vector_store_manager.checkpoint()
+            for file_path, fingerprint, batch_index in unrecorded:
+                if batch_index is None:
+                    self.manifest.mark_complete(file_path, fingerprint)
+                else:
+                    self.manifest.mark_batch(file_path, fingerprint, batch_index)
+            self._checkpointed_at = time.monotonic()
+
+    async def _record(self, file_path: str, fingerprint: str, batch_index: Optional[int]):
+        """Queue finished work for the manifest, checkpointing when one is due"""
+        self._unrecorded.append((file_path, fingerprint, batch_index))
+        if time.monotonic() - self._checkpointed_at >= self.checkpoint_seconds:
+            await self._checkpoint()
+
+    async def _ingest_file(self, loop, executor, file_path, metadata, root, embed_slots, file_slots, stats):
+        # A failing file is reported and left out of the manifest; the other files carry on
+        try:
+            source_path = source_path_of(file_path, root)
+            prepared = await loop.run_in_executor(
+                executor, prepare_file, file_path, metadata, self.block_size, source_path
+            )
+
+            fingerprint = prepared["fingerprint"]
+            chunks = prepared["chunks"]
+            ids = prepared["ids"]
+            metadatas = prepared["metadatas"]
+            stale_ids = []
+
+            if self.incremental:
+                # The collection itself is the checkpoint: anything already stored is skipped
+                existing = await vector_store_manager.get_source_points(source_path)
+                pending = [i for i, id_ in enumerate(ids) if id_ not in existing]
+                stale_ids = list(set(existing) - set(ids))
+                # Unchanged text whose position moved only needs its metadata rewritten
+                moved = {
+                    id_: metadata for id_, metadata in zip(ids, metadatas)
+                    if id_ in existing and existing[id_] != metadata
+                }
+                await vector_store_manager.update_metadata(moved, wait=False)
+                stats.metadata_updated += len(moved)
+                # Stored chunks a crashed run never got into the lexical index
+                unchanged = [i for i, id_ in enumerate(ids) if id_ in existing]
+                stats.lexical_repaired += vector_store_manager.ensure_lexically_indexed(
+                    [ids[i] for i in unchanged], [chunks[i] for i in unchanged], [metadatas[i] for i in unchanged]
+                )
+                stats.chunks_unchanged += len(ids) - len(pending)
+                completed = set()
+            else:
+                pending = list(range(len(chunks)))
+                completed = self.manifest.completed_batches(file_path, fingerprint)
+
+            self.progress(f"Processing {len(pending)} of {len(chunks)} chunks from {file_path}...")
+
+            async def ingest_batch(batch_index: int, indices: List[int]):
+                if batch_index in completed:
+                    stats.batches_skipped += 1
+                    return
+                async with embed_slots:
+                    await vector_store_manager.add_texts(
+                        texts=[chunks[i] for i in indices],
+                        metadatas=[metadatas[i] for i in indices],
+                        ids=[ids[i] for i in indices],
+                        batch_size=self.batch_size,
+                        wait=False,
+                        bump_version=False
+                    )
+                stats.batches += 1
+                stats.chunks += len(indices)
+                stats.tokens += sum(prepared["token_counts"][i] for i in indices)
+                await self._record(file_path, fingerprint, batch_index)
+
+            batches = [pending[start:start + self.batch_size] for start in range(0, len(pending), self.batch_size)]
+            results = await asyncio.gather(
+                *(ingest_batch(i, indices) for i, indices in enumerate(batches)),
+                return_exceptions=True
+            )
+            errors = [result for result in results if isinstance(result, Exception)]
+            if errors:
+                stats.batches_failed += len(errors)
+                stats.files_failed += 1
+                self.progress(f"Failed {len(errors)} batches of {file_path}: {str(errors[0])}")
+                return
+
+            # Stale chunks go only after their replacements are stored
+            await vector_store_manager.delete_points(stale_ids, wait=False)
+            stats.chunks_deleted += len(stale_ids)
+
+            stats.files_processed += 1
+            await self._record(file_path, fingerprint, None)
+            self.progress(f"Successfully processed: {file_path}")
+        except Exception as e:
+            stats.files_failed += 1
+            self.progress(f"Failed to process {file_path}: {str(e)}")
+        finally:
+            file_slots.release()
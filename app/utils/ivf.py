@@ -0,0 +1,98 @@
+import math
+from typing import Optional
+import numpy as np
+
+# Points sampled per cluster to train the centroids (FAISS suggests 39 to 256)
+TRAIN_POINTS_PER_LIST = 64
+KMEANS_ITERATIONS = 10
+# Rows assigned per matrix product, bounding the (rows x clusters) score buffer
+ASSIGN_BLOCK_ROWS = 16384
+
+
+def default_nlist(count: int) -> int:
+    """Number of clusters for a collection of count points: about its square root"""
+    return max(1, int(round(math.sqrt(count))))
+
+
+def assign_to_centroids(vectors: np.ndarray, centroids: np.ndarray) -> np.ndarray:
+    """Index of the most similar centroid of every vector"""
+    assignments = np.empty(len(vectors), dtype=np.int32)
+    for start in range(0, len(vectors), ASSIGN_BLOCK_ROWS):
+        block = vectors[start:start + ASSIGN_BLOCK_ROWS]
+        assignments[start:start + len(block)] = np.argmax(block @ centroids.T, axis=1)
+    return assignments
+
+
+def train_centroids(
+    vectors: np.ndarray,
+    nlist: int,
+    iterations: int = KMEANS_ITERATIONS,
+    seed: int = 0
+) -> np.ndarray:
+    """
+    Spherical k-means centroids of unit-length vectors
+
+    Trained on a sample of TRAIN_POINTS_PER_LIST points per cluster;
+    clusters left empty by an iteration are reseeded from random sample
+    points.
+
+    Args:
+        vectors: Unit-length row vectors
+        nlist: Number of clusters
+        iterations: Assignment / update rounds
+        seed: Seed of the sampling
+
+    Returns:
+        (nlist, dimension) unit-length centroids
+    """
+    rng = np.random.default_rng(seed)
+    nlist = min(nlist, len(vectors))
+    sample_size = min(len(vectors), nlist * TRAIN_POINTS_PER_LIST)
+    sample = np.asarray(vectors[np.sort(rng.choice(len(vectors), sample_size, replace=False))], dtype=np.float32)
+    centroids = sample[rng.choice(sample_size, nlist, replace=False)].copy()
+
+    for _ in range(iterations):
+        assignments = assign_to_centroids(sample, centroids)
+        order = np.argsort(assignments, kind="stable")
+        clusters, starts = np.unique(assignments[order], return_index=True)
+        sums = np.add.reduceat(sample[order], starts, axis=0)
+        empty = np.setdiff1d(np.arange(nlist), clusters)
+        centroids[clusters] = sums
+        centroids[empty] = sample[rng.choice(sample_size, len(empty), replace=False)]
+        norms = np.linalg.norm(centroids, axis=1, keepdims=True)
+        centroids /= np.where(norms > 0, norms, 1.0)
+    return centroids
+
+
+class InvertedLists:
+    """
+    Rows of each cluster, derived from the per-row cluster assignments
+
+    Rows are ordered by cluster once, so the candidates of a probe are a
+    few contiguous slices of one array.
+    """
+
+    def __init__(self, assignments: np.ndarray, nlist: int):
+        self.order = np.argsort(assignments, kind="stable").astype(np.int64)
+        self.bounds = np.searchsorted(assignments[self.order], np.arange(nlist + 1))
+
+    def rows(self, clusters: np.ndarray) -> np.ndarray:
+        """Rows belonging to any of the clusters, ascending within each cluster"""
+        return np.concatenate(
+            [self.order[self.bounds[c]:self.bounds[c + 1]] for c in clusters]
+        ) if len(clusters) else np.empty(0, dtype=np.int64)
+
+
+def probe(centroids: np.ndarray, query: np.ndarray, nprobe: int) -> np.ndarray:
+    """Indexes of the nprobe centroids most similar to the query"""
+    scores = centroids @ query
+    if nprobe >= len(scores):
+        return np.arange(len(scores))
+    return np.argpartition(-scores, nprobe - 1)[:nprobe]
+
+
+def list_sizes(assignments: Optional[np.ndarray], nlist: int) -> np.ndarray:
+    """Number of rows in each cluster"""
+    if assignments is None:
+        return np.zeros(nlist, dtype=np.int64)
+    return np.bincount(assignments, minlength=nlist)
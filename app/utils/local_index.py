@@ -0,0 +1,947 @@
+import asyncio
+import math
+import os
+import pickle
+import time
+from typing import List, Dict, Any, Optional, Tuple
+import numpy as np
+from qdrant_client.http import models
+from app.utils.ivf import InvertedLists, assign_to_centroids, default_nlist, list_sizes, probe, train_centroids
+from app.utils.quantization import ScalarQuantizer
+
+# Collections with at least this many vector components (rows x dimension)
+# are scored in a worker thread; NumPy releases the GIL during the product
+OFFLOAD_MIN_FLOATS = 2_000_000
+
+# How often a clean collection checks whether another process rewrote it
+RELOAD_CHECK_SECONDS = 1.0
+
+
+def _payload_value(payload: Dict[str, Any], key: str) -> Any:
+    """Value at a dotted payload key ("metadata.source_file"), or None"""
+    value = payload
+    for part in key.split("."):
+        if not isinstance(value, dict):
+            return None
+        value = value.get(part)
+    return value
+
+
+def _match_field(condition: models.FieldCondition, value: Any) -> bool:
+    # Like Qdrant, a list value matches when any of its elements does
+    values = value if isinstance(value, list) else [value]
+    values = [v for v in values if v is not None]
+    if condition.match is not None:
+        match = condition.match
+        if isinstance(match, models.MatchValue):
+            return any(v == match.value for v in values)
+        if isinstance(match, models.MatchAny):
+            return any(v in match.any for v in values)
+        if isinstance(match, models.MatchExcept):
+            return any(v not in match.except_ for v in values)
+        if isinstance(match, models.MatchText):
+            return any(isinstance(v, str) and match.text in v for v in values)
+        raise ValueError(f"Unsupported match condition: {type(match).__name__}")
+    if condition.range is not None:
+        bounds = condition.range
+        return any(
+            isinstance(v, (int, float)) and not isinstance(v, bool)
+            and (bounds.gt is None or v > bounds.gt)
+            and (bounds.gte is None or v >= bounds.gte)
+            and (bounds.lt is None or v < bounds.lt)
+            and (bounds.lte is None or v <= bounds.lte)
+            for v in values
+        )
+    raise ValueError(f"Unsupported field condition on {condition.key}")
+
+
+def _match_condition(condition: Any, point_id: Any, payload: Dict[str, Any]) -> bool:
+    if isinstance(condition, models.Filter):
+        return matches_filter(condition, point_id, payload)
+    if isinstance(condition, models.FieldCondition):
+        return _match_field(condition, _payload_value(payload, condition.key))
+    if isinstance(condition, models.HasIdCondition):
+        return str(point_id) in {str(id_) for id_ in condition.has_id}
+    if isinstance(condition, models.IsEmptyCondition):
+        return _payload_value(payload, condition.is_empty.key) in (None, [])
+    if isinstance(condition, models.IsNullCondition):
+        return _payload_value(payload, condition.is_null.key) is None
+    raise ValueError(f"Unsupported filter condition: {type(condition).__name__}")
+
+
+def matches_filter(filter_: models.Filter, point_id: Any, payload: Dict[str, Any]) -> bool:
+    """
+    Evaluate a Qdrant filter against one point
+
+    Supports must / should / must_not with nested filters, field conditions
+    (match value / any / except / text and numeric ranges), has_id, is_empty
+    and is_null, which covers every filter the application builds.
+
+    Args:
+        filter_: Qdrant filter
+        point_id: ID of the point
+        payload: Payload of the point
+
+    Returns:
+        Whether the point passes the filter
+    """
+    if filter_.must and not all(_match_condition(c, point_id, payload) for c in filter_.must):
+        return False
+    if filter_.should and not any(_match_condition(c, point_id, payload) for c in filter_.should):
+        return False
+    if filter_.must_not and any(_match_condition(c, point_id, payload) for c in filter_.must_not):
+        return False
+    return True
+
+
+def _select_payload(payload: Dict[str, Any], with_payload: Any) -> Optional[Dict[str, Any]]:
+    """Payload as returned for with_payload=True/False or a list of top-level keys"""
+    if with_payload is True:
+        return payload
+    if not with_payload:
+        return None
+    return {key: payload[key] for key in with_payload if key in payload}
+
+
+class LocalCollection:
+    """
+    Points of one collection: a contiguous float32 matrix plus IDs and payloads
+
+    Cosine collections store unit-length rows, so a similarity search is a
+    single matrix-vector product. A collection loaded from disk keeps its
+    matrix memory-mapped and read-only until it is first modified; it is
+    then copied into a growable in-memory buffer.
+
+    Once an IVF index is built (build_ivf), every row is assigned to its
+    nearest centroid, including rows upserted later, and approximate
+    searches only score the rows of the nprobe clusters closest to the
+    query.
+
+    Once int8 codes are built (build_codes), searches score the codes
+    instead of the float32 rows and, when rescoring, re-rank the best
+    candidates with the float32 rows. The codes are held in memory while
+    the float32 matrix can stay memory-mapped, so only the rescored rows
+    are read from it.
+    """
+
+    def __init__(self, dimension: int, distance: models.Distance):
+        if distance not in (models.Distance.COSINE, models.Distance.DOT):
+            raise ValueError(f"The local vector index supports Cosine and Dot distance, not {distance}")
+        self.dimension = dimension
+        self.distance = distance
+        self.ids = []  # Row -> point ID
+        self.rows = {}  # str(point ID) -> row
+        self.payloads = []  # Row -> payload
+        self._matrix = np.zeros((0, dimension), dtype=np.float32)
+        self.centroids = None  # (nlist, dimension) IVF centroids, once built
+        self._assignments = None  # Row -> IVF cluster, same capacity as the matrix
+        self._lists = None  # (revision, InvertedLists) of the current assignments
+        self.quantizer = None  # ScalarQuantizer, once int8 codes are built
+        self._codes = None  # Row -> int8 code, same capacity as the matrix
+        self.revision = 0  # Bumped by every change; invalidates filter masks and in-flight searches
+        self._masks = {}  # Filter JSON -> boolean row mask at the current revision
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    @property
+    def vectors(self) -> np.ndarray:
+        return self._matrix[:len(self.ids)]
+
+    @property
+    def assignments(self) -> Optional[np.ndarray]:
+        return None if self._assignments is None else self._assignments[:len(self.ids)]
+
+    @property
+    def codes(self) -> Optional[np.ndarray]:
+        return None if self._codes is None else self._codes[:len(self.ids)]
+
+    @property
+    def memory_mapped(self) -> bool:
+        return isinstance(self._matrix, np.memmap)
+
+    def _prepare(self, vectors: np.ndarray) -> np.ndarray:
+        vectors = np.asarray(vectors, dtype=np.float32)
+        if vectors.shape[-1] != self.dimension:
+            raise ValueError(f"Expected {self.dimension}-dimensional vectors, got {vectors.shape[-1]}")
+        if self.distance == models.Distance.COSINE:
+            norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+            vectors = vectors / np.where(norms > 0, norms, 1.0)
+        return vectors
+
+    def _changed(self):
+        self.revision += 1
+        self._masks.clear()
+
+    def _reserve(self, rows: int):
+        """Make room for rows more points, leaving the memory-mapped file untouched"""
+        needed = len(self.ids) + rows
+        if needed <= self._matrix.shape[0] and not self.memory_mapped:
+            return
+        capacity = max(needed, 2 * len(self.ids), 64)
+        matrix = np.empty((capacity, self.dimension), dtype=np.float32)
+        matrix[:len(self.ids)] = self.vectors
+        self._matrix = matrix
+        if self._assignments is not None:
+            assignments = np.empty(capacity, dtype=np.int32)
+            assignments[:len(self.ids)] = self.assignments
+            self._assignments = assignments
+        if self._codes is not None:
+            codes = np.empty((capacity, self.dimension), dtype=np.int8)
+            codes[:len(self.ids)] = self.codes
+            self._codes = codes
+
+    def upsert(self, points: List[models.PointStruct]):
+        vectors = self._prepare([point.vector for point in points])
+        self._reserve(len(points))
+        clusters = assign_to_centroids(vectors, self.centroids) if self.centroids is not None else None
+        codes = self.quantizer.encode(vectors) if self.quantizer is not None else None
+        for i, (point, vector) in enumerate(zip(points, vectors)):
+            key = str(point.id)
+            row = self.rows.get(key)
+            if row is None:
+                row = len(self.ids)
+                self.rows[key] = row
+                self.ids.append(point.id)
+                self.payloads.append(point.payload or {})
+            else:
+                self.payloads[row] = point.payload or {}
+            self._matrix[row] = vector
+            if clusters is not None:
+                self._assignments[row] = clusters[i]
+            if codes is not None:
+                self._codes[row] = codes[i]
+        self._changed()
+
+    def set_payload(self, payload: Dict[str, Any], ids: List[Any]):
+        for id_ in ids:
+            row = self.rows.get(str(id_))
+            if row is not None:
+                self.payloads[row] = {**self.payloads[row], **payload}
+        self._changed()
+
+    def delete(self, ids: List[Any]):
+        rows = sorted((self.rows[str(id_)] for id_ in ids if str(id_) in self.rows), reverse=True)
+        if not rows:
+            return
+        self._reserve(0)
+        for row in rows:
+            # The last row moves into the freed slot so the matrix stays contiguous
+            last = len(self.ids) - 1
+            del self.rows[str(self.ids[row])]
+            if row != last:
+                self._matrix[row] = self._matrix[last]
+                if self._assignments is not None:
+                    self._assignments[row] = self._assignments[last]
+                if self._codes is not None:
+                    self._codes[row] = self._codes[last]
+                self.ids[row] = self.ids[last]
+                self.payloads[row] = self.payloads[last]
+                self.rows[str(self.ids[row])] = row
+            self.ids.pop()
+            self.payloads.pop()
+        self._changed()
+
+    def filter_mask(self, filter_: models.Filter) -> np.ndarray:
+        """Rows passing a filter, memoized until the collection changes"""
+        key = filter_.model_dump_json()
+        mask = self._masks.get(key)
+        if mask is None:
+            mask = np.fromiter(
+                (matches_filter(filter_, id_, payload) for id_, payload in zip(self.ids, self.payloads)),
+                dtype=bool,
+                count=len(self.ids)
+            )
+            self._masks[key] = mask
+        return mask
+
+    def filter_rows(self, filter_: Optional[models.Filter]) -> np.ndarray:
+        if filter_ is None:
+            return np.arange(len(self.ids))
+        return np.flatnonzero(self.filter_mask(filter_))
+
+    def build_ivf(self, nlist: int, seed: int = 0):
+        """
+        Train IVF centroids on the current rows and assign every row to one
+
+        Args:
+            nlist: Number of clusters (0 picks the square root of the number of rows)
+            seed: Seed of the training sample
+        """
+        vectors = self.vectors
+        centroids = train_centroids(vectors, nlist or default_nlist(len(vectors)), seed=seed)
+        assignments = np.empty(self._matrix.shape[0], dtype=np.int32)
+        assignments[:len(vectors)] = assign_to_centroids(vectors, centroids)
+        # Swapped in together so concurrent searches see either index, not a mix
+        self.centroids, self._assignments = centroids, assignments
+        self._changed()
+        self.inverted_lists()
+
+    def drop_ivf(self):
+        self.centroids = None
+        self._assignments = None
+        self._changed()
+
+    def build_codes(self, quantile: float):
+        """
+        Fit an int8 scalar quantizer to the current rows and encode every row
+
+        Args:
+            quantile: Share of each dimension's absolute values kept inside the int8 range
+        """
+        quantizer = ScalarQuantizer.fit(self.vectors, quantile)
+        codes = np.empty((self._matrix.shape[0], self.dimension), dtype=np.int8)
+        codes[:len(self.ids)] = quantizer.encode(self.vectors)
+        self.quantizer, self._codes = quantizer, codes
+        self._changed()
+
+    def drop_codes(self):
+        self.quantizer = None
+        self._codes = None
+        self._changed()
+
+    def inverted_lists(self) -> InvertedLists:
+        lists = self._lists
+        if lists is None or lists[0] != self.revision:
+            lists = (self.revision, InvertedLists(self.assignments, len(self.centroids)))
+            self._lists = lists
+        return lists[1]
+
+    def search(
+        self,
+        queries: np.ndarray,
+        plans: List[Tuple[int, Optional[models.Filter], Optional[float], bool, bool, Optional[float]]],
+        nprobe: int
+    ) -> List[List[Tuple[int, float]]]:
+        """
+        Best rows for each query
+
+        Exact requests, and every request while no IVF index is built, are
+        scored against all rows with one matrix product per kind of scoring
+        (float32 rows or int8 codes); the others probe the IVF index.
+
+        Args:
+            queries: One query vector per request
+            plans: (limit, filter, score_threshold, exact, use_codes, oversampling) per request;
+                oversampling is None when code scores are not rescored
+            nprobe: Clusters probed by approximate requests
+
+        Returns:
+            For each request, (row, score) pairs, best first
+        """
+        queries = self._prepare(queries)
+        results = [None] * len(plans)
+        exact = [i for i, plan in enumerate(plans) if plan[3] or self.centroids is None]
+        for use_codes in (False, True):
+            group = [i for i in exact if self._uses_codes(plans[i]) == use_codes]
+            if not group:
+                continue
+            if use_codes:
+                scores = self.quantizer.scores(self.codes, queries[group])
+            else:
+                scores = self.vectors @ queries[group].T
+            for column, i in enumerate(group):
+                limit, filter_, score_threshold, _, _, oversampling = plans[i]
+                rows = self.filter_rows(filter_) if filter_ is not None else None
+                row_scores = scores[:, column] if rows is None else scores[rows, column]
+                results[i] = self._rank(
+                    queries[i], row_scores, rows, limit, score_threshold, oversampling if use_codes else None
+                )
+        for i, plan in enumerate(plans):
+            if results[i] is None:
+                results[i] = self._search_ivf(queries[i], plan, nprobe)
+        return results
+
+    def _uses_codes(self, plan) -> bool:
+        return plan[4] and self.quantizer is not None
+
+    def _rank(
+        self,
+        query: np.ndarray,
+        scores: np.ndarray,
+        rows: Optional[np.ndarray],
+        limit: int,
+        score_threshold: Optional[float],
+        oversampling: Optional[float]
+    ) -> List[Tuple[int, float]]:
+        """Top rows by scores, after rescoring limit * oversampling candidates with the float32 rows"""
+        if oversampling is None:
+            return self.top_k(scores, rows, limit, score_threshold)
+        shortlist = self.top_k(scores, rows, max(limit, math.ceil(limit * oversampling)))
+        # Sorted so a memory-mapped matrix is read front to back
+        candidates = np.sort(np.array([row for row, _ in shortlist], dtype=np.int64))
+        return self.top_k(self.vectors[candidates] @ query, candidates, limit, score_threshold)
+
+    def _scan(self, query: np.ndarray, rows: np.ndarray, plan) -> List[Tuple[int, float]]:
+        """Top rows among the given rows"""
+        limit, _, score_threshold, _, _, oversampling = plan
+        if self._uses_codes(plan):
+            scores = self.quantizer.scores(self.codes[rows], query[None])[:, 0]
+            return self._rank(query, scores, rows, limit, score_threshold, oversampling)
+        return self.top_k(self.vectors[rows] @ query, rows, limit, score_threshold)
+
+    def _search_ivf(self, query: np.ndarray, plan, nprobe: int) -> List[Tuple[int, float]]:
+        limit, filter_ = plan[0], plan[1]
+        candidates = self.inverted_lists().rows(probe(self.centroids, query, nprobe))
+        if filter_ is not None:
+            mask = self.filter_mask(filter_)
+            matching = self.filter_rows(filter_)
+            # A selective filter is cheaper (and exact) to search directly
+            if len(matching) <= len(candidates):
+                return self._scan(query, matching, plan)
+            candidates = candidates[mask[candidates]]
+        hits = self._scan(query, candidates, plan)
+        if filter_ is not None and len(hits) < limit:
+            # The probed clusters held too few matching rows; fall back to every matching row
+            hits = self._scan(query, self.filter_rows(filter_), plan)
+        return hits
+
+    @staticmethod
+    def top_k(
+        scores: np.ndarray,
+        rows: Optional[np.ndarray],
+        limit: int,
+        score_threshold: Optional[float] = None
+    ) -> List[Tuple[int, float]]:
+        """
+        Best rows given their scores
+
+        Args:
+            scores: Score of each candidate
+            rows: Row of each candidate (None when the candidates are all rows in order)
+            limit: Number of rows to return
+            score_threshold: Optional minimum score
+
+        Returns:
+            (row, score) pairs, best first
+        """
+        if score_threshold is not None:
+            above = np.flatnonzero(scores >= score_threshold)
+            rows = above if rows is None else rows[above]
+            scores = scores[above]
+        if limit <= 0 or len(scores) == 0:
+            return []
+
+        if len(scores) > limit:
+            # Linear-time selection of the best `limit`, then sort only those
+            best = np.argpartition(-scores, limit - 1)[:limit]
+        else:
+            best = np.arange(len(scores))
+        best = best[np.argsort(-scores[best], kind="stable")]
+        selected = best if rows is None else rows[best]
+        return [(int(row), float(score)) for row, score in zip(selected, scores[best])]
+
+    def scroll(self, filter_: Optional[models.Filter], offset: int, limit: int) -> Tuple[List[int], Optional[int]]:
+        rows = self.filter_rows(filter_)
+        start = int(np.searchsorted(rows, offset))
+        page = rows[start:start + limit]
+        following = rows[start + limit] if start + limit < len(rows) else None
+        return [int(row) for row in page], None if following is None else int(following)
+
+    def record(self, row: int, with_payload: Any = True, with_vectors: bool = False) -> models.Record:
+        return models.Record(
+            id=self.ids[row],
+            payload=_select_payload(self.payloads[row], with_payload),
+            vector=self.vectors[row].tolist() if with_vectors else None
+        )
+
+    def save(self, directory: str, generation: int):
+        """
+        Persist the collection atomically
+
+        The matrix (and the int8 codes) go to new generation files first;
+        points.pkl, which names that generation, is replaced last, so
+        readers always see matching arrays and point list.
+        """
+        os.makedirs(directory, exist_ok=True)
+        vectors_name = f"vectors-{generation}.npy"
+        codes_name = f"codes-{generation}.npy" if self.codes is not None else None
+        for name, array in ((vectors_name, self.vectors), (codes_name, self.codes)):
+            if name is None:
+                continue
+            tmp_path = os.path.join(directory, f"{name}.tmp")
+            with open(tmp_path, 'wb') as file:
+                np.save(file, np.ascontiguousarray(array))
+            os.replace(tmp_path, os.path.join(directory, name))
+
+        points_path = os.path.join(directory, "points.pkl")
+        tmp_path = f"{points_path}.tmp"
+        with open(tmp_path, 'wb') as file:
+            pickle.dump(
+                {"dimension": self.dimension, "distance": self.distance.value, "vectors": vectors_name,
+                 "ids": self.ids, "payloads": self.payloads,
+                 "centroids": self.centroids, "assignments": self.assignments,
+                 "scales": None if self.quantizer is None else self.quantizer.scales, "codes": codes_name},
+                file,
+                protocol=pickle.HIGHEST_PROTOCOL
+            )
+        os.replace(tmp_path, points_path)
+
+        for name in os.listdir(directory):
+            if name.startswith(("vectors-", "codes-")) and name.endswith(".npy") and name not in (vectors_name, codes_name):
+                try:
+                    os.remove(os.path.join(directory, name))
+                except OSError:
+                    pass
+
+    @classmethod
+    def load(cls, directory: str) -> "LocalCollection":
+        """Load a collection written by save, memory-mapping its matrix"""
+        with open(os.path.join(directory, "points.pkl"), 'rb') as file:
+            state = pickle.load(file)
+        collection = cls(state["dimension"], models.Distance(state["distance"]))
+        collection.ids = state["ids"]
+        collection.payloads = state["payloads"]
+        collection.rows = {str(id_): row for row, id_ in enumerate(collection.ids)}
+        # Rows were normalized when they were written, so the file is used as is
+        matrix = np.load(os.path.join(directory, state["vectors"]), mmap_mode="r")
+        if matrix.shape != (len(collection.ids), collection.dimension):
+            raise ValueError(f"Vector file of {directory} does not match its points")
+        collection._matrix = matrix
+        if state.get("centroids") is not None:
+            collection.centroids = state["centroids"]
+            collection._assignments = state["assignments"]
+        if state.get("codes") is not None:
+            # Codes are read into memory; they are what every search scans
+            collection.quantizer = ScalarQuantizer(state["scales"])
+            collection._codes = np.load(os.path.join(directory, state["codes"]))
+        return collection
+
+
+class LocalVectorIndex:
+    """
+    In-process replacement for AsyncQdrantClient backed by NumPy
+
+    Implements the subset of the client API the VectorStoreManager uses, so
+    a single-node deployment can serve searches without a network hop.
+    With index_type "flat" searches are exact: one matrix product over all
+    rows, then argpartition for the top k. With "ivf", collections that
+    build_index was run on are searched approximately through their IVF
+    index (nprobe clusters per query) unless a request asks for exact
+    search. With quantization "int8", build_index also encodes the rows as
+    int8 codes, which searches scan instead of the float32 rows; like
+    Qdrant, rescoring and oversampling default to the index settings and
+    can be set per request (SearchParams.quantization). Each collection
+    lives in its own directory under path;
+    writes made with wait=True are persisted before returning (together
+    with any earlier wait=False writes, which flush persists on demand),
+    and a process that has no unsaved changes picks up collections
+    rewritten by another process (such as ingest_content.py) within a
+    second, reading them in a worker thread.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        index_type: str = "flat",
+        nlist: int = 0,
+        nprobe: int = 8,
+        min_points: int = 50000,
+        quantization: str = "none",
+        quantile: float = 0.99,
+        rescore: bool = True,
+        oversampling: float = 2.0
+    ):
+        if index_type not in ("flat", "ivf"):
+            raise ValueError(f"Unknown local index type: {index_type}")
+        if quantization not in ("none", "int8"):
+            raise ValueError(f"Unknown vector quantization: {quantization}")
+        self.path = path
+        self.index_type = index_type
+        self.nlist = nlist
+        self.nprobe = max(nprobe, 1)
+        self.min_points = min_points
+        self.quantization = quantization
+        self.quantile = quantile
+        self.rescore = rescore
+        self.oversampling = oversampling
+        self._collections = {}  # name -> LocalCollection
+        self._mtimes = {}  # name -> mtime of points.pkl when loaded or saved
+        self._checked_at = {}  # name -> monotonic time of the last reload check
+        self._reloading = {}  # name -> future of the reload in progress
+        self._dirty = set()
+        self._generation = int(time.time() * 1000)
+        self._write_lock = None
+
+        self.searches = 0
+        self.approximate_searches = 0
+        self.quantized_searches = 0
+        self.offloaded_searches = 0
+        self.reloads = 0
+        self.saves = 0
+
+    def _directory(self, collection_name: str) -> str:
+        return os.path.join(self.path, collection_name)
+
+    def _points_mtime(self, collection_name: str) -> Optional[float]:
+        try:
+            return os.path.getmtime(os.path.join(self._directory(collection_name), "points.pkl"))
+        except OSError:
+            return None
+
+    def _load_if_changed(
+        self, collection_name: str, known_mtime: Optional[float]
+    ) -> Tuple[Optional[float], Optional[LocalCollection]]:
+        """The mtime of points.pkl, and the collection loaded from it if that differs from known_mtime"""
+        mtime = self._points_mtime(collection_name)
+        if mtime is None or mtime == known_mtime:
+            return mtime, None
+        return mtime, LocalCollection.load(self._directory(collection_name))
+
+    async def _reload(self, collection_name: str, locked: bool) -> LocalCollection:
+        """Pick up a newer copy of the collection written by another process"""
+        self._checked_at[collection_name] = time.monotonic()
+        known_mtime = self._mtimes.get(collection_name)
+        # Checking the file and reading it run in a worker thread
+        mtime, loaded = await asyncio.to_thread(self._load_if_changed, collection_name, known_mtime)
+        if loaded is not None:
+            if locked:
+                self._swap(collection_name, known_mtime, mtime, loaded)
+            else:
+                async with self._lock():
+                    self._swap(collection_name, known_mtime, mtime, loaded)
+        collection = self._collections.get(collection_name)
+        if collection is None:
+            raise ValueError(f"Collection {collection_name} not found")
+        return collection
+
+    def _swap(self, collection_name: str, known_mtime: Optional[float], mtime: float, loaded: LocalCollection):
+        # Writes made by this process while the file was read take precedence
+        if collection_name in self._dirty or self._mtimes.get(collection_name) != known_mtime:
+            return
+        self._collections[collection_name] = loaded
+        self._mtimes[collection_name] = mtime
+        self.reloads += 1
+
+    async def _get(self, collection_name: str, locked: bool = False) -> LocalCollection:
+        """
+        The collection, reloaded if another process rewrote it
+
+        Concurrent readers share one reload; writers holding the write lock
+        pass locked=True and reload on their own, as the shared reload waits
+        for the lock to swap the new copy in.
+        """
+        collection = self._collections.get(collection_name)
+        if collection is not None and (
+            collection_name in self._dirty
+            or time.monotonic() - self._checked_at.get(collection_name, 0.0) < RELOAD_CHECK_SECONDS
+        ):
+            return collection
+        if locked:
+            return await self._reload(collection_name, locked=True)
+        reload = self._reloading.get(collection_name)
+        if reload is None or reload.done():
+            reload = asyncio.ensure_future(self._reload(collection_name, locked=False))
+            self._reloading[collection_name] = reload
+        return await asyncio.shield(reload)
+
+    def _lock(self) -> asyncio.Lock:
+        # Created lazily so the lock binds to the running event loop
+        if self._write_lock is None:
+            self._write_lock = asyncio.Lock()
+        return self._write_lock
+
+    async def _written(self, collection_name: str, wait: bool):
+        self._dirty.add(collection_name)
+        if wait:
+            await self._flush()
+
+    async def _flush(self):
+        """Persist every collection with unsaved changes"""
+        for collection_name in list(self._dirty):
+            collection = self._collections.get(collection_name)
+            self._dirty.discard(collection_name)
+            directory = self._directory(collection_name)
+            if collection is None:
+                await asyncio.to_thread(_remove_directory, directory)
+                self._mtimes.pop(collection_name, None)
+                continue
+            self._generation += 1
+            await asyncio.to_thread(collection.save, directory, self._generation)
+            self._mtimes[collection_name] = self._points_mtime(collection_name)
+            self.saves += 1
+
+    async def get_collection(self, collection_name: str) -> models.CollectionInfo:
+        collection = await self._get(collection_name)
+        # Built without validation: only the fields the application reads are meaningful
+        return models.CollectionInfo.model_construct(
+            status=models.CollectionStatus.GREEN,
+            optimizer_status=models.OptimizersStatusOneOf.OK,
+            vectors_count=len(collection),
+            indexed_vectors_count=len(collection),
+            points_count=len(collection),
+            segments_count=1,
+            config=models.CollectionConfig.model_construct(
+                params=models.CollectionParams.model_construct(
+                    vectors=models.VectorParams(size=collection.dimension, distance=collection.distance)
+                )
+            ),
+            payload_schema={}
+        )
+
+    async def create_collection(self, collection_name: str, vectors_config: models.VectorParams, **kwargs) -> bool:
+        async with self._lock():
+            if collection_name in self._collections or self._points_mtime(collection_name) is not None:
+                raise ValueError(f"Collection {collection_name} already exists")
+            self._collections[collection_name] = LocalCollection(vectors_config.size, vectors_config.distance)
+            await self._written(collection_name, wait=True)
+        return True
+
+    async def delete_collection(self, collection_name: str, **kwargs) -> bool:
+        async with self._lock():
+            existed = self._collections.pop(collection_name, None) is not None
+            existed = existed or self._points_mtime(collection_name) is not None
+            await self._written(collection_name, wait=True)
+        return existed
+
+    async def create_payload_index(self, **kwargs):
+        # Filters are evaluated over the payloads in memory; there is nothing to index
+        return None
+
+    async def upsert(self, collection_name: str, points: List[models.PointStruct], wait: bool = True, **kwargs):
+        async with self._lock():
+            collection = await self._get(collection_name, locked=True)
+            collection.upsert(points)
+            await self._written(collection_name, wait)
+
+    async def set_payload(
+        self, collection_name: str, payload: Dict[str, Any], points: List[Any], wait: bool = True, **kwargs
+    ):
+        async with self._lock():
+            collection = await self._get(collection_name, locked=True)
+            collection.set_payload(payload, points)
+            await self._written(collection_name, wait)
+
+    async def batch_update_points(
+        self, collection_name: str, update_operations: List[Any], wait: bool = True, **kwargs
+    ):
+        async with self._lock():
+            collection = await self._get(collection_name, locked=True)
+            for operation in update_operations:
+                if not isinstance(operation, models.SetPayloadOperation):
+                    raise ValueError(f"Unsupported update operation: {type(operation).__name__}")
+                collection.set_payload(operation.set_payload.payload, operation.set_payload.points)
+            await self._written(collection_name, wait)
+
+    async def delete(self, collection_name: str, points_selector: Any, wait: bool = True, **kwargs):
+        async with self._lock():
+            collection = await self._get(collection_name, locked=True)
+            if isinstance(points_selector, models.PointIdsList):
+                ids = points_selector.points
+            elif isinstance(points_selector, models.FilterSelector):
+                ids = [collection.ids[row] for row in collection.filter_rows(points_selector.filter)]
+            else:
+                raise ValueError(f"Unsupported points selector: {type(points_selector).__name__}")
+            collection.delete(ids)
+            await self._written(collection_name, wait)
+
+    async def retrieve(
+        self, collection_name: str, ids: List[Any], with_payload: Any = True, with_vectors: bool = False, **kwargs
+    ) -> List[models.Record]:
+        collection = await self._get(collection_name)
+        rows = [collection.rows[str(id_)] for id_ in ids if str(id_) in collection.rows]
+        return [collection.record(row, with_payload, with_vectors) for row in rows]
+
+    async def scroll(
+        self,
+        collection_name: str,
+        scroll_filter: Optional[models.Filter] = None,
+        limit: int = 10,
+        offset: Optional[int] = None,
+        with_payload: Any = True,
+        with_vectors: bool = False,
+        **kwargs
+    ) -> Tuple[List[models.Record], Optional[int]]:
+        # Offsets are row positions; like Qdrant's, they are only stable while nothing is deleted
+        collection = await self._get(collection_name)
+        rows, next_offset = collection.scroll(scroll_filter, offset or 0, limit)
+        return [collection.record(row, with_payload, with_vectors) for row in rows], next_offset
+
+    def _plan(
+        self,
+        limit: int,
+        filter_: Optional[models.Filter],
+        score_threshold: Optional[float],
+        params: Optional[models.SearchParams]
+    ) -> Tuple[int, Optional[models.Filter], Optional[float], bool, bool, Optional[float]]:
+        """How to answer one request: (limit, filter, score_threshold, exact, use_codes, oversampling)"""
+        quantization = params.quantization if params is not None else None
+        # A flat index ignores IVF data left on disk by an earlier configuration, and
+        # quantization "none" ignores int8 codes
+        exact = self.index_type == "flat" or bool(params is not None and params.exact)
+        use_codes = self.quantization == "int8" and not (quantization is not None and quantization.ignore)
+        rescore = self.rescore if quantization is None or quantization.rescore is None else quantization.rescore
+        oversampling = self.oversampling
+        if quantization is not None and quantization.oversampling is not None:
+            oversampling = quantization.oversampling
+        return limit, filter_, score_threshold, exact, use_codes, oversampling if rescore else None
+
+    async def _search(
+        self,
+        collection: LocalCollection,
+        queries: List[List[float]],
+        plans: List[Tuple[int, Optional[models.Filter], Optional[float], bool, bool, Optional[float]]]
+    ) -> List[List[Tuple[int, float]]]:
+        """Top rows for each request, computed off the event loop for large collections"""
+        self.searches += len(plans)
+        if collection.centroids is not None:
+            self.approximate_searches += sum(1 for plan in plans if not plan[3])
+        if collection.quantizer is not None:
+            self.quantized_searches += sum(1 for plan in plans if plan[4])
+        if len(collection) * collection.dimension < OFFLOAD_MIN_FLOATS:
+            return collection.search(np.asarray(queries), plans, self.nprobe)
+        revision = collection.revision
+        results = await asyncio.to_thread(collection.search, np.asarray(queries), plans, self.nprobe)
+        self.offloaded_searches += len(plans)
+        if collection.revision != revision:
+            # Points changed while searching; rows no longer line up with the result
+            results = collection.search(np.asarray(queries), plans, self.nprobe)
+        return results
+
+    def _scored_points(
+        self, collection: LocalCollection, hits: List[Tuple[int, float]], with_payload: Any, with_vectors: bool
+    ) -> List[models.ScoredPoint]:
+        return [
+            models.ScoredPoint(
+                id=collection.ids[row],
+                version=collection.revision,
+                score=score,
+                payload=_select_payload(collection.payloads[row], with_payload),
+                vector=collection.vectors[row].tolist() if with_vectors else None
+            )
+            for row, score in hits
+        ]
+
+    async def search(
+        self,
+        collection_name: str,
+        query_vector: List[float],
+        limit: int = 10,
+        query_filter: Optional[models.Filter] = None,
+        score_threshold: Optional[float] = None,
+        with_payload: Any = True,
+        with_vectors: bool = False,
+        search_params: Optional[models.SearchParams] = None,
+        **kwargs
+    ) -> List[models.ScoredPoint]:
+        collection = await self._get(collection_name)
+        if len(collection) == 0:
+            return []
+        hits = await self._search(
+            collection, [query_vector], [self._plan(limit, query_filter, score_threshold, search_params)]
+        )
+        return self._scored_points(collection, hits[0], with_payload, with_vectors)
+
+    async def search_batch(
+        self, collection_name: str, requests: List[models.SearchRequest], **kwargs
+    ) -> List[List[models.ScoredPoint]]:
+        collection = await self._get(collection_name)
+        if len(collection) == 0 or not requests:
+            return [[] for _ in requests]
+        # Exact requests share one matrix-matrix product
+        results = await self._search(
+            collection,
+            [request.vector for request in requests],
+            [self._plan(request.limit, request.filter, request.score_threshold, request.params) for request in requests]
+        )
+        return [
+            self._scored_points(
+                collection,
+                hits,
+                request.with_payload if request.with_payload is not None else False,
+                bool(request.with_vector)
+            )
+            for hits, request in zip(results, requests)
+        ]
+
+    async def build_index(self, collection_name: str) -> Dict[str, Any]:
+        """
+        (Re)build the IVF index and int8 codes of a collection and persist them
+
+        Not part of the Qdrant API. The IVF index is built with index_type
+        "ivf" for cosine collections of at least min_points points (exact
+        search is fast enough for smaller ones); codes are built with
+        quantization "int8". Structures the settings no longer ask for are
+        dropped.
+
+        Args:
+            collection_name: Collection to index
+
+        Returns:
+            The collection's entry of stats()
+        """
+        async with self._lock():
+            collection = await self._get(collection_name, locked=True)
+            cosine = collection.distance == models.Distance.COSINE
+            changed = False
+            if self.index_type == "ivf" and cosine and len(collection) >= self.min_points:
+                # k-means over a sample, then one assignment pass over every row
+                await asyncio.to_thread(collection.build_ivf, self.nlist)
+                changed = True
+            elif collection.centroids is not None:
+                collection.drop_ivf()
+                changed = True
+            if self.quantization == "int8" and cosine and len(collection) > 0:
+                await asyncio.to_thread(collection.build_codes, self.quantile)
+                changed = True
+            elif collection.quantizer is not None:
+                collection.drop_codes()
+                changed = True
+            if changed:
+                await self._written(collection_name, wait=True)
+        return self._collection_stats(collection)
+
+    async def flush(self):
+        """
+        Persist the writes made with wait=False so far
+
+        Not part of the Qdrant API, whose writes are durable once
+        acknowledged.
+        """
+        async with self._lock():
+            await self._flush()
+
+    async def close(self, **kwargs):
+        """Persist unsaved changes"""
+        async with self._lock():
+            await self._flush()
+
+    @staticmethod
+    def _collection_stats(collection: LocalCollection) -> Dict[str, Any]:
+        return {
+            "points": len(collection),
+            "dimension": collection.dimension,
+            "memory_mapped": collection.memory_mapped,
+            "vector_bytes": collection.vectors.nbytes,
+            "quantization": None if collection.quantizer is None else "int8",
+            "code_bytes": 0 if collection.codes is None else collection.codes.nbytes,
+            "ivf_lists": None if collection.centroids is None else len(collection.centroids),
+            "largest_ivf_list": None if collection.centroids is None else int(
+                list_sizes(collection.assignments, len(collection.centroids)).max()
+            ),
+        }
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "collections": {
+                name: self._collection_stats(collection) for name, collection in self._collections.items()
+            },
+            "index_type": self.index_type,
+            "nprobe": self.nprobe,
+            "quantization": self.quantization,
+            "searches": self.searches,
+            "approximate_searches": self.approximate_searches,
+            "quantized_searches": self.quantized_searches,
+            "offloaded_searches": self.offloaded_searches,
+            "reloads": self.reloads,
+            "saves": self.saves,
+            "unsaved_collections": len(self._dirty),
+        }
+
+
+def _remove_directory(directory: str):
+    if not os.path.isdir(directory):
+        return
+    for name in os.listdir(directory):
+        os.remove(os.path.join(directory, name))
+    os.rmdir(directory)
@@ -0,0 +1,93 @@
+from typing import Optional
+import numpy as np
+from qdrant_client.http import models
+from app.core.config import settings
+
+# Rows dequantized per matrix product: the float32 copy of a block stays
+# small enough for the CPU cache instead of doubling the memory footprint
+SCORE_BLOCK_ROWS = 4096
+# Points sampled to estimate the value range of each dimension
+FIT_SAMPLE_POINTS = 100000
+
+
+class ScalarQuantizer:
+    """
+    Symmetric per-dimension int8 quantization of vectors
+
+    Each dimension is scaled so that the given quantile of its absolute
+    values maps to 127; rarer, larger values are clipped. A vector is
+    stored as int8 codes (a quarter of float32), and the dot product with
+    a query is computed as codes @ (query * scales).
+    """
+
+    def __init__(self, scales: np.ndarray):
+        self.scales = np.asarray(scales, dtype=np.float32)
+
+    @classmethod
+    def fit(cls, vectors: np.ndarray, quantile: float = 0.99, seed: int = 0) -> "ScalarQuantizer":
+        """
+        Estimate the scales from (a sample of) the vectors
+
+        Args:
+            vectors: Row vectors to be quantized
+            quantile: Share of the absolute values of a dimension kept inside the int8 range
+            seed: Seed of the sampling
+
+        Returns:
+            Fitted quantizer
+        """
+        if len(vectors) > FIT_SAMPLE_POINTS:
+            rng = np.random.default_rng(seed)
+            vectors = vectors[np.sort(rng.choice(len(vectors), FIT_SAMPLE_POINTS, replace=False))]
+        limits = np.quantile(np.abs(np.asarray(vectors, dtype=np.float32)), quantile, axis=0)
+        return cls(np.where(limits > 0, limits, 1.0) / 127.0)
+
+    def encode(self, vectors: np.ndarray) -> np.ndarray:
+        """int8 codes of row vectors"""
+        return np.clip(np.rint(np.asarray(vectors, dtype=np.float32) / self.scales), -127, 127).astype(np.int8)
+
+    def decode(self, codes: np.ndarray) -> np.ndarray:
+        return codes.astype(np.float32) * self.scales
+
+    def scores(self, codes: np.ndarray, queries: np.ndarray) -> np.ndarray:
+        """
+        Approximate dot products of coded rows with queries
+
+        Args:
+            codes: (rows, dimension) int8 codes
+            queries: (queries, dimension) float32 query vectors
+
+        Returns:
+            (rows, queries) float32 scores
+        """
+        scaled = (np.asarray(queries, dtype=np.float32) * self.scales).T
+        scores = np.empty((len(codes), scaled.shape[1]), dtype=np.float32)
+        for start in range(0, len(codes), SCORE_BLOCK_ROWS):
+            block = codes[start:start + SCORE_BLOCK_ROWS]
+            scores[start:start + len(block)] = block.astype(np.float32) @ scaled
+        return scores
+
+
+def qdrant_quantization_config() -> Optional[models.ScalarQuantization]:
+    """Qdrant scalar quantization of the collection configured in settings (None when disabled)"""
+    if settings.VECTOR_QUANTIZATION != "int8":
+        return None
+    return models.ScalarQuantization(
+        scalar=models.ScalarQuantizationConfig(
+            type=models.ScalarType.INT8,
+            quantile=settings.QUANTIZATION_QUANTILE,
+            always_ram=True  # Only the int8 codes are held in RAM; originals stay on disk
+        )
+    )
+
+
+def quantization_search_params() -> Optional[models.SearchParams]:
+    """Search parameters telling Qdrant (or the local index) how to use the int8 codes"""
+    if settings.VECTOR_QUANTIZATION != "int8":
+        return None
+    return models.SearchParams(
+        quantization=models.QuantizationSearchParams(
+            rescore=settings.QUANTIZATION_RESCORE,
+            oversampling=settings.QUANTIZATION_OVERSAMPLING
+        )
+    )
@@ -0,0 +1,39 @@
+import re
+from typing import List
+from app.utils.answer_extraction import QueryMatcher
+
+# Boundaries between the parts of a compound question: question marks,
+# semicolons and "and" / "or" followed by a new question word
+QUESTION_BOUNDARY = re.compile(
+    r"[?;]\s*|,?\s+(?:and|or)\s+(?=(?:who|whom|whose|what|when|where|why|how|which|"
+    r"is|are|was|were|did|does|do|can|could|will|would)\b)",
+    re.IGNORECASE
+)
+
+
+def expand_query(query: str, max_variants: int) -> List[str]:
+    """
+    Search variants of a question for multi-query retrieval
+
+    A compound question ("Who was Ahab and why did he hunt the whale?") is
+    searched as a whole and as each of its parts, so every part gets its own
+    chance to pull in matching chunks; the result lists are fused afterwards.
+    Questions with a single part are not expanded.
+
+    Args:
+        query: User's question
+        max_variants: Maximum number of variants including the question itself
+
+    Returns:
+        The question followed by its parts, at most max_variants strings
+    """
+    variants = [query]
+    if max_variants <= 1:
+        return variants
+
+    parts = [part.strip(" ,") for part in QUESTION_BOUNDARY.split(query)]
+    # Fragments without a content term ("and why?") add nothing to search with
+    parts = [part for part in parts if QueryMatcher(part).terms]
+    if len(parts) > 1:
+        variants.extend(parts[:max_variants - 1])
+    return variants
@@ -0,0 +1,224 @@
+import asyncio
+import time
+from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Any, Optional, Tuple
+import numpy as np
+from langchain_core.documents import Document
+from app.core.config import settings
+from app.utils.text_processing import tokenize_terms
+
+
+def _min_max(values: np.ndarray) -> np.ndarray:
+    """Scale values to [0, 1] (all ones when they are equal)"""
+    spread = values.max() - values.min()
+    if spread <= 0:
+        return np.ones_like(values)
+    return (values - values.min()) / spread
+
+
+def lexical_scores(query: str, texts: List[str], k1: float = 1.5, b: float = 0.75) -> np.ndarray:
+    """
+    Lexical relevance of candidate chunks to a query, in [0, 1]
+
+    The mean of three signals, each scaled to [0, 1]: BM25 with document
+    frequencies taken over the candidates themselves (terms every
+    candidate shares do not discriminate between them), the IDF-weighted
+    share of query terms a chunk contains, and the share of the query's
+    adjacent term pairs that also appear adjacent in the chunk. Chunks are
+    tokenized once; the scoring is matrix arithmetic over the
+    (candidates, query terms) frequency matrix.
+
+    Args:
+        query: Query text
+        texts: Candidate chunk texts
+        k1: BM25 term frequency saturation
+        b: BM25 document length normalization
+
+    Returns:
+        (candidates,) float32 scores
+    """
+    query_terms = tokenize_terms(query)
+    terms = list(dict.fromkeys(query_terms))
+    if not terms or not texts:
+        return np.zeros(len(texts), dtype=np.float32)
+
+    column = {term: i for i, term in enumerate(terms)}
+    query_pairs = set(zip(query_terms, query_terms[1:]))
+    frequencies = np.zeros((len(texts), len(terms)), dtype=np.float32)
+    lengths = np.empty(len(texts), dtype=np.float32)
+    phrases = np.zeros(len(texts), dtype=np.float32)
+    for row, text in enumerate(texts):
+        doc_terms = tokenize_terms(text)
+        lengths[row] = len(doc_terms)
+        frequencies[row] = np.bincount(
+            [column[term] for term in doc_terms if term in column], minlength=len(terms)
+        )
+        if query_pairs:
+            phrases[row] = len(query_pairs.intersection(zip(doc_terms, doc_terms[1:]))) / len(query_pairs)
+
+    present = frequencies > 0
+    document_frequency = present.sum(axis=0)
+    idf = np.log1p((len(texts) - document_frequency + 0.5) / (document_frequency + 0.5)).astype(np.float32)
+    norm = k1 * (1 - b + b * lengths / (lengths.mean() or 1.0))
+    bm25 = (frequencies * (k1 + 1) / (frequencies + norm[:, None])) @ idf
+    coverage = present @ idf / idf.sum()
+    return ((bm25 / (bm25.max() or 1.0) + coverage + phrases) / 3).astype(np.float32)
+
+
+class Reranker(ABC):
+    """
+    Second-stage ranking of retrieved chunks on the CPU
+
+    Retrieval over-fetches candidates cheaply; a reranker scores each
+    (question, candidate) pair more carefully and keeps the best k. Scoring
+    is CPU-bound, so it runs in a small dedicated thread pool rather than
+    on the event loop (or in the default executor, which the lexical index
+    searches use).
+    """
+
+    name = "base"
+
+    def __init__(self, workers: int = 1):
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="rerank")
+        self.queries = 0
+        self.candidates_scored = 0
+        self.total_seconds = 0.0
+
+    def load(self):
+        """Prepare the model; may block, so it is called in the reranker's thread pool"""
+
+    async def warm_up(self):
+        """Load the model at startup, in the reranker's thread pool"""
+        await asyncio.get_running_loop().run_in_executor(self._executor, self.load)
+
+    @abstractmethod
+    def score(self, queries: List[str], candidates: List[List[Tuple[Document, float]]]) -> List[np.ndarray]:
+        """
+        Relevance of each candidate to its question
+
+        Args:
+            queries: Questions
+            candidates: Per question, the (Document, retrieval score) pairs to score
+
+        Returns:
+            Per question, one score per candidate (higher is better)
+        """
+
+    def _rerank(self, queries: List[str], candidates: List[List[Tuple[Document, float]]], k: int):
+        self.load()
+        ranked = []
+        for scored_docs, scores in zip(candidates, self.score(queries, candidates)):
+            best = np.argsort(-scores, kind="stable")[:k]
+            ranked.append([(scored_docs[i][0], float(scores[i])) for i in best])
+        return ranked
+
+    async def rerank(
+        self,
+        queries: List[str],
+        candidates: List[List[Tuple[Document, float]]],
+        k: int
+    ) -> List[List[Tuple[Document, float]]]:
+        """
+        Keep the k best candidates of each question by reranker score
+
+        Args:
+            queries: Questions
+            candidates: Per question, (Document, retrieval score) pairs, best first
+            k: Number of results to keep per question
+
+        Returns:
+            Per question, (Document, reranker score) pairs, best first
+        """
+        started = time.perf_counter()
+        ranked = await asyncio.get_running_loop().run_in_executor(
+            self._executor, self._rerank, queries, candidates, k
+        )
+        self.queries += len(queries)
+        self.candidates_scored += sum(len(scored_docs) for scored_docs in candidates)
+        self.total_seconds += time.perf_counter() - started
+        return ranked
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "reranker": self.name,
+            "queries": self.queries,
+            "candidates_scored": self.candidates_scored,
+            "avg_candidates": self.candidates_scored / self.queries if self.queries else 0.0,
+            "avg_ms": 1000 * self.total_seconds / self.queries if self.queries else 0.0,
+        }
+
+
+class LexicalReranker(Reranker):
+    """
+    Blend of the retrieval score with the lexical overlap of question and chunk
+
+    Needs no model. Retrieval scores are min-max scaled per question so
+    cosine similarities and fused rank scores blend alike.
+    """
+
+    name = "lexical"
+
+    def __init__(self, weight: float = 0.5, k1: float = 1.5, b: float = 0.75, workers: int = 1):
+        super().__init__(workers)
+        self.weight = weight
+        self.k1 = k1
+        self.b = b
+
+    def score(self, queries: List[str], candidates: List[List[Tuple[Document, float]]]) -> List[np.ndarray]:
+        scores = []
+        for query, scored_docs in zip(queries, candidates):
+            if not scored_docs:
+                scores.append(np.zeros(0, dtype=np.float32))
+                continue
+            retrieval = _min_max(np.array([score for _, score in scored_docs], dtype=np.float32))
+            lexical = lexical_scores(query, [doc.page_content for doc, _ in scored_docs], self.k1, self.b)
+            scores.append((1 - self.weight) * retrieval + self.weight * lexical)
+        return scores
+
+
+class CrossEncoderReranker(Reranker):
+    """Local sentence-transformers cross-encoder reading question and chunk together"""
+
+    name = "cross-encoder"
+
+    def __init__(self, model: str, batch_size: int = 32, workers: int = 1):
+        try:
+            import sentence_transformers  # noqa: F401
+        except ImportError as e:
+            raise ImportError("The 'sentence-transformers' package is required for RERANKER=cross-encoder") from e
+        super().__init__(workers)
+        self.model = model
+        self.batch_size = batch_size
+        self._model = None
+
+    def load(self):
+        if self._model is None:
+            from sentence_transformers import CrossEncoder
+            self._model = CrossEncoder(self.model, device="cpu")
+
+    def score(self, queries: List[str], candidates: List[List[Tuple[Document, float]]]) -> List[np.ndarray]:
+        # The pairs of every question go through the model in one batched call
+        pairs = [(query, doc.page_content) for query, scored_docs in zip(queries, candidates) for doc, _ in scored_docs]
+        flat = np.asarray(
+            self._model.predict(pairs, batch_size=self.batch_size) if pairs else [], dtype=np.float32
+        )
+        scores, position = [], 0
+        for scored_docs in candidates:
+            scores.append(flat[position:position + len(scored_docs)])
+            position += len(scored_docs)
+        return scores
+
+
+def create_reranker() -> Optional[Reranker]:
+    """Build the reranker configured in settings (None when disabled)"""
+    reranker = settings.RERANKER.lower()
+    if reranker == "none":
+        return None
+    if reranker == "lexical":
+        return LexicalReranker(
+            settings.RERANK_LEXICAL_WEIGHT, settings.BM25_K1, settings.BM25_B, workers=settings.RERANK_WORKERS
+        )
+    if reranker == "cross-encoder":
+        return CrossEncoderReranker(settings.RERANK_MODEL, workers=settings.RERANK_WORKERS)
+    raise ValueError(f"Unknown RERANKER: {settings.RERANKER}")
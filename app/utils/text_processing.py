@@ -1,7 +1,19 @@
+import re
+from functools import lru_cache
 from typing import List
+import tiktoken
 from langchain.text_splitter import RecursiveCharacterTextSplitter
 from app.core.config import settings
 
+TERM_PATTERN = re.compile(r"\w+")
+
+# Function words that carry no retrieval signal
+STOPWORDS = frozenset(
+    "a an and are as at be but by did do does for from had has have he her his how i if in is it its "
+    "me my no not of on or our she so that the their them then there these they this to was we were "
+    "what when where which who whom whose why will with would you your".split()
+)
+
 
 def create_text_splitter():
     """Create a text splitter with the configured parameters"""
@@ -50,4 +62,59 @@ def preprocess_text(text: str) -> str:
     text = text.replace('\n', ' ')
     text = text.replace('[PARAGRAPH_BREAK]', '\n\n')
     
-    return text
\ No newline at end of file
+    return text
+
+
+def normalize_query(query: str) -> str:
+    """
+    Normalize a user query so trivially different phrasings share cache entries
+
+    Args:
+        query: The raw query text
+
+    Returns:
+        Lowercased query with collapsed whitespace and no surrounding punctuation
+    """
+    return ' '.join(query.lower().split()).strip(' ?!.,;:')
+
+
+@lru_cache(maxsize=None)
+def _get_encoding(model: str):
+    try:
+        return tiktoken.encoding_for_model(model)
+    except KeyError:
+        return tiktoken.get_encoding("cl100k_base")
+    except Exception:
+        # The BPE files could not be loaded (e.g. offline); fall back to an estimate
+        return None
+
+
+def count_tokens(text: str, model: str = None) -> int:
+    """
+    Count the model tokens in a text
+
+    Args:
+        text: The text to count
+        model: Model whose tokenizer to use (defaults to GPT_MODEL)
+
+    Returns:
+        Number of tokens, or a ~4 characters per token estimate when the
+        tokenizer is unavailable
+    """
+    encoding = _get_encoding(model or settings.GPT_MODEL)
+    if encoding is None:
+        return max(1, len(text) // 4)
+    return len(encoding.encode(text, disallowed_special=()))
+
+
+def tokenize_terms(text: str) -> List[str]:
+    """
+    Split text into lowercase index terms, dropping stopwords
+
+    Args:
+        text: The input text
+
+    Returns:
+        List of terms in order of appearance
+    """
+    return [term for term in TERM_PATTERN.findall(text.lower()) if term not in STOPWORDS]
@@ -1,50 +1,227 @@
+import asyncio
+import os
+import time
 import uuid
-from typing import List, Dict, Any
-from qdrant_client import QdrantClient
+from typing import List, Dict, Any, Optional, Tuple
+from qdrant_client import AsyncQdrantClient
 from qdrant_client.http import models
 from app.core.config import settings
-from langchain_openai import OpenAIEmbeddings
+from app.utils.embedding_cache import create_embedding_cache, make_cache_key
+from app.utils.embedding_batcher import create_embedding_batcher
+from app.utils.embedding_providers import create_embedding_provider
+from app.utils.embedding_store import create_embedding_store
+from app.utils.local_index import LocalVectorIndex
+from app.utils.quantization import qdrant_quantization_config, quantization_search_params
+from app.utils.answer_extraction import index_sentences
+from app.utils.bm25_index import BM25Index, reciprocal_rank_fusion
+from app.utils.diversity import VECTOR_METADATA_KEY
+from app.utils.text_processing import count_tokens
 from langchain_core.documents import Document
 
+# The collection version lives in a single point of a tiny side collection
+VERSION_POINT_ID = 0
+
+# Namespace for deterministic chunk IDs
+CHUNK_ID_NAMESPACE = uuid.UUID("6f1c2a3e-8d4b-5e7f-9a0b-1c2d3e4f5a6b")
+
+
+def chunk_point_id(source_path: str, text: str) -> str:
+    """
+    Deterministic point ID for a chunk
+
+    Re-ingesting the same chunk of the same file yields the same ID, so the
+    upsert overwrites it instead of duplicating it.
+
+    Args:
+        source_path: Path of the file the chunk came from, relative to the ingest root
+        text: Chunk text
+
+    Returns:
+        UUID string derived from the file path and chunk text
+    """
+    return str(uuid.uuid5(CHUNK_ID_NAMESPACE, f"{source_path}\x00{text}"))
+
+
+def create_vector_client():
+    """
+    Build the vector database client configured in settings
+
+    The "local" backend is an in-process NumPy index implementing the part of
+    the AsyncQdrantClient API used here, so the rest of the manager does not
+    depend on which backend serves it.
+    """
+    backend = settings.VECTOR_STORE_BACKEND.lower()
+    if backend == "qdrant":
+        if not settings.QDRANT_HOST:
+            raise ValueError("QDRANT_HOST must be set for VECTOR_STORE_BACKEND=qdrant")
+        return AsyncQdrantClient(
+            url=settings.QDRANT_HOST,
+            api_key=settings.QDRANT_API_KEY,
+            prefer_grpc=True
+        )
+    if backend == "local":
+        return LocalVectorIndex(
+            settings.LOCAL_INDEX_PATH,
+            index_type=settings.LOCAL_INDEX_TYPE,
+            nlist=settings.IVF_NLIST,
+            nprobe=settings.IVF_NPROBE,
+            min_points=settings.IVF_MIN_POINTS,
+            quantization=settings.VECTOR_QUANTIZATION,
+            quantile=settings.QUANTIZATION_QUANTILE,
+            rescore=settings.QUANTIZATION_RESCORE,
+            oversampling=settings.QUANTIZATION_OVERSAMPLING
+        )
+    raise ValueError(f"Unknown VECTOR_STORE_BACKEND: {settings.VECTOR_STORE_BACKEND}")
+
 
 class VectorStoreManager:
     def __init__(self):
         self.client = None
-        self.embeddings = None
+        # Selected by EMBEDDING_PROVIDER; vectors from different providers are
+        # not interchangeable, so caches and the store are keyed by its model ID
+        self.embeddings = create_embedding_provider()
+        self.embedding_model_id = self.embeddings.model_id
         self.collection_name = settings.QDRANT_COLLECTION_NAME
+        self.meta_collection_name = f"{settings.QDRANT_COLLECTION_NAME}_meta"
+        # How searches use quantized vectors (None when quantization is disabled)
+        self.search_params = quantization_search_params()
         self._initialized = False
+        self._init_lock = None
+        self.query_cache = create_embedding_cache()
+        self.query_batcher = create_embedding_batcher(self._embed_query_batch)
+        self.embedding_store = create_embedding_store(self.embedding_model_id)
+        self._lexical_index = None
+        self._lexical_index_mtime = None
+        self._lexical_index_checked_at = 0.0
+        self._lexical_index_dirty = False
+        self._lexical_index_reload = None
 
-    def initialize(self):
-        """Initialize the Qdrant client and embeddings - call this when needed"""
-        if not self._initialized:
-            self.client = QdrantClient(
-                url=settings.QDRANT_HOST,
-                api_key=settings.QDRANT_API_KEY,
-                prefer_grpc=True
-            )
-            self.embeddings = OpenAIEmbeddings(model=settings.EMBEDDING_MODEL)
-            self._ensure_collection_exists()
-            self._initialized = True
+    async def initialize(self):
+        """Initialize the vector database client and embeddings - call this when needed"""
+        if self._initialized:
+            return
+
+        # Created lazily so the lock binds to the running event loop
+        if self._init_lock is None:
+            self._init_lock = asyncio.Lock()
 
-    def _ensure_collection_exists(self):
+        async with self._init_lock:
+            if not self._initialized:
+                self.client = create_vector_client()
+                # Local models are loaded here, off the event loop
+                await asyncio.to_thread(self.embeddings.load)
+                await self._ensure_collection_exists()
+                self._initialized = True
+
+    async def _ensure_collection_exists(self):
         """Check if the collection exists, create if it doesn't"""
+        dimension = self.embeddings.dimension
+        quantization_config = qdrant_quantization_config()
         try:
-            self.client.get_collection(self.collection_name)
+            collection = await self.client.get_collection(self.collection_name)
         except Exception:
             # Collection doesn't exist, create it
-            self.client.create_collection(
+            await self.client.create_collection(
                 collection_name=self.collection_name,
                 vectors_config=models.VectorParams(
-                    size=1536,  # Standard size for OpenAI embeddings
-                    distance=models.Distance.COSINE
+                    size=dimension,  # Vector size of the configured embedding provider
+                    distance=models.Distance.COSINE,
+                    # With int8 codes in RAM, the float32 originals are only read for rescoring
+                    on_disk=True if quantization_config is not None else None
                 ),
+                quantization_config=quantization_config
+            )
+        else:
+            existing = collection.config.params.vectors
+            if isinstance(existing, models.VectorParams) and existing.size != dimension:
+                raise ValueError(
+                    f"Collection {self.collection_name} holds {existing.size}-dimensional vectors but "
+                    f"{self.embedding_model_id} produces {dimension}; re-ingest into a new collection "
+                    f"(QDRANT_COLLECTION_NAME) after changing EMBEDDING_PROVIDER"
+                )
+            if quantization_config is not None and getattr(collection.config, "quantization_config", None) is None:
+                # Qdrant quantizes the existing points in the background
+                await self.client.update_collection(
+                    collection_name=self.collection_name,
+                    quantization_config=quantization_config
+                )
+
+        try:
+            # Keyword index for the per-file lookups done by incremental ingestion
+            await self.client.create_payload_index(
+                collection_name=self.collection_name,
+                field_name="metadata.source_path",
+                field_schema=models.PayloadSchemaType.KEYWORD
             )
+        except Exception:
+            pass
+
+    async def embed_query(self, query: str) -> List[float]:
+        """
+        Embed a single query without blocking the event loop
 
-    def add_texts(
+        Args:
+            query: Query text to embed
+
+        Returns:
+            Embedding vector for the query
+        """
+        await self.initialize()  # Ensure client is initialized
+
+        if self.query_cache is None:
+            return await self._embed_query_uncached(query)
+
+        # Repeated questions skip the embedding round trip entirely
+        cache_key = make_cache_key(query, self.embedding_model_id)
+        embedding = await self.query_cache.get(cache_key)
+        if embedding is None:
+            embedding = await self._embed_query_uncached(query)
+            await self.query_cache.set(cache_key, embedding)
+        return embedding
+
+    async def _embed_query_uncached(self, query: str) -> List[float]:
+        # Concurrent requests share one embedding call when micro-batching is enabled
+        if self.query_batcher is None:
+            return await self.embeddings.aembed_query(query)
+        return await self.query_batcher.embed(query)
+
+    async def _embed_query_batch(self, queries: List[str]) -> List[List[float]]:
+        """One embedding call for a micro-batch of queries (bypasses the document embedding store)"""
+        return await self.embeddings.aembed_documents(queries)
+
+    async def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        """
+        Embed document chunks, reusing vectors from the local embedding store
+
+        Args:
+            texts: Chunk texts to embed
+
+        Returns:
+            Embedding vector for each text
+        """
+        await self.initialize()  # Ensure client is initialized
+
+        if self.embedding_store is None:
+            return await self.embeddings.aembed_documents(texts)
+
+        embeddings = self.embedding_store.get_many(texts)
+        missing = [i for i, embedding in enumerate(embeddings) if embedding is None]
+        if missing:
+            # Only text never embedded before pays for an API call
+            fresh = await self.embeddings.aembed_documents([texts[i] for i in missing])
+            self.embedding_store.put_many([texts[i] for i in missing], fresh)
+            for i, embedding in zip(missing, fresh):
+                embeddings[i] = embedding
+        return embeddings
+
+    async def add_texts(
         self,
         texts: List[str],
         metadatas: List[Dict[str, Any]] = None,
-        ids: List[str] = None
+        ids: List[str] = None,
+        batch_size: int = None,
+        wait: bool = True,
+        bump_version: bool = True
     ) -> List[str]:
         """
         Add texts to the vector store
@@ -52,44 +229,173 @@ class VectorStoreManager:
         Args:
             texts: List of texts to embed and store
             metadatas: Metadata for each text
-            ids: IDs for each text (optional, will generate UUIDs if not provided)
+            ids: IDs for each text (optional, derived from source_path metadata and text if not provided)
+            batch_size: Texts per embedding call and upsert request (defaults to INGEST_BATCH_SIZE)
+            wait: Whether each upsert waits for Qdrant to apply the points
+            bump_version: Whether to bump the collection version once the texts are stored
 
         Returns:
             List of IDs of the added texts
         """
-        self.initialize()  # Ensure client is initialized
-
-        if ids is None:
-            ids = [str(uuid.uuid4()) for _ in texts]
+        await self.initialize()  # Ensure client is initialized
 
         if metadatas is None:
             metadatas = [{}] * len(texts)
 
-        # Generate embeddings
-        embeddings = self.embeddings.embed_documents(texts)
-
-        # Prepare points for insertion
-        points = [
-            models.PointStruct(
-                id=id_,
-                vector=embedding,
-                payload={
-                    "text": text,
-                    "metadata": metadata
-                }
-            )
-            for id_, embedding, text, metadata in zip(ids, embeddings, texts, metadatas)
+        # Token counts are computed once here so context packing never tokenizes per request
+        metadatas = [
+            metadata if "token_count" in metadata else {**metadata, "token_count": count_tokens(text)}
+            for text, metadata in zip(texts, metadatas)
+        ]
+        # Likewise sentence boundaries for the extractive answer engine
+        metadatas = [
+            metadata if "sentence_starts" in metadata else {**metadata, **index_sentences(text)}
+            for text, metadata in zip(texts, metadatas)
         ]
 
-        # Insert into Qdrant
-        self.client.upsert(
+        if ids is None:
+            ids = [
+                chunk_point_id(metadata.get("source_path", metadata.get("source_file", "")), text)
+                for text, metadata in zip(texts, metadatas)
+            ]
+
+        batch_size = batch_size or settings.INGEST_BATCH_SIZE
+        semaphore = asyncio.Semaphore(settings.INGEST_EMBED_CONCURRENCY)
+
+        async def add_batch(start: int):
+            end = start + batch_size
+            async with semaphore:
+                # Generate embeddings
+                embeddings = await self.embed_documents(texts[start:end])
+
+                # Prepare points for insertion
+                points = [
+                    models.PointStruct(
+                        id=id_,
+                        vector=embedding,
+                        payload={
+                            "text": text,
+                            "metadata": metadata
+                        }
+                    )
+                    for id_, embedding, text, metadata in zip(
+                        ids[start:end], embeddings, texts[start:end], metadatas[start:end]
+                    )
+                ]
+
+                # Insert into Qdrant
+                await self.client.upsert(
+                    collection_name=self.collection_name,
+                    points=points,
+                    wait=wait
+                )
+
+                # Keep the local lexical index in step with the collection
+                lexical_index = self.get_lexical_index()
+                for point in points:
+                    lexical_index.add(point.id, point.payload["text"], point.payload["metadata"])
+                self._lexical_index_dirty = True
+
+        # Bounded-size batches are embedded and upserted concurrently
+        await asyncio.gather(*(add_batch(start) for start in range(0, len(texts), batch_size)))
+
+        if bump_version:
+            self.save_lexical_index()
+            await self.bump_collection_version()
+
+        return ids
+
+    async def get_source_points(self, source_path: str) -> Dict[str, Dict[str, Any]]:
+        """
+        Fetch the IDs and metadata of every stored chunk of a file
+
+        Args:
+            source_path: Path of the file relative to the ingest root
+
+        Returns:
+            Mapping of point ID to chunk metadata
+        """
+        await self.initialize()  # Ensure client is initialized
+
+        source_filter = models.Filter(
+            must=[
+                models.FieldCondition(
+                    key="metadata.source_path",
+                    match=models.MatchValue(value=source_path)
+                )
+            ]
+        )
+
+        points = {}
+        offset = None
+        while True:
+            records, offset = await self.client.scroll(
+                collection_name=self.collection_name,
+                scroll_filter=source_filter,
+                limit=256,
+                offset=offset,
+                with_payload=["metadata"],
+                with_vectors=False
+            )
+            for record in records:
+                points[str(record.id)] = (record.payload or {}).get("metadata", {})
+            if offset is None:
+                break
+
+        return points
+
+    async def update_metadata(self, metadatas: Dict[str, Dict[str, Any]], wait: bool = True):
+        """
+        Replace the metadata of existing points without re-embedding them
+
+        Args:
+            metadatas: Mapping of point ID to its new metadata
+            wait: Whether to wait for Qdrant to apply the update
+        """
+        if not metadatas:
+            return
+        await self.initialize()  # Ensure client is initialized
+
+        await self.client.batch_update_points(
             collection_name=self.collection_name,
-            points=points
+            update_operations=[
+                models.SetPayloadOperation(
+                    set_payload=models.SetPayload(payload={"metadata": metadata}, points=[id_])
+                )
+                for id_, metadata in metadatas.items()
+            ],
+            wait=wait
         )
 
-        return ids
+        lexical_index = self.get_lexical_index()
+        for id_, metadata in metadatas.items():
+            lexical_index.update_metadata(id_, metadata)
+        self._lexical_index_dirty = True
 
-    def similarity_search(
+    async def delete_points(self, ids: List[str], wait: bool = True):
+        """
+        Delete points by ID
+
+        Args:
+            ids: IDs of the points to delete
+            wait: Whether to wait for Qdrant to apply the deletion
+        """
+        if not ids:
+            return
+        await self.initialize()  # Ensure client is initialized
+
+        await self.client.delete(
+            collection_name=self.collection_name,
+            points_selector=models.PointIdsList(points=list(ids)),
+            wait=wait
+        )
+
+        lexical_index = self.get_lexical_index()
+        for id_ in ids:
+            lexical_index.remove(id_)
+        self._lexical_index_dirty = True
+
+    async def similarity_search(
         self,
         query: str,
         k: int = 4,
@@ -106,33 +412,406 @@ class VectorStoreManager:
         Returns:
             List of Documents matching the query
         """
-        self.initialize()  # Ensure client is initialized
+        query_embedding = await self.embed_query(query)
+        return await self.similarity_search_by_vector(query_embedding, k=k, filter_condition=filter_condition)
+
+    async def similarity_search_by_vector(
+        self,
+        embedding: List[float],
+        k: int = 4,
+        filter_condition: models.Filter = None
+    ) -> List[Document]:
+        """
+        Perform similarity search with an already embedded query
 
-        query_embedding = self.embeddings.embed_query(query)
+        Args:
+            embedding: Query embedding to search with
+            k: Number of results to return
+            filter_condition: Optional filter condition for search
 
-        results = self.client.search(
+        Returns:
+            List of Documents matching the query
+        """
+        scored_documents = await self.similarity_search_with_score_by_vector(
+            embedding, k=k, filter_condition=filter_condition
+        )
+        return [doc for doc, _ in scored_documents]
+
+    async def similarity_search_with_score_by_vector(
+        self,
+        embedding: List[float],
+        k: int = 4,
+        filter_condition: models.Filter = None
+    ) -> List[Tuple[Document, float]]:
+        """
+        Perform similarity search and keep the similarity score of each result
+
+        Args:
+            embedding: Query embedding to search with
+            k: Number of results to return
+            filter_condition: Optional filter condition for search
+
+        Returns:
+            List of (Document, score) pairs, best match first
+        """
+        await self.initialize()  # Ensure client is initialized
+
+        results = await self.client.search(
             collection_name=self.collection_name,
-            query_vector=query_embedding,
+            query_vector=embedding,
             limit=k,
             query_filter=filter_condition,
-            score_threshold=settings.SIMILARITY_THRESHOLD
+            score_threshold=settings.SIMILARITY_THRESHOLD,
+            search_params=self.search_params
         )
+        return self._scored_documents(results)
 
+    @staticmethod
+    def _scored_documents(results: List[models.ScoredPoint]) -> List[Tuple[Document, float]]:
+        """
+        (Document, score) pairs of the search hits above the similarity threshold
+
+        Vectors returned with the hits are attached to the metadata under
+        VECTOR_METADATA_KEY (see select_diverse).
+        """
         documents = []
         for result in results:
             if result.score >= settings.SIMILARITY_THRESHOLD:
+                metadata = result.payload["metadata"]
+                if result.vector is not None:
+                    metadata = {**metadata, VECTOR_METADATA_KEY: result.vector}
                 doc = Document(
                     page_content=result.payload["text"],
-                    metadata=result.payload["metadata"]
+                    metadata=metadata
                 )
-                documents.append(doc)
+                documents.append((doc, result.score))
 
         return documents
 
-    def delete_collection(self):
+    async def similarity_search_with_score_by_vector_batch(
+        self,
+        embeddings: List[List[float]],
+        k: int = 4,
+        filter_condition: models.Filter = None,
+        with_vectors: bool = False
+    ) -> List[List[Tuple[Document, float]]]:
+        """
+        Run several similarity searches in one Qdrant request
+
+        Args:
+            embeddings: Query embeddings to search with
+            k: Number of results to return per query
+            filter_condition: Optional filter condition applied to every search
+            with_vectors: Attach each chunk's vector to its metadata (for MMR)
+
+        Returns:
+            For each embedding, its (Document, score) pairs, best match first
+        """
+        if not embeddings:
+            return []
+        await self.initialize()  # Ensure client is initialized
+
+        results = await self.client.search_batch(
+            collection_name=self.collection_name,
+            requests=[
+                models.SearchRequest(
+                    vector=embedding,
+                    limit=k,
+                    filter=filter_condition,
+                    score_threshold=settings.SIMILARITY_THRESHOLD,
+                    params=self.search_params,
+                    with_payload=True,
+                    with_vector=with_vectors
+                )
+                for embedding in embeddings
+            ]
+        )
+        return [self._scored_documents(hits) for hits in results]
+
+    async def similarity_search_batch(
+        self,
+        queries: List[str],
+        k: int = 4,
+        filter_condition: models.Filter = None
+    ) -> List[List[Document]]:
+        """
+        Perform similarity searches for several queries in one Qdrant request
+
+        The queries are embedded concurrently, so cache misses share one
+        embedding call when micro-batching is enabled.
+
+        Args:
+            queries: Query texts to search for
+            k: Number of results to return per query
+            filter_condition: Optional filter condition applied to every search
+
+        Returns:
+            For each query, the Documents matching it
+        """
+        embeddings = await asyncio.gather(*(self.embed_query(query) for query in queries))
+        results = await self.similarity_search_with_score_by_vector_batch(
+            list(embeddings), k=k, filter_condition=filter_condition
+        )
+        return [[doc for doc, _ in scored] for scored in results]
+
+    async def build_vector_index(self) -> Optional[Dict[str, Any]]:
+        """
+        Build the IVF index and int8 codes of the local backend from the whole collection
+
+        Only the "local" backend builds them here (as configured by
+        LOCAL_INDEX_TYPE and VECTOR_QUANTIZATION); Qdrant maintains its own.
+
+        Returns:
+            Points, memory and index figures of the collection, or None for Qdrant
+        """
+        await self.initialize()  # Ensure client is initialized
+        if not isinstance(self.client, LocalVectorIndex):
+            return None
+        return await self.client.build_index(self.collection_name)
+
+    def _lexical_index_is_current(self) -> bool:
+        """Whether the loaded lexical index can be used without checking the file"""
+        return self._lexical_index is not None and (
+            self._lexical_index_dirty or time.monotonic() - self._lexical_index_checked_at < 1.0
+        )
+
+    def get_lexical_index(self) -> BM25Index:
+        """
+        Local BM25 index of the collection
+
+        Loaded lazily from BM25_INDEX_PATH and reloaded when another process
+        (e.g. ingest_content.py) rewrites the file, unless this process holds
+        unsaved changes of its own.
+        """
+        if self._lexical_index_is_current():
+            return self._lexical_index
+        self._lexical_index_checked_at = time.monotonic()
+
+        try:
+            mtime = os.path.getmtime(settings.BM25_INDEX_PATH)
+        except OSError:
+            mtime = None
+
+        if self._lexical_index is None or mtime != self._lexical_index_mtime:
+            if mtime is None:
+                self._lexical_index = BM25Index(k1=settings.BM25_K1, b=settings.BM25_B)
+            else:
+                self._lexical_index = BM25Index.load(settings.BM25_INDEX_PATH)
+            self._lexical_index_mtime = mtime
+        return self._lexical_index
+
+    async def get_lexical_index_async(self) -> BM25Index:
+        """
+        get_lexical_index without blocking the event loop
+
+        Checking the file and reloading the pickle run in a worker thread;
+        concurrent callers share one reload.
+        """
+        if self._lexical_index_is_current():
+            return self._lexical_index
+        if self._lexical_index_reload is None or self._lexical_index_reload.done():
+            self._lexical_index_reload = asyncio.ensure_future(asyncio.to_thread(self.get_lexical_index))
+        return await asyncio.shield(self._lexical_index_reload)
+
+    def save_lexical_index(self):
+        """Persist the lexical index if this process changed it"""
+        if not self._lexical_index_dirty:
+            return
+        self._lexical_index.save(settings.BM25_INDEX_PATH)
+        self._lexical_index_mtime = os.path.getmtime(settings.BM25_INDEX_PATH)
+        self._lexical_index_dirty = False
+
+    async def checkpoint(self):
+        """
+        Make every change written so far durable
+
+        Ingestion upserts without waiting and saves the lexical index lazily;
+        it calls this before recording batches as done in its resume
+        manifest, so a resumed run never skips chunks that were lost.
+        """
+        if isinstance(self.client, LocalVectorIndex):
+            await self.client.flush()
+        self.save_lexical_index()
+
+    def ensure_lexically_indexed(self, ids: List[str], texts: List[str], metadatas: List[Dict[str, Any]]) -> int:
+        """
+        Add stored chunks that the lexical index lacks
+
+        Such chunks were upserted by a run that stopped before it saved the
+        lexical index; incremental ingestion finds them unchanged and would
+        otherwise never index them.
+
+        Returns:
+            Number of chunks added
+        """
+        lexical_index = self.get_lexical_index()
+        missing = [i for i, id_ in enumerate(ids) if id_ not in lexical_index.documents]
+        for i in missing:
+            lexical_index.add(ids[i], texts[i], metadatas[i])
+        if missing:
+            self._lexical_index_dirty = True
+        return len(missing)
+
+    async def rebuild_lexical_index(self) -> int:
+        """
+        Rebuild the lexical index from every point in the collection
+
+        Returns:
+            Number of indexed chunks
+        """
+        await self.initialize()  # Ensure client is initialized
+
+        lexical_index = BM25Index(k1=settings.BM25_K1, b=settings.BM25_B)
+        offset = None
+        while True:
+            records, offset = await self.client.scroll(
+                collection_name=self.collection_name,
+                limit=256,
+                offset=offset,
+                with_payload=True,
+                with_vectors=False
+            )
+            for record in records:
+                lexical_index.add(str(record.id), record.payload["text"], record.payload["metadata"])
+            if offset is None:
+                break
+
+        self._lexical_index = lexical_index
+        self._lexical_index_dirty = True
+        self.save_lexical_index()
+        return len(lexical_index)
+
+    async def lexical_lookup(self, query: str, k: int = 4) -> Optional[List[Tuple[Document, float]]]:
+        """
+        Answer lookup-style queries (names, titles) from the lexical index alone
+
+        A query qualifies when it has at most HYBRID_LEXICAL_ONLY_MAX_TERMS
+        terms and the best lexical match contains all of them; such queries
+        never touch the embedding API. The search runs in a worker thread.
+
+        Args:
+            query: Query text
+            k: Number of results to return
+
+        Returns:
+            List of (Document, BM25 score) pairs, or None if the query needs dense retrieval
+        """
+        lexical_index = await self.get_lexical_index_async()
+        return await asyncio.to_thread(self._lexical_lookup, lexical_index, query, k)
+
+    @staticmethod
+    def _lexical_lookup(lexical_index: BM25Index, query: str, k: int) -> Optional[List[Tuple[Document, float]]]:
+        terms = lexical_index.query_terms(query)
+        if not terms or len(terms) > settings.HYBRID_LEXICAL_ONLY_MAX_TERMS:
+            return None
+        if any(term not in lexical_index.postings for term in terms):
+            return None
+
+        results = lexical_index.search(query, k=k)
+        if not results or results[0][2] < 1.0:
+            return None
+        return [(doc, score) for doc, score, _ in results]
+
+    async def fused_search_batch(
+        self,
+        groups: List[Tuple[str, List[List[float]]]],
+        k: int = 4,
+        with_vectors: bool = False
+    ) -> List[List[Tuple[Document, float]]]:
+        """
+        Retrieval for several questions, each searched with one or more embeddings
+
+        Every embedding of every group goes into a single search_batch request.
+        Within a group, the dense result lists (one per embedding, e.g. the
+        question and its expansions) and, in hybrid mode, the BM25 results for
+        the question text are fused with reciprocal rank fusion. A group with a
+        single embedding in dense mode returns the plain similarity results.
+
+        Args:
+            groups: (question text, embeddings to search with) per question
+            k: Number of results to return per question
+            with_vectors: Attach the vectors of dense results to their metadata (for MMR)
+
+        Returns:
+            For each group, its (Document, score) pairs, best first
+        """
+        hybrid = settings.RETRIEVAL_MODE == "hybrid"
+        fused = any(len(embeddings) > 1 for _, embeddings in groups)
+        candidates = max(k, settings.HYBRID_CANDIDATES) if hybrid or fused else k
+
+        embeddings = [embedding for _, group_embeddings in groups for embedding in group_embeddings]
+        lexical_index = await self.get_lexical_index_async() if hybrid else None
+        dense, lexical = await asyncio.gather(
+            self.similarity_search_with_score_by_vector_batch(embeddings, k=candidates, with_vectors=with_vectors),
+            asyncio.gather(*(
+                asyncio.to_thread(lexical_index.search, query, candidates) for query, _ in groups
+            )) if hybrid else asyncio.sleep(0, result=None)
+        )
+
+        results = []
+        position = 0
+        for i, (_, group_embeddings) in enumerate(groups):
+            ranked = [[doc for doc, _ in scored] for scored in dense[position:position + len(group_embeddings)]]
+            position += len(group_embeddings)
+            if hybrid:
+                ranked.append([doc for doc, _, _ in lexical[i]])
+            if len(ranked) == 1:
+                results.append(dense[position - 1][:k])
+            else:
+                results.append(reciprocal_rank_fusion(ranked, k=k, rrf_k=settings.RRF_K))
+        return results
+
+    async def delete_collection(self):
         """Delete the entire collection (use with caution)"""
-        self.initialize()  # Ensure client is initialized
-        self.client.delete_collection(collection_name=self.collection_name)
+        await self.initialize()  # Ensure client is initialized
+        await self.client.delete_collection(collection_name=self.collection_name)
+        self.get_lexical_index().clear()
+        self._lexical_index_dirty = True
+        self.save_lexical_index()
+        await self.bump_collection_version()
+
+    async def get_collection_version(self) -> str:
+        """
+        Return the current content version of the collection
+
+        The version changes whenever content is added or the collection is
+        deleted, so caches in other processes can detect stale entries.
+        """
+        await self.initialize()  # Ensure client is initialized
+        try:
+            records = await self.client.retrieve(
+                collection_name=self.meta_collection_name,
+                ids=[VERSION_POINT_ID],
+                with_payload=True
+            )
+        except Exception:
+            # Nothing has been versioned yet
+            return "0"
+        return records[0].payload["version"] if records else "0"
+
+    async def bump_collection_version(self) -> str:
+        """Record that the collection content changed and return the new version"""
+        await self.initialize()  # Ensure client is initialized
+        try:
+            await self.client.get_collection(self.meta_collection_name)
+        except Exception:
+            await self.client.create_collection(
+                collection_name=self.meta_collection_name,
+                vectors_config=models.VectorParams(size=1, distance=models.Distance.DOT),
+            )
+
+        version = uuid.uuid4().hex
+        await self.client.upsert(
+            collection_name=self.meta_collection_name,
+            points=[
+                models.PointStruct(
+                    id=VERSION_POINT_ID,
+                    vector=[1.0],
+                    payload={"version": version, "updated_at": time.time()}
+                )
+            ]
+        )
+        return version
 
 
 # Global instance (not initialized at import time)
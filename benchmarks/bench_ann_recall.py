@@ -0,0 +1,110 @@
+"""
+Benchmark recall@k and latency of the local IVF index against exact search
+
+Vectors are drawn around a few thousand random topics (like chunk
+embeddings of a book, which cluster by subject) or, with --data uniform,
+uniformly on the sphere, the worst case for any clustering index. Queries
+are fresh draws from the same distribution. For each nprobe, recall@k is
+the share of the exact top k that the approximate search returns.
+
+Usage:
+    python benchmarks/bench_ann_recall.py --size 200000 --dimension 384 --nprobe 1,4,8,16,32
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+# Add the project root to the path so we can import app modules
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+# Settings require these to be present; the benchmark never talks to them
+for name in ("POSTGRES_SERVER", "POSTGRES_USER", "POSTGRES_PASSWORD", "POSTGRES_DB",
+             "QDRANT_HOST", "QDRANT_API_KEY", "OPENAI_API_KEY"):
+    os.environ.setdefault(name, "bench")
+
+from qdrant_client.http import models
+from app.utils.local_index import LocalVectorIndex
+
+COLLECTION = "bench_ann"
+UPSERT_BATCH = 2000
+
+
+def make_data(args, rng):
+    count = args.size + args.queries
+    if args.data == "uniform":
+        vectors = rng.normal(size=(count, args.dimension))
+    else:
+        topics = rng.normal(size=(args.topics, args.dimension))
+        vectors = topics[rng.integers(args.topics, size=count)] + args.spread * rng.normal(size=(count, args.dimension))
+    vectors = vectors.astype(np.float32)
+    return vectors[:args.size], vectors[args.size:]
+
+
+async def timed_search(index, queries, k: int, exact: bool):
+    results, latencies = [], []
+    params = models.SearchParams(exact=True) if exact else None
+    for query in queries:
+        started = time.perf_counter()
+        hits = await index.search(COLLECTION, query_vector=query.tolist(), limit=k, search_params=params)
+        latencies.append(time.perf_counter() - started)
+        results.append({hit.id for hit in hits})
+    return results, latencies
+
+
+def report(name: str, latencies, recall: float):
+    ordered = sorted(latencies)
+    p99 = ordered[min(len(ordered) - 1, int(len(ordered) * 0.99))]
+    print(f"  {name + ':':<14} recall@k {recall:6.3f}   p50 {statistics.median(ordered) * 1000:8.2f} ms   "
+          f"p99 {p99 * 1000:8.2f} ms")
+
+
+async def main(args):
+    rng = np.random.default_rng(args.seed)
+    vectors, queries = make_data(args, rng)
+    print(f"{args.size} chunks x {args.dimension} dims ({args.data}), {args.queries} queries, k={args.k}")
+
+    with tempfile.TemporaryDirectory() as path:
+        index = LocalVectorIndex(path, index_type="ivf", nlist=args.nlist, min_points=0)
+        await index.create_collection(
+            COLLECTION, vectors_config=models.VectorParams(size=args.dimension, distance=models.Distance.COSINE)
+        )
+        for start in range(0, args.size, UPSERT_BATCH):
+            await index.upsert(COLLECTION, [
+                models.PointStruct(id=i, vector=vectors[i].tolist(), payload={})
+                for i in range(start, min(start + UPSERT_BATCH, args.size))
+            ], wait=False)
+
+        started = time.perf_counter()
+        built = await index.build_index(COLLECTION)
+        print(f"  IVF build:      {time.perf_counter() - started:8.2f} s   "
+              f"{built['ivf_lists']} lists, largest {built['largest_ivf_list']} rows")
+
+        truth, latencies = await timed_search(index, queries, args.k, exact=True)
+        report("exact", latencies, 1.0)
+        for nprobe in (int(n) for n in args.nprobe.split(",")):
+            index.nprobe = nprobe
+            found, latencies = await timed_search(index, queries, args.k, exact=False)
+            recall = np.mean([len(f & t) / len(t) for f, t in zip(found, truth) if t])
+            report(f"nprobe={nprobe}", latencies, recall)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark recall and latency of the local IVF index")
+    parser.add_argument("--size", type=int, default=100000)
+    parser.add_argument("--dimension", type=int, default=384)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--nlist", type=int, default=0, help="IVF clusters (0: square root of --size)")
+    parser.add_argument("--nprobe", default="1,2,4,8,16,32", help="Comma-separated nprobe values to measure")
+    parser.add_argument("--data", choices=["clustered", "uniform"], default="clustered")
+    parser.add_argument("--topics", type=int, default=2000, help="Topic centers of the clustered data")
+    parser.add_argument("--spread", type=float, default=1.0, help="Noise around each topic center")
+    parser.add_argument("--seed", type=int, default=0)
+    asyncio.run(main(parser.parse_args()))
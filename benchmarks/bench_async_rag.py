@@ -0,0 +1,154 @@
+"""
+Benchmark the /chat RAG pipeline with blocking vs. async I/O
+
+Both variants run on a single event loop (like a single uvicorn worker) against
+a local stub embedder and stub vector store that simulate network latency, so
+the numbers only reflect how well the pipeline overlaps in-flight requests.
+
+Usage:
+    python benchmarks/bench_async_rag.py --requests 200 --concurrency 100
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+from pathlib import Path
+
+# Add the project root to the path so we can import app modules
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+# Settings require these to be present; the benchmark never talks to them
+for name in ("POSTGRES_SERVER", "POSTGRES_USER", "POSTGRES_PASSWORD", "POSTGRES_DB",
+             "QDRANT_HOST", "QDRANT_API_KEY", "OPENAI_API_KEY"):
+    os.environ.setdefault(name, "bench")
+
+from qdrant_client.http import models
+
+from app.core.rag_service import rag_service
+from app.schemas.chat import ChatRequest
+from app.utils.vector_store import vector_store_manager
+
+SAMPLE_TEXT = (
+    "The lighthouse keeper rowed out every evening to trim the lamp. "
+    "His daughter kept the logbook and recorded every passing ship."
+)
+
+
+class StubEmbeddings:
+    """Embedder that sleeps instead of calling the embedding API"""
+
+    def __init__(self, latency: float):
+        self.latency = latency
+
+    def embed_query(self, text):
+        time.sleep(self.latency)
+        return [0.1] * 8
+
+    async def aembed_query(self, text):
+        await asyncio.sleep(self.latency)
+        return [0.1] * 8
+
+    async def aembed_documents(self, texts):
+        await asyncio.sleep(self.latency)
+        return [[0.1] * 8 for _ in texts]
+
+
+class StubQdrantClient:
+    """Vector store that sleeps instead of calling Qdrant"""
+
+    def __init__(self, latency: float):
+        self.latency = latency
+
+    def _results(self, limit):
+        return [
+            models.ScoredPoint(
+                id=i,
+                version=0,
+                score=0.9,
+                payload={"text": SAMPLE_TEXT, "metadata": {"chunk_id": i}},
+            )
+            for i in range(limit)
+        ]
+
+    def search_blocking(self, limit=4, **kwargs):
+        time.sleep(self.latency)
+        return self._results(limit)
+
+    async def search(self, limit=4, **kwargs):
+        await asyncio.sleep(self.latency)
+        return self._results(limit)
+
+    async def search_batch(self, requests, **kwargs):
+        await asyncio.sleep(self.latency)
+        return [self._results(request.limit) for request in requests]
+
+
+async def blocking_chat(request: ChatRequest, embeddings: StubEmbeddings, client: StubQdrantClient):
+    """The pre-async pipeline: an async handler calling blocking I/O"""
+    embeddings.embed_query(request.query)
+    results = client.search_blocking(limit=4)
+    passages = [(result.payload["text"], result.payload["metadata"]) for result in results]
+    return rag_service._simple_response_generator(request.query, passages)
+
+
+async def async_chat(request: ChatRequest):
+    """The current pipeline, end to end through RAGService.process_query"""
+    return await rag_service.process_query(request)
+
+
+async def run(handler, total: int, concurrency: int) -> float:
+    semaphore = asyncio.Semaphore(concurrency)
+    request = ChatRequest(query="Who kept the logbook of the lighthouse?")
+
+    async def one():
+        async with semaphore:
+            await handler(request)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(total)))
+    return time.perf_counter() - started
+
+
+async def main(args):
+    embeddings = StubEmbeddings(args.embed_latency_ms / 1000)
+    client = StubQdrantClient(args.search_latency_ms / 1000)
+
+    # Wire the stubs into the shared manager so no network is touched
+    vector_store_manager.embeddings = embeddings
+    vector_store_manager.client = client
+    vector_store_manager._initialized = True
+
+    # Caches would answer every repeat of the benchmark query, so measure the raw pipeline
+    vector_store_manager.query_cache = None
+    rag_service.semantic_cache = None
+    # Every request asks the same question, so coalescing is measured separately
+    single_flight = rag_service.single_flight
+    rag_service.single_flight = None
+
+    blocking_elapsed = await run(
+        lambda request: blocking_chat(request, embeddings, client), args.requests, args.concurrency
+    )
+    async_elapsed = await run(async_chat, args.requests, args.concurrency)
+
+    rag_service.single_flight = single_flight
+    coalesced_elapsed = await run(async_chat, args.requests, args.concurrency) if single_flight is not None else None
+
+    print(f"requests={args.requests} concurrency={args.concurrency} "
+          f"embed={args.embed_latency_ms}ms search={args.search_latency_ms}ms")
+    print(f"blocking: {blocking_elapsed:8.3f}s  {args.requests / blocking_elapsed:10.1f} req/s")
+    print(f"async:    {async_elapsed:8.3f}s  {args.requests / async_elapsed:10.1f} req/s")
+    print(f"speedup:  {blocking_elapsed / async_elapsed:8.1f}x")
+    if coalesced_elapsed is not None:
+        print(f"async + coalescing (identical questions): {coalesced_elapsed:8.3f}s  "
+              f"{args.requests / coalesced_elapsed:10.1f} req/s  "
+              f"({single_flight.stats()['executions']} pipeline runs)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark blocking vs. async RAG pipeline")
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=100)
+    parser.add_argument("--embed-latency-ms", type=float, default=20.0)
+    parser.add_argument("--search-latency-ms", type=float, default=10.0)
+    asyncio.run(main(parser.parse_args()))
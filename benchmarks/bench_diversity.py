@@ -0,0 +1,112 @@
+"""
+Benchmark near-duplicate suppression and MMR on overlapping, repeated chunks
+
+Each request has --candidates synthetic chunks as first-stage results, cut
+with --overlap words shared between neighbouring chunks and a share of
+them reprinting a passage of a better-scoring chunk (as books repeat
+quotations and chapter summaries). The benchmark reports, for the k chunks
+packed into the prompt with and without diversity selection:
+- the share of their words that repeat text already in the prompt;
+- the number of distinct source passages they cover;
+and the latency of select_diverse per question.
+
+Usage:
+    python benchmarks/bench_diversity.py --requests 500 --candidates 20 --k 5
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+from pathlib import Path
+
+# Add the project root to the path so we can import app modules
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+# Settings require these to be present; the benchmark never talks to them
+for name in ("POSTGRES_SERVER", "POSTGRES_USER", "POSTGRES_PASSWORD", "POSTGRES_DB",
+             "QDRANT_HOST", "QDRANT_API_KEY", "OPENAI_API_KEY"):
+    os.environ.setdefault(name, "bench")
+
+import numpy as np
+from langchain_core.documents import Document
+from app.utils.diversity import VECTOR_METADATA_KEY, select_diverse
+
+VOCABULARY = [f"w{i}" for i in range(5000)]
+CHUNK_WORDS = 120
+DIMENSION = 64
+
+
+def make_request(rng: random.Random, args):
+    """First-stage (Document, score) candidates, best first, each tagged with its source passage"""
+    text = [rng.choice(VOCABULARY) for _ in range(args.candidates * CHUNK_WORDS)]
+    step = CHUNK_WORDS - args.overlap
+    chunks = [(text[start:start + CHUNK_WORDS], start // step) for start in range(0, len(text) - CHUNK_WORDS, step)]
+    chunks = chunks[:args.candidates]
+    for i in range(1, len(chunks)):
+        if rng.random() < args.repeat_rate:
+            # Reprint most of a better chunk with a little new text around it
+            source_words, source = chunks[rng.randrange(i)]
+            chunks[i] = (source_words[10:] + chunks[i][0][:10], source)
+
+    passages = np.random.default_rng(rng.randrange(2 ** 32)).normal(size=(len(chunks), DIMENSION))
+    scored = []
+    for rank, (words, source) in enumerate(chunks):
+        vector = passages[source] + 0.1 * passages[rank]
+        metadata = {"source": source, VECTOR_METADATA_KEY: vector.tolist()}
+        scored.append((Document(page_content=" ".join(words), metadata=metadata), 0.9 - 0.01 * rank))
+    return scored
+
+
+def measure(selected):
+    """Share of repeated words among the selected chunks and the number of distinct passages"""
+    seen, repeated, total = set(), 0, 0
+    for doc, _ in selected:
+        words = doc.page_content.split()
+        # Overlaps are contiguous, so compare word trigrams
+        trigrams = set(zip(words, words[1:], words[2:]))
+        repeated += len(trigrams & seen)
+        total += len(trigrams)
+        seen |= trigrams
+    return repeated / max(total, 1), len({doc.metadata["source"] for doc, _ in selected})
+
+
+def main(args):
+    rng = random.Random(args.seed)
+    requests = [make_request(rng, args) for _ in range(args.requests)]
+    modes = {
+        "top k (no selection)": None,
+        "near-duplicate drop": (args.threshold, None),
+        "drop + MMR": (args.threshold, args.mmr_lambda),
+    }
+
+    print(f"{args.requests} questions, {args.candidates} candidates, k={args.k}, overlap={args.overlap} words")
+    for label, options in modes.items():
+        repeated, passages, latencies = [], [], []
+        for scored in requests:
+            started = time.perf_counter()
+            if options is None:
+                selected = scored[:args.k]
+            else:
+                selected = select_diverse(scored, args.k, *options)
+            latencies.append(time.perf_counter() - started)
+            share, distinct = measure(selected)
+            repeated.append(share)
+            passages.append(distinct)
+        print(f"  {label + ':':<22} repeated text {statistics.mean(repeated):6.1%}   "
+              f"distinct passages {statistics.mean(passages):5.2f}   "
+              f"p50 {statistics.median(latencies) * 1000:6.2f} ms")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark near-duplicate suppression and MMR")
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--candidates", type=int, default=20)
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--overlap", type=int, default=30, help="Words shared by neighbouring chunks")
+    parser.add_argument("--repeat-rate", type=float, default=0.3, help="Share of chunks reprinting a better one")
+    parser.add_argument("--threshold", type=float, default=0.8)
+    parser.add_argument("--mmr-lambda", type=float, default=0.7)
+    parser.add_argument("--seed", type=int, default=0)
+    main(parser.parse_args())
@@ -0,0 +1,96 @@
+"""
+Benchmark query embedding micro-batching against a rate-limited embedder
+
+The stub provider charges a fixed latency per call plus a little per text
+and, like a rate-limited API account, serves a limited number of calls at
+once. Distinct queries arrive concurrently; each variant reports throughput,
+request latency and how many calls the provider received.
+
+Usage:
+    python benchmarks/bench_embedding_batching.py --requests 2000 --concurrency 200
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+from pathlib import Path
+
+# Add the project root to the path so we can import app modules
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+# Settings require these to be present; the benchmark never talks to them
+for name in ("POSTGRES_SERVER", "POSTGRES_USER", "POSTGRES_PASSWORD", "POSTGRES_DB",
+             "QDRANT_HOST", "QDRANT_API_KEY", "OPENAI_API_KEY"):
+    os.environ.setdefault(name, "bench")
+
+from app.utils.embedding_batcher import EmbeddingMicroBatcher
+
+
+class RateLimitedEmbedder:
+    """Embedding provider stub: per-call latency and a cap on concurrent calls"""
+
+    def __init__(self, call_latency: float, text_latency: float, max_concurrent_calls: int):
+        self.call_latency = call_latency
+        self.text_latency = text_latency
+        self.slots = asyncio.Semaphore(max_concurrent_calls)
+        self.calls = 0
+
+    async def aembed_documents(self, texts):
+        async with self.slots:
+            self.calls += 1
+            await asyncio.sleep(self.call_latency + self.text_latency * len(texts))
+            return [[float(len(text))] * 8 for text in texts]
+
+    async def aembed_query(self, text):
+        return (await self.aembed_documents([text]))[0]
+
+
+async def run(embed, total: int, concurrency: int):
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+
+    async def one(i):
+        async with semaphore:
+            started = time.perf_counter()
+            await embed(f"question number {i} about the lighthouse")
+            latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(total)))
+    return time.perf_counter() - started, latencies
+
+
+def report(name: str, elapsed: float, latencies, calls: int):
+    ordered = sorted(latencies)
+    p99 = ordered[min(len(ordered) - 1, int(len(ordered) * 0.99))]
+    print(f"{name + ':':<10} {len(latencies) / elapsed:8.1f} req/s   p50 {statistics.median(ordered) * 1000:7.1f} ms   "
+          f"p99 {p99 * 1000:7.1f} ms   provider calls {calls}")
+
+
+async def main(args):
+    print(f"requests={args.requests} concurrency={args.concurrency} call={args.call_latency_ms}ms "
+          f"max_concurrent_calls={args.max_concurrent_calls} max_wait={args.max_wait_ms}ms max_batch={args.max_batch}")
+
+    embedder = RateLimitedEmbedder(args.call_latency_ms / 1000, args.text_latency_ms / 1000, args.max_concurrent_calls)
+    elapsed, latencies = await run(embedder.aembed_query, args.requests, args.concurrency)
+    report("single", elapsed, latencies, embedder.calls)
+
+    embedder = RateLimitedEmbedder(args.call_latency_ms / 1000, args.text_latency_ms / 1000, args.max_concurrent_calls)
+    batcher = EmbeddingMicroBatcher(embedder.aembed_documents, args.max_wait_ms / 1000, args.max_batch)
+    elapsed, latencies = await run(batcher.embed, args.requests, args.concurrency)
+    report("batched", elapsed, latencies, embedder.calls)
+    print(f"avg batch size {batcher.stats()['avg_batch_size']:.1f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark query embedding micro-batching")
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=200)
+    parser.add_argument("--call-latency-ms", type=float, default=40.0, help="Fixed cost of one provider call")
+    parser.add_argument("--text-latency-ms", type=float, default=0.2, help="Extra cost per text in a call")
+    parser.add_argument("--max-concurrent-calls", type=int, default=8, help="Provider-side concurrency limit")
+    parser.add_argument("--max-wait-ms", type=float, default=5.0)
+    parser.add_argument("--max-batch", type=int, default=64)
+    asyncio.run(main(parser.parse_args()))
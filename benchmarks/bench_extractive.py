@@ -0,0 +1,135 @@
+"""
+Benchmark per-request CPU time of the extractive answer generator
+
+Compares the previous _simple_response_generator (split on '.', substring
+scans of every query word in every sentence) with the extractive answer
+engine, both on raw text (sentences split per request, as in
+selected_text_only mode) and on chunks carrying the sentence metadata
+written at ingest time (global mode).
+
+Usage:
+    python benchmarks/bench_extractive.py --requests 2000 --chunks 4
+"""
+import argparse
+import os
+import random
+import sys
+import time
+from pathlib import Path
+
+# Add the project root to the path so we can import app modules
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+# Settings require these to be present; the benchmark never talks to them
+for name in ("POSTGRES_SERVER", "POSTGRES_USER", "POSTGRES_PASSWORD", "POSTGRES_DB",
+             "QDRANT_HOST", "QDRANT_API_KEY", "OPENAI_API_KEY"):
+    os.environ.setdefault(name, "bench")
+
+from app.utils.answer_extraction import extract_answer, index_sentences
+
+# Topic words the queries ask about, sprinkled into otherwise generic prose
+TOPIC_WORDS = (
+    "lighthouse keeper rowed evening trim lamp daughter kept logbook recorded passing ship storm "
+    "harbour captain fog signal island supply boat winter lantern oil gull cliff tide rocks wreck"
+).split()
+FILLER_WORDS = (
+    "the a of and to in that it was he she for on as with his her they at be this from had by "
+    "not but what all were when we there can an your which their said if do will each about how up "
+    "out them then many some so these would other into has more two like him see time could no "
+    "make than first been its who now people my made over did down only way find use may water "
+    "long little very after words called just where most know get through back much before go good "
+    "new write our used me man too any day same right look think also around another came come work"
+).split()
+TOPIC_RATE = 0.08
+
+QUERIES = [
+    "Who kept the logbook of the lighthouse?",
+    "What happened to the ship during the storm?",
+    "Where did the supply boat land in winter?",
+    "Did the keeper trim the lamp every evening?",
+]
+
+
+def legacy_response_generator(query: str, context: str) -> str:
+    """Copy of the previous RAGService._simple_response_generator, for comparison"""
+    query_lower = query.lower()
+    context_lower = context.lower()
+
+    if query_lower.startswith(("is", "are", "was", "were", "can", "could", "will", "would", "do", "does", "did", "have", "has", "had")):
+        if any(word in context_lower for word in ["yes", "true", "correct", "indeed", "certainly", "definitely", "exactly"]):
+            return f"Based on the provided content, the answer appears to be yes. {context[:200]}{'...' if len(context) > 200 else ''}"
+        elif any(word in context_lower for word in ["no", "false", "incorrect", "not", "never", "none"]):
+            return f"Based on the provided content, the answer appears to be no. {context[:200]}{'...' if len(context) > 200 else ''}"
+        else:
+            return f"Based on the provided content: {context[:300]}{'...' if len(context) > 300 else ''}"
+
+    sentences = context.split('.')
+    relevant_sentences = []
+
+    for sentence in sentences:
+        sentence_lower = sentence.lower()
+        for word in query_lower.split():
+            if len(word) > 3 and word in sentence_lower:
+                relevant_sentences.append(sentence.strip())
+                break
+
+    if relevant_sentences:
+        response = f"According to the book: {' '.join(relevant_sentences[:2])}"
+        if len(relevant_sentences) > 2:
+            response += "..."
+        return response
+    else:
+        return f"Based on the provided content: {context[:300]}{'...' if len(context) > 300 else ''}"
+
+
+def make_chunk(rng: random.Random, size: int) -> str:
+    sentences = []
+    length = 0
+    while length < size:
+        words = (
+            rng.choice(TOPIC_WORDS) if rng.random() < TOPIC_RATE else rng.choice(FILLER_WORDS)
+            for _ in range(rng.randint(6, 18))
+        )
+        sentence = " ".join(words).capitalize() + "."
+        sentences.append(sentence)
+        length += len(sentence) + 1
+    return " ".join(sentences)
+
+
+def cpu_time_per_request(handler, total: int) -> float:
+    start = time.process_time()
+    for i in range(total):
+        handler(QUERIES[i % len(QUERIES)])
+    return (time.process_time() - start) / total
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=2000, help="Requests per variant")
+    parser.add_argument("--chunks", type=int, default=4, help="Context chunks per request")
+    parser.add_argument("--chunk-size", type=int, default=1000, help="Characters per chunk")
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    chunks = [make_chunk(rng, args.chunk_size) for _ in range(args.chunks)]
+    context = "\n\n".join(chunks)
+    raw_passages = [(chunk, None) for chunk in chunks]
+    # What retrieval hands over for chunks ingested with sentence metadata
+    indexed_passages = [(chunk, index_sentences(chunk)) for chunk in chunks]
+
+    variants = [
+        ("legacy", lambda query: legacy_response_generator(query, context)),
+        ("engine (raw text)", lambda query: extract_answer(query, raw_passages)),
+        ("engine (ingested)", lambda query: extract_answer(query, indexed_passages)),
+    ]
+
+    print(f"requests={args.requests} chunks={args.chunks} chunk_size={args.chunk_size}")
+    baseline = None
+    for name, handler in variants:
+        per_request = cpu_time_per_request(handler, args.requests)
+        baseline = baseline or per_request
+        print(f"{name + ':':<20} {per_request * 1e6:8.1f} us/request  {baseline / per_request:5.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+"""
+Report memory saved and recall lost by int8 vector quantization
+
+Builds the local index with int8 codes over clustered vectors (see
+bench_ann_recall.py), then searches the same queries exactly over
+float32, over the codes alone and over the codes with float32 rescoring at
+several oversampling factors. Recall@k is measured against exact float32
+search. Memory is what each variant keeps resident: the float32 matrix
+without quantization, the int8 codes with it (the float32 matrix stays
+memory-mapped and only rescored rows are read). Qdrant's int8 scalar
+quantization with always_ram and on-disk originals has the same footprint.
+
+Usage:
+    python benchmarks/bench_quantization.py --size 100000 --dimension 1536 --oversampling 1,2,4
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+# Add the project root to the path so we can import app modules
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+# Settings require these to be present; the benchmark never talks to them
+for name in ("POSTGRES_SERVER", "POSTGRES_USER", "POSTGRES_PASSWORD", "POSTGRES_DB",
+             "QDRANT_HOST", "QDRANT_API_KEY", "OPENAI_API_KEY"):
+    os.environ.setdefault(name, "bench")
+
+from qdrant_client.http import models
+from app.utils.local_index import LocalVectorIndex
+
+COLLECTION = "bench_quantization"
+UPSERT_BATCH = 2000
+
+
+def make_data(args, rng):
+    count = args.size + args.queries
+    topics = rng.normal(size=(args.topics, args.dimension))
+    vectors = topics[rng.integers(args.topics, size=count)] + args.spread * rng.normal(size=(count, args.dimension))
+    vectors = vectors.astype(np.float32)
+    return vectors[:args.size], vectors[args.size:]
+
+
+async def timed_search(index, queries, k: int, params):
+    results, latencies = [], []
+    for query in queries:
+        started = time.perf_counter()
+        hits = await index.search(COLLECTION, query_vector=query.tolist(), limit=k, search_params=params)
+        latencies.append(time.perf_counter() - started)
+        results.append([hit.id for hit in hits])
+    return results, latencies
+
+
+def report(name: str, latencies, found, truth, resident_bytes: int, baseline_bytes: int):
+    recall = np.mean([len(set(f) & set(t)) / len(t) for f, t in zip(found, truth) if t])
+    saved = 1 - resident_bytes / baseline_bytes
+    print(f"  {name + ':':<22} recall@k {recall:6.3f}   p50 {statistics.median(latencies) * 1000:7.2f} ms   "
+          f"resident {resident_bytes / 2 ** 20:8.1f} MiB ({saved:4.0%} saved)")
+
+
+async def main(args):
+    rng = np.random.default_rng(args.seed)
+    vectors, queries = make_data(args, rng)
+    print(f"{args.size} chunks x {args.dimension} dims, {args.queries} queries, k={args.k}, index={args.index}")
+
+    with tempfile.TemporaryDirectory() as path:
+        writer = LocalVectorIndex(path, index_type=args.index, min_points=0, quantization="int8")
+        await writer.create_collection(
+            COLLECTION, vectors_config=models.VectorParams(size=args.dimension, distance=models.Distance.COSINE)
+        )
+        for start in range(0, args.size, UPSERT_BATCH):
+            await writer.upsert(COLLECTION, [
+                models.PointStruct(id=i, vector=vectors[i].tolist(), payload={})
+                for i in range(start, min(start + UPSERT_BATCH, args.size))
+            ], wait=False)
+        started = time.perf_counter()
+        built = await writer.build_index(COLLECTION)
+        print(f"  index build:           {time.perf_counter() - started:7.2f} s")
+
+        # A fresh process: float32 memory-mapped, codes in memory
+        index = LocalVectorIndex(path, index_type=args.index, quantization="int8")
+        baseline_bytes, code_bytes = built["vector_bytes"], built["code_bytes"]
+
+        exact = models.SearchParams(exact=True, quantization=models.QuantizationSearchParams(ignore=True))
+        truth, latencies = await timed_search(index, queries, args.k, exact)
+        report("float32 exact", latencies, truth, truth, baseline_bytes, baseline_bytes)
+
+        no_rescore = models.SearchParams(quantization=models.QuantizationSearchParams(rescore=False))
+        found, latencies = await timed_search(index, queries, args.k, no_rescore)
+        report("int8, no rescore", latencies, found, truth, code_bytes, baseline_bytes)
+
+        for oversampling in (float(n) for n in args.oversampling.split(",")):
+            params = models.SearchParams(
+                quantization=models.QuantizationSearchParams(rescore=True, oversampling=oversampling)
+            )
+            found, latencies = await timed_search(index, queries, args.k, params)
+            report(f"int8, rescore x{oversampling:g}", latencies, found, truth, code_bytes, baseline_bytes)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Report memory saved and recall lost by int8 quantization")
+    parser.add_argument("--size", type=int, default=100000)
+    parser.add_argument("--dimension", type=int, default=384)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--index", choices=["flat", "ivf"], default="flat")
+    parser.add_argument("--oversampling", default="1,2,4", help="Comma-separated oversampling factors to measure")
+    parser.add_argument("--topics", type=int, default=2000, help="Topic centers of the clustered data")
+    parser.add_argument("--spread", type=float, default=1.0, help="Noise around each topic center")
+    parser.add_argument("--seed", type=int, default=0)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,139 @@
+"""
+Benchmark the second-stage reranker: latency, event loop stalls and hit rate at small k
+
+Each request has --candidates synthetic chunks as first-stage results.
+One of them contains the answer, placed at a random rank with a noisy
+retrieval score. The benchmark reports:
+- how often the answer chunk is among the top k, with and without
+  reranking, for several k (fewer chunks in the prompt);
+- the reranker's latency per question;
+- the longest stall of a 1 ms heartbeat on the event loop while
+  --concurrency requests rerank at once, once through the reranker's
+  thread pool and once scored inline on the loop.
+
+Usage:
+    python benchmarks/bench_rerank.py --requests 500 --candidates 50 --reranker lexical
+"""
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import sys
+import time
+from pathlib import Path
+
+# Add the project root to the path so we can import app modules
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+# Settings require these to be present; the benchmark never talks to them
+for name in ("POSTGRES_SERVER", "POSTGRES_USER", "POSTGRES_PASSWORD", "POSTGRES_DB",
+             "QDRANT_HOST", "QDRANT_API_KEY", "OPENAI_API_KEY"):
+    os.environ.setdefault(name, "bench")
+
+from langchain_core.documents import Document
+from app.core.config import settings
+from app.utils.reranking import CrossEncoderReranker, LexicalReranker
+
+TOPIC_WORDS = (
+    "lighthouse keeper rowed evening trim lamp daughter kept logbook recorded passing ship storm "
+    "harbour captain fog signal island supply boat winter lantern oil gull cliff tide rocks wreck"
+).split()
+FILLER_WORDS = (
+    "the a of and to in that it was he she for on as with his her they at be this from had by "
+    "not but what all were when we there can an your which their said if do will each about how up "
+    "out them then many some so these would other into has more two like him see time could no "
+    "make than first been its who now people my made over did down only way find use may water"
+).split()
+CHUNK_WORDS = 90
+TOPIC_RATE = 0.1
+
+
+def make_request(rng: random.Random, candidates: int):
+    """A question, its first-stage (Document, score) candidates and the index of the answer chunk"""
+    subject = rng.sample(TOPIC_WORDS, 3)
+    question = f"Why did the {subject[0]} {subject[1]} the {subject[2]}?"
+
+    def chunk(words):
+        text = [rng.choice(TOPIC_WORDS) if rng.random() < TOPIC_RATE else rng.choice(FILLER_WORDS)
+                for _ in range(CHUNK_WORDS)]
+        position = rng.randrange(CHUNK_WORDS - len(words))
+        text[position:position + len(words)] = words
+        return " ".join(text)
+
+    # Distractors share single subject words; the answer has the whole phrase
+    texts = [chunk([rng.choice(subject)]) for _ in range(candidates)]
+    answer = rng.randrange(candidates)
+    texts[answer] = chunk([subject[0], subject[1], "the", subject[2]])
+    scores = sorted((rng.gauss(0.8, 0.05) for _ in range(candidates)), reverse=True)
+    return question, [(Document(page_content=text), score) for text, score in zip(texts, scores)], answer
+
+
+async def heartbeat(stop: asyncio.Event) -> float:
+    """Longest delay of a 1 ms sleep on the event loop until stopped"""
+    worst = 0.0
+    while not stop.is_set():
+        started = time.perf_counter()
+        await asyncio.sleep(0.001)
+        worst = max(worst, time.perf_counter() - started - 0.001)
+    return worst
+
+
+async def measure_stalls(reranker, requests, concurrency: int, inline: bool) -> float:
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one(question, candidates):
+        async with semaphore:
+            if inline:
+                reranker._rerank([question], [candidates], 4)
+                await asyncio.sleep(0)
+            else:
+                await reranker.rerank([question], [candidates], 4)
+
+    stop = asyncio.Event()
+    beat = asyncio.create_task(heartbeat(stop))
+    await asyncio.gather(*(one(question, candidates) for question, candidates, _ in requests))
+    stop.set()
+    return await beat
+
+
+async def main(args):
+    rng = random.Random(args.seed)
+    requests = [make_request(rng, args.candidates) for _ in range(args.requests)]
+    if args.reranker == "cross-encoder":
+        reranker = CrossEncoderReranker(settings.RERANK_MODEL)
+    else:
+        reranker = LexicalReranker(settings.RERANK_LEXICAL_WEIGHT, settings.BM25_K1, settings.BM25_B)
+    await reranker.rerank([requests[0][0]], [requests[0][1]], 1)  # Load the model outside the timings
+
+    print(f"{args.requests} questions, {args.candidates} candidates each, reranker={reranker.name}")
+    ranks, latencies = [], []
+    for question, candidates, answer in requests:
+        started = time.perf_counter()
+        ranked = (await reranker.rerank([question], [candidates], args.candidates))[0]
+        latencies.append(time.perf_counter() - started)
+        ranks.append([doc.page_content for doc, _ in ranked].index(candidates[answer][0].page_content))
+
+    for k in (int(n) for n in args.k.split(",")):
+        retrieved = sum(answer < k for _, _, answer in requests) / len(requests)
+        reranked = sum(rank < k for rank in ranks) / len(ranks)
+        print(f"  answer in top {k:<3} retrieval order {retrieved:6.1%}   reranked {reranked:6.1%}")
+    ordered = sorted(latencies)
+    print(f"  rerank latency:       p50 {statistics.median(ordered) * 1000:7.2f} ms   "
+          f"p99 {ordered[int(len(ordered) * 0.99)] * 1000:7.2f} ms")
+
+    for inline in (False, True):
+        worst = await measure_stalls(reranker, requests, args.concurrency, inline)
+        label = "inline on the loop" if inline else "reranker thread pool"
+        print(f"  longest loop stall, {label + ':':<21} {worst * 1000:8.2f} ms")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the second-stage reranker")
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--candidates", type=int, default=50)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--k", default="1,2,4,8", help="Comma-separated prompt sizes to report hit rates for")
+    parser.add_argument("--reranker", choices=["lexical", "cross-encoder"], default="lexical")
+    parser.add_argument("--seed", type=int, default=0)
+    asyncio.run(main(parser.parse_args()))
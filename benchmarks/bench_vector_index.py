@@ -0,0 +1,143 @@
+"""
+Benchmark the in-process vector index against the Qdrant search path
+
+For each collection size, random unit vectors with a source_file payload
+are loaded into both backends; queries are then searched one at a time,
+unfiltered and filtered to one file, and per-query latency is reported.
+The local index is measured after a reload, i.e. searching its
+memory-mapped matrix as a freshly started server would.
+
+Without --qdrant-url, Qdrant runs as qdrant-client's in-process ":memory:"
+mode, which has no network hop; pass the URL of a real server to include
+one (that is the latency the local index removes).
+
+Usage:
+    python benchmarks/bench_vector_index.py --sizes 10000,100000,1000000 --dimension 384
+    python benchmarks/bench_vector_index.py --sizes 100000 --qdrant-url http://localhost:6333
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+# Add the project root to the path so we can import app modules
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+# Settings require these to be present; the benchmark never talks to them
+for name in ("POSTGRES_SERVER", "POSTGRES_USER", "POSTGRES_PASSWORD", "POSTGRES_DB",
+             "QDRANT_HOST", "QDRANT_API_KEY", "OPENAI_API_KEY"):
+    os.environ.setdefault(name, "bench")
+
+from qdrant_client import AsyncQdrantClient
+from qdrant_client.http import models
+from app.utils.local_index import LocalVectorIndex
+
+COLLECTION = "bench_vector_index"
+FILES = 20  # Distinct source_file values; a filtered search keeps 1/FILES of the points
+UPSERT_BATCH = 1000
+
+
+def random_unit_vectors(rng, count: int, dimension: int) -> np.ndarray:
+    vectors = rng.normal(size=(count, dimension)).astype(np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+async def load(client, vectors: np.ndarray):
+    await client.create_collection(
+        collection_name=COLLECTION,
+        vectors_config=models.VectorParams(size=vectors.shape[1], distance=models.Distance.COSINE)
+    )
+    for start in range(0, len(vectors), UPSERT_BATCH):
+        points = [
+            models.PointStruct(
+                id=i,
+                vector=vectors[i].tolist(),
+                payload={"text": f"chunk {i}", "metadata": {"source_file": f"file-{i % FILES}.md"}}
+            )
+            for i in range(start, min(start + UPSERT_BATCH, len(vectors)))
+        ]
+        await client.upsert(collection_name=COLLECTION, points=points, wait=False)
+
+
+async def measure(client, queries: np.ndarray, k: int, filter_condition=None):
+    latencies = []
+    for query in queries:
+        started = time.perf_counter()
+        await client.search(
+            collection_name=COLLECTION,
+            query_vector=query.tolist(),
+            limit=k,
+            query_filter=filter_condition,
+            score_threshold=0.0
+        )
+        latencies.append(time.perf_counter() - started)
+    return latencies
+
+
+def report(name: str, latencies):
+    ordered = sorted(latencies)
+    p99 = ordered[min(len(ordered) - 1, int(len(ordered) * 0.99))]
+    print(f"  {name + ':':<24} p50 {statistics.median(ordered) * 1000:8.2f} ms   p99 {p99 * 1000:8.2f} ms   "
+          f"{len(ordered) / sum(ordered):9.1f} q/s")
+
+
+async def bench_size(args, size: int, rng):
+    vectors = random_unit_vectors(rng, size, args.dimension)
+    queries = random_unit_vectors(rng, args.queries, args.dimension)
+    file_filter = models.Filter(must=[
+        models.FieldCondition(key="metadata.source_file", match=models.MatchValue(value="file-3.md"))
+    ])
+    print(f"{size} chunks x {args.dimension} dims, {args.queries} queries, k={args.k}")
+
+    with tempfile.TemporaryDirectory() as path:
+        started = time.perf_counter()
+        writer = LocalVectorIndex(path)
+        await load(writer, vectors)
+        await writer.close()
+        print(f"  local build + save:       {time.perf_counter() - started:8.2f} s")
+
+        index = LocalVectorIndex(path)
+        started = time.perf_counter()
+        await index.get_collection(COLLECTION)
+        print(f"  local load (mmap):        {(time.perf_counter() - started) * 1000:8.2f} ms")
+        report("local", await measure(index, queries, args.k))
+        report("local, filtered", await measure(index, queries, args.k, file_filter))
+
+    if args.skip_qdrant:
+        return
+    client = AsyncQdrantClient(url=args.qdrant_url) if args.qdrant_url else AsyncQdrantClient(location=":memory:")
+    try:
+        await client.delete_collection(collection_name=COLLECTION)
+        started = time.perf_counter()
+        await load(client, vectors)
+        print(f"  qdrant load:              {time.perf_counter() - started:8.2f} s")
+        label = "qdrant" if args.qdrant_url else "qdrant :memory:"
+        report(label, await measure(client, queries, args.k))
+        report(f"{label}, filtered", await measure(client, queries, args.k, file_filter))
+        await client.delete_collection(collection_name=COLLECTION)
+    finally:
+        await client.close()
+
+
+async def main(args):
+    rng = np.random.default_rng(args.seed)
+    for size in (int(size) for size in args.sizes.split(",")):
+        await bench_size(args, size, rng)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the local vector index against Qdrant")
+    parser.add_argument("--sizes", default="10000,100000", help="Comma-separated collection sizes")
+    parser.add_argument("--dimension", type=int, default=384)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=4)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--qdrant-url", default=None, help="Qdrant server to compare with (default: in-process)")
+    parser.add_argument("--skip-qdrant", action="store_true", help="Only measure the local index")
+    asyncio.run(main(parser.parse_args()))
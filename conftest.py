@@ -0,0 +1,84 @@
+import os
+
+# Temporarily set environment variables to allow imports
+os.environ.setdefault('POSTGRES_SERVER', 'test')
+os.environ.setdefault('POSTGRES_USER', 'test')
+os.environ.setdefault('POSTGRES_PASSWORD', 'test')
+os.environ.setdefault('POSTGRES_DB', 'test')
+os.environ.setdefault('QDRANT_HOST', 'test')
+os.environ.setdefault('QDRANT_API_KEY', 'test')
+os.environ.setdefault('OPENAI_API_KEY', 'test')
+
+import pytest
+from qdrant_client.http import models
+
+from app.core.config import settings
+from app.utils.vector_store import vector_store_manager
+
+
+class RecordingEmbeddings:
+    """Embeds the i-th text of a call as the i-th unit vector"""
+
+    def __init__(self, dimension):
+        self.dimension = dimension
+        self.calls = []
+
+    async def aembed_documents(self, texts):
+        self.calls.append(list(texts))
+        return [[float(i % self.dimension == j) for j in range(self.dimension)] for i in range(len(texts))]
+
+
+class RecordingClient:
+    """
+    Answers every search request with the chunks
+
+    Scores fall by 0.1 per position; with rotate, the best match of the i-th
+    request of a batch is chunk i. Vectors are returned when a request asks
+    for them and vectors were given.
+    """
+
+    def __init__(self, chunks, vectors=None, rotate=False):
+        self.chunks = chunks
+        self.vectors = vectors
+        self.rotate = rotate
+        self.batches = []
+
+    @property
+    def requests(self):
+        return [request for batch in self.batches for request in batch]
+
+    async def search_batch(self, collection_name, requests, **kwargs):
+        self.batches.append(requests)
+        return [
+            [
+                models.ScoredPoint(
+                    id=j, version=0, score=0.9 - 0.1 * ((j - i) % len(self.chunks) if self.rotate else j),
+                    payload={"text": text, "metadata": {"chunk_id": j}},
+                    vector=self.vectors[j] if self.vectors is not None and request.with_vector else None
+                )
+                for j, text in enumerate(self.chunks)
+            ][:request.limit]
+            for i, request in enumerate(requests)
+        ]
+
+
+@pytest.fixture
+def stub_vector_store(monkeypatch):
+    """
+    Point the global vector store manager at recording stand-ins in dense mode
+
+    Returns a function taking the chunks (and RecordingClient options) that
+    installs the stubs and returns (embeddings, client).
+    """
+    def install(chunks, vectors=None, rotate=False):
+        embeddings = RecordingEmbeddings(len(chunks))
+        client = RecordingClient(chunks, vectors, rotate)
+        monkeypatch.setattr(vector_store_manager, "embeddings", embeddings)
+        monkeypatch.setattr(vector_store_manager, "client", client)
+        monkeypatch.setattr(vector_store_manager, "_initialized", True)
+        monkeypatch.setattr(vector_store_manager, "query_cache", None)
+        monkeypatch.setattr(settings, "RETRIEVAL_MODE", "dense")
+        monkeypatch.setattr(settings, "SIMILARITY_THRESHOLD", 0.0)
+        return embeddings, client
+
+    return install
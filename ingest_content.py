@@ -1,3 +1,4 @@
+import asyncio
 import os
 import sys
 from typing import List
@@ -6,17 +7,17 @@ from pathlib import Path
 # Add the project root to the path so we can import app modules
 sys.path.insert(0, str(Path(__file__).resolve().parent))
 
-from app.utils.text_processing import split_text, preprocess_text
-from app.utils.vector_store import vector_store_manager
+from app.utils.ingestion import IngestionPipeline
 
 
-def ingest_content_from_file(file_path: str, metadata: dict = None) -> bool:
+async def ingest_content_from_file(file_path: str, metadata: dict = None, pipeline: IngestionPipeline = None) -> bool:
     """
     Ingest content from a text file into the vector store
     
     Args:
         file_path: Path to the text file to ingest
         metadata: Additional metadata to store with the content
+        pipeline: Ingestion pipeline to use (optional, defaults from settings)
         
     Returns:
         True if successful, False otherwise
@@ -26,47 +27,28 @@ def ingest_content_from_file(file_path: str, metadata: dict = None) -> bool:
         return False
     
     try:
-        # Read the file content
-        with open(file_path, 'r', encoding='utf-8') as file:
-            content = file.read()
-        
-        # Preprocess the content
-        processed_content = preprocess_text(content)
-        
-        # Split into chunks
-        chunks = split_text(processed_content)
-        
-        # Prepare metadata for each chunk
-        chunk_metadata = []
-        for i, chunk in enumerate(chunks):
-            chunk_meta = metadata or {}
-            chunk_meta['chunk_id'] = i
-            chunk_meta['source_file'] = os.path.basename(file_path)
-            chunk_metadata.append(chunk_meta)
-        
-        print(f"Processing {len(chunks)} chunks...")
-        
-        # Add to vector store
-        ids = vector_store_manager.add_texts(
-            texts=chunks,
-            metadatas=chunk_metadata
-        )
-        
-        print(f"Successfully ingested {len(chunks)} chunks with IDs: {ids[:5]}{'...' if len(ids) > 5 else ''}")
-        return True
+        pipeline = pipeline or IngestionPipeline()
+        stats = await pipeline.run([(file_path, metadata)])
+        print(stats.report())
+        return stats.failed == 0
     
     except Exception as e:
         print(f"Error ingesting content: {str(e)}")
         return False
 
 
-def ingest_content_from_directory(directory_path: str, extensions: List[str] = ['.txt', '.md']) -> bool:
+async def ingest_content_from_directory(
+    directory_path: str,
+    extensions: List[str] = ['.txt', '.md'],
+    pipeline: IngestionPipeline = None
+) -> bool:
     """
     Ingest content from all files in a directory with specified extensions
     
     Args:
         directory_path: Path to the directory containing content files
         extensions: List of file extensions to process
+        pipeline: Ingestion pipeline to use (optional, defaults from settings)
         
     Returns:
         True if successful, False otherwise
@@ -76,24 +58,23 @@ def ingest_content_from_directory(directory_path: str, extensions: List[str] = [
         return False
     
     try:
-        files_processed = 0
-        for root, dirs, files in os.walk(directory_path):
-            for file in files:
+        files = []
+        for root, dirs, filenames in os.walk(directory_path):
+            for file in sorted(filenames):
                 if any(file.lower().endswith(ext) for ext in extensions):
                     file_path = os.path.join(root, file)
                     metadata = {
                         'source_directory': os.path.basename(directory_path),
                         'file_path': file_path
                     }
-                    success = ingest_content_from_file(file_path, metadata)
-                    if success:
-                        files_processed += 1
-                        print(f"Successfully processed: {file_path}")
-                    else:
-                        print(f"Failed to process: {file_path}")
+                    files.append((file_path, metadata))
+
+        pipeline = pipeline or IngestionPipeline()
+        stats = await pipeline.run(files, root=directory_path)
         
-        print(f"Content ingestion complete. Processed {files_processed} files.")
-        return True
+        print(f"Content ingestion complete. Processed {stats.files_processed} files.")
+        print(stats.report())
+        return stats.failed == 0
     
     except Exception as e:
         print(f"Error ingesting content from directory: {str(e)}")
@@ -109,19 +90,63 @@ if __name__ == "__main__":
                         help="Type of path provided (file or directory)")
     parser.add_argument("--extensions", nargs="+", default=[".txt", ".md"],
                         help="File extensions to process when processing a directory")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="Processes used to read and split files (default: INGEST_WORKERS)")
+    parser.add_argument("--batch-size", type=int, default=None,
+                        help="Chunks per embedding call and upsert (default: INGEST_BATCH_SIZE)")
+    parser.add_argument("--embed-concurrency", type=int, default=None,
+                        help="Embedding batches in flight at once (default: INGEST_EMBED_CONCURRENCY)")
+    parser.add_argument("--manifest", default=None,
+                        help="Checkpoint manifest path (default: INGEST_MANIFEST_PATH)")
+    parser.add_argument("--no-resume", action="store_true",
+                        help="Ignore the checkpoint manifest and ingest everything again")
+    parser.add_argument("--incremental", action="store_true", default=None,
+                        help="Diff against stored chunks: embed only new/changed ones and delete stale ones")
+    parser.add_argument("--rebuild-lexical-index", action="store_true",
+                        help="Rebuild the local BM25 index from the whole collection after ingesting")
+    parser.add_argument("--rebuild-vector-index", action="store_true",
+                        help="Rebuild the local backend's IVF index and int8 codes even if nothing changed")
     
     args = parser.parse_args()
-    
-    if args.type == "file":
-        success = ingest_content_from_file(args.path, metadata={"source": "manual_ingestion"})
-    elif args.type == "directory":
-        success = ingest_content_from_directory(args.path, args.extensions)
-    else:
+
+    if args.type not in ("file", "directory"):
         print("Invalid type specified. Use 'file' or 'directory'.")
         sys.exit(1)
-    
+
+    async def main() -> bool:
+        # One event loop for the whole run: the vector store client is bound to
+        # the loop it was created in, so the rebuilds must not start another one
+        pipeline = IngestionPipeline(
+            workers=args.workers,
+            batch_size=args.batch_size,
+            embed_concurrency=args.embed_concurrency,
+            manifest_path=args.manifest,
+            resume=not args.no_resume,
+            incremental=args.incremental
+        )
+
+        if args.type == "file":
+            success = await ingest_content_from_file(args.path, metadata={"source": "manual_ingestion"}, pipeline=pipeline)
+        else:
+            success = await ingest_content_from_directory(args.path, args.extensions, pipeline=pipeline)
+
+        if success and (args.rebuild_lexical_index or args.rebuild_vector_index):
+            from app.utils.vector_store import vector_store_manager
+
+            if args.rebuild_lexical_index:
+                indexed = await vector_store_manager.rebuild_lexical_index()
+                print(f"Rebuilt lexical index with {indexed} chunks.")
+
+            if args.rebuild_vector_index:
+                index = await vector_store_manager.build_vector_index()
+                print(f"Rebuilt vector index: {index}." if index is not None else "Qdrant maintains its own vector index.")
+
+        return success
+
+    success = asyncio.run(main())
+
     if success:
         print("Content ingestion completed successfully.")
     else:
         print("Content ingestion failed.")
-        sys.exit(1)
\ No newline at end of file
+        sys.exit(1)
@@ -1,25 +1,33 @@
 from fastapi import FastAPI
-from app.routers import chat, session
+from app.routers import chat, session, stats
 from app.core.config import settings
 import uvicorn
 import os
 from contextlib import asynccontextmanager
-from sqlalchemy.ext.asyncio import create_async_engine
+from app.database.session import engine
 
 # Import models to register them with SQLAlchemy
 from app.models import chat_session
 
 # Import base for table creation
 from app.models.base import Base
+from app.database.write_behind import chat_history_writer
+from app.core.rag_service import rag_service
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    # Create database tables on startup
-    engine = create_async_engine(settings.database_url)
+    # Create database tables on startup, through the engine the requests use
     async with engine.begin() as conn:
         await conn.run_sync(Base.metadata.create_all)
+    if chat_history_writer is not None:
+        chat_history_writer.start()
+    # Load the reranker model before the first request rather than during it
+    if rag_service.reranker is not None:
+        await rag_service.reranker.warm_up()
     yield
-    # Shutdown
+    # Shutdown: flush queued chat messages before the process exits
+    if chat_history_writer is not None:
+        await chat_history_writer.close()
     await engine.dispose()
 
 app = FastAPI(
@@ -32,6 +40,7 @@ app = FastAPI(
 # Include API routers
 app.include_router(chat.router, prefix="/api/v1", tags=["chat"])
 app.include_router(session.router, prefix="/api/v1", tags=["session"])
+app.include_router(stats.router, prefix="/api/v1", tags=["stats"])
 
 @app.get("/")
 def read_root():
@@ -0,0 +1,75 @@
+import os
+
+# Temporarily set environment variables to allow imports
+os.environ.setdefault('POSTGRES_SERVER', 'test')
+os.environ.setdefault('POSTGRES_USER', 'test')
+os.environ.setdefault('POSTGRES_PASSWORD', 'test')
+os.environ.setdefault('POSTGRES_DB', 'test')
+os.environ.setdefault('QDRANT_HOST', 'test')
+os.environ.setdefault('QDRANT_API_KEY', 'test')
+os.environ.setdefault('OPENAI_API_KEY', 'test')
+
+from app.utils.answer_extraction import (
+    count_sentences, extract_answer, find_word, index_sentences, public_metadata
+)
+
+CHAPTER = (
+    "The keeper rowed out every evening. His daughter kept the logbook! "
+    "The logbook recorded every ship that passed the lighthouse.  Gulls nested on the cliff"
+)
+
+
+def test_index_sentences_spans_exclude_whitespace():
+    """Spans cover each sentence with its punctuation and nothing else"""
+    index = index_sentences(CHAPTER)
+    sentences = [CHAPTER[start:end] for start, end in zip(index["sentence_starts"], index["sentence_ends"])]
+
+    assert sentences == [
+        "The keeper rowed out every evening.",
+        "His daughter kept the logbook!",
+        "The logbook recorded every ship that passed the lighthouse.",
+        "Gulls nested on the cliff",
+    ]
+
+
+def test_find_word_matches_whole_words_only():
+    """Terms embedded in longer words are not hits"""
+    text = "the island was not known to the islanders"
+    assert find_word(text, "land") == -1
+    assert find_word(text, "not") == 15
+
+
+def test_best_scoring_sentences_come_first():
+    """The sentence matching the rarer and more query terms wins, with or without ingest metadata"""
+    query = "Who recorded ships passing the lighthouse logbook?"
+    expected = "According to the book: The logbook recorded every ship that passed the lighthouse. " \
+               "His daughter kept the logbook!"
+
+    assert extract_answer(query, [(CHAPTER, None)]) == expected
+    assert extract_answer(query, [(CHAPTER, index_sentences(CHAPTER))]) == expected
+
+
+def test_raw_text_is_split_like_ingested_chunks():
+    """Delimiting only the matching sentences of raw text finds the same sentences and count"""
+    texts = [
+        CHAPTER,
+        "Keeper ?! the keeper . . Keeper\n\nkeeper slept",
+        "  ...keeper!keeper?  keeper .",
+        "Nothing here. keeper",
+    ]
+    for text in texts:
+        metadata = index_sentences(text)
+        assert count_sentences(text) == len(metadata["sentence_starts"])
+        for query in ("Where is the keeper?", "What did the keeper and his daughter keep?"):
+            assert extract_answer(query, [(text, None)]) == extract_answer(query, [(text, metadata)])
+
+
+def test_yes_no_questions_use_whole_words():
+    """'not' inside 'nothing' no longer turns an answer into a no"""
+    assert "appears to be no" in extract_answer("Did the lamp fail?", [("The lamp did not fail.", None)])
+    assert "appears to be" not in extract_answer("Did the lamp fail?", [("Nothing failed.", None)])
+
+
+def test_public_metadata_hides_sentence_index():
+    metadata = {"chunk_id": 3, **index_sentences(CHAPTER)}
+    assert public_metadata(metadata) == {"chunk_id": 3}
@@ -0,0 +1,61 @@
+import asyncio
+import os
+
+# Temporarily set environment variables to allow imports
+os.environ.setdefault('POSTGRES_SERVER', 'test')
+os.environ.setdefault('POSTGRES_USER', 'test')
+os.environ.setdefault('POSTGRES_PASSWORD', 'test')
+os.environ.setdefault('POSTGRES_DB', 'test')
+os.environ.setdefault('QDRANT_HOST', 'test')
+os.environ.setdefault('QDRANT_API_KEY', 'test')
+os.environ.setdefault('OPENAI_API_KEY', 'test')
+
+from app.core.rag_service import RAGService
+from app.utils.query_expansion import expand_query
+from app.utils.vector_store import vector_store_manager
+
+CHUNKS = [
+    "The keeper rowed out every evening to trim the lamp.",
+    "His daughter kept the logbook and recorded every passing ship.",
+    "A storm wrecked the supply boat on the rocks in winter.",
+]
+
+
+def test_compound_questions_are_expanded():
+    """A compound question is searched whole and part by part; simple ones are not expanded"""
+    assert expand_query("Who kept the logbook and why did the boat sink?", 3) == [
+        "Who kept the logbook and why did the boat sink?", "Who kept the logbook", "why did the boat sink"
+    ]
+    assert expand_query("Who kept the logbook?", 3) == ["Who kept the logbook?"]
+    assert expand_query("Who kept the logbook and why did the boat sink?", 1) == [
+        "Who kept the logbook and why did the boat sink?"
+    ]
+
+
+def test_similarity_search_batch_is_one_request(stub_vector_store):
+    """Several queries are searched with a single search_batch call"""
+    _, client = stub_vector_store(CHUNKS, rotate=True)
+
+    results = asyncio.run(vector_store_manager.similarity_search_batch(["keeper", "logbook"], k=2))
+
+    assert len(client.batches) == 1
+    assert [len(docs) for docs in results] == [2, 2]
+    assert client.batches[0][0].with_payload is True
+
+
+def test_answer_batch_shares_embedding_call_and_search(stub_vector_store):
+    """A list of questions costs one embedding call and one Qdrant round trip"""
+    embeddings, client = stub_vector_store(CHUNKS, rotate=True)
+    service = RAGService()
+    service.semantic_cache = None
+    questions = ["Who trimmed the lamp?", "Who kept the logbook?", "What wrecked the supply boat and when did it sink?"]
+
+    results = asyncio.run(service.answer_batch(questions))
+
+    assert len(results) == 3
+    assert all(result["sources"] for result in results)
+    assert len(client.batches) == 1
+    # Two questions plus the compound one and its two parts
+    assert len(client.batches[0]) == 5
+    if vector_store_manager.query_batcher is not None:
+        assert len(embeddings.calls) == 1
@@ -0,0 +1,94 @@
+import asyncio
+import os
+import threading
+
+# Temporarily set environment variables to allow imports
+os.environ.setdefault('POSTGRES_SERVER', 'test')
+os.environ.setdefault('POSTGRES_USER', 'test')
+os.environ.setdefault('POSTGRES_PASSWORD', 'test')
+os.environ.setdefault('POSTGRES_DB', 'test')
+os.environ.setdefault('QDRANT_HOST', 'test')
+os.environ.setdefault('QDRANT_API_KEY', 'test')
+os.environ.setdefault('OPENAI_API_KEY', 'test')
+
+from langchain_core.documents import Document
+from app.core.config import settings
+from app.utils import vector_store
+from app.utils.bm25_index import BM25Index, reciprocal_rank_fusion
+from app.utils.vector_store import vector_store_manager
+
+
+def build_index():
+    index = BM25Index()
+    index.add("a", "Captain Ahab hunts the white whale across the ocean.", {"chunk_id": 0})
+    index.add("b", "Ishmael signs on to the Pequod in Nantucket.", {"chunk_id": 1})
+    index.add("c", "The whale, the whale, the whale sinks the ship.", {"chunk_id": 2})
+    return index
+
+
+def test_search_ranks_exact_terms_first():
+    """Rare terms dominate and coverage reports the share of query terms matched"""
+    results = build_index().search("Ahab whale", k=3)
+
+    assert results[0][0].metadata["chunk_id"] == 0
+    assert results[0][2] == 1.0
+    assert {doc.metadata["chunk_id"] for doc, _, _ in results} == {0, 2}
+
+
+def test_remove_and_replace_keep_postings_consistent():
+    """Removed chunks disappear from results and from the vocabulary"""
+    index = build_index()
+    index.remove("b")
+    assert index.search("Pequod") == []
+    assert "pequod" not in index.postings
+
+    index.add("a", "Queequeg carves his coffin.", {"chunk_id": 0})
+    assert index.search("Ahab") == []
+    assert len(index) == 2
+
+
+def test_save_and_load_round_trip(tmp_path):
+    """A loaded index ranks exactly like the saved one"""
+    index = build_index()
+    path = str(tmp_path / "bm25.pkl")
+    index.save(path)
+
+    loaded = BM25Index.load(path)
+    assert [(d.page_content, s) for d, s, _ in loaded.search("whale")] == \
+        [(d.page_content, s) for d, s, _ in index.search("whale")]
+
+
+def test_reciprocal_rank_fusion_rewards_agreement():
+    """A document found by both retrievers beats one ranked first by only one"""
+    a, b, c = (Document(page_content=text) for text in ("a", "b", "c"))
+    fused = reciprocal_rank_fusion([[a, b], [c, b]], k=3)
+
+    assert fused[0][0].page_content == "b"
+    assert len(fused) == 3
+
+
+def test_lexical_lookups_reload_the_index_off_the_event_loop(tmp_path, monkeypatch):
+    """Concurrent lookups share one reload of the saved index, done in a worker thread"""
+    path = str(tmp_path / "bm25.pkl")
+    build_index().save(path)
+    loads = []
+    load = BM25Index.load
+
+    def recording_load(index_path):
+        loads.append(threading.current_thread() is threading.main_thread())
+        return load(index_path)
+
+    monkeypatch.setattr(vector_store.BM25Index, "load", staticmethod(recording_load))
+    monkeypatch.setattr(settings, "BM25_INDEX_PATH", path)
+    monkeypatch.setattr(vector_store_manager, "_lexical_index", None)
+    monkeypatch.setattr(vector_store_manager, "_lexical_index_dirty", False)
+    monkeypatch.setattr(vector_store_manager, "_lexical_index_reload", None)
+
+    async def lookups():
+        return await asyncio.gather(*(vector_store_manager.lexical_lookup(query) for query in ["Ahab", "Pequod"]))
+
+    ahab, pequod = asyncio.run(lookups())
+
+    assert loads == [False]
+    assert ahab[0][0].metadata["chunk_id"] == 0
+    assert pequod[0][0].metadata["chunk_id"] == 1
@@ -0,0 +1,122 @@
+import asyncio
+import os
+
+# Temporarily set environment variables to allow imports
+os.environ.setdefault('POSTGRES_SERVER', 'test')
+os.environ.setdefault('POSTGRES_USER', 'test')
+os.environ.setdefault('POSTGRES_PASSWORD', 'test')
+os.environ.setdefault('POSTGRES_DB', 'test')
+os.environ.setdefault('QDRANT_HOST', 'test')
+os.environ.setdefault('QDRANT_API_KEY', 'test')
+os.environ.setdefault('OPENAI_API_KEY', 'test')
+
+from datetime import datetime, timezone
+
+from sqlalchemy.dialects import postgresql, sqlite
+
+from app.database.chat_history import chat_turn_rows, persist_chat_turn
+
+
+class RecordingResult:
+    def __init__(self, rows):
+        self.rows = rows
+
+    def scalars(self):
+        return self
+
+    def first(self):
+        return self.rows[0] if self.rows else None
+
+    def scalar_one(self):
+        return self.rows[0]
+
+
+class RecordingConnection:
+    def __init__(self, dialect):
+        self.dialect = dialect
+
+
+class RecordingSession:
+    """Stands in for AsyncSession and records the SQL each round trip would send"""
+
+    def __init__(self, dialect, rows):
+        self.dialect = dialect
+        self.rows = rows
+        self.statements = []
+        self.params = []
+        self.commits = 0
+
+    async def connection(self):
+        return RecordingConnection(self.dialect)
+
+    async def execute(self, statement):
+        compiled = statement.compile(dialect=self.dialect)
+        self.statements.append(str(compiled))
+        self.params.append(compiled.params)
+        return RecordingResult(self.rows)
+
+    async def commit(self):
+        self.commits += 1
+
+
+def test_new_session_turn_is_one_statement_on_postgres():
+    """Session and message pair are written by a single INSERT with a data-modifying CTE"""
+    db = RecordingSession(postgresql.asyncpg.dialect(), rows=[7, 7])
+
+    session_id = asyncio.run(persist_chat_turn(db, None, "Who kept the logbook?", "His daughter."))
+
+    assert session_id == 7
+    assert len(db.statements) == 1
+    assert db.commits == 1
+    statement = db.statements[0]
+    assert statement.startswith("WITH new_session AS")
+    assert "INSERT INTO chat_sessions" in statement
+    assert "INSERT INTO chat_messages" in statement
+
+
+def test_existing_session_check_is_folded_into_insert():
+    """An unknown session inserts nothing and is reported as None"""
+    db = RecordingSession(postgresql.asyncpg.dialect(), rows=[])
+
+    session_id = asyncio.run(persist_chat_turn(db, 42, "Who kept the logbook?", "His daughter."))
+
+    assert session_id is None
+    assert len(db.statements) == 1
+    assert "FROM chat_sessions" in db.statements[0]
+    assert "SELECT" in db.statements[0] and not db.statements[0].startswith("SELECT")
+
+
+def test_other_dialects_use_two_statements_in_one_transaction():
+    """Without DML in CTEs the session insert runs first, still committed once"""
+    db = RecordingSession(sqlite.dialect(), rows=[3, 3])
+
+    session_id = asyncio.run(persist_chat_turn(db, None, "Who kept the logbook?", "His daughter."))
+
+    assert session_id == 3
+    assert len(db.statements) == 2
+    assert db.commits == 1
+
+
+def test_batched_turn_rows_keep_conversation_order():
+    """Rows of several turns get increasing timestamps, each question before its answer"""
+    asked_at = datetime(2024, 1, 1, tzinfo=timezone.utc)
+
+    rows = chat_turn_rows(7, [("q1", "a1"), ("q2", "a2")], asked_at)
+
+    assert [(role, content) for _, role, content, _ in rows] == [
+        ("user", "q1"), ("assistant", "a1"), ("user", "q2"), ("assistant", "a2")
+    ]
+    timestamps = [timestamp for _, _, _, timestamp in rows]
+    assert timestamps == sorted(set(timestamps))
+
+
+def test_turn_messages_carry_question_and_answer_times():
+    """The question is stamped when it was asked and the answer after it, not both with now()"""
+    db = RecordingSession(postgresql.asyncpg.dialect(), rows=[7, 7])
+    asked_at = datetime(2024, 1, 1, tzinfo=timezone.utc)
+
+    asyncio.run(persist_chat_turn(db, 7, "Who kept the logbook?", "His daughter.", asked_at))
+
+    timestamps = [value for value in db.params[0].values() if isinstance(value, datetime)]
+    assert timestamps[0] == asked_at
+    assert timestamps[1] > asked_at
@@ -0,0 +1,53 @@
+import os
+
+# Temporarily set environment variables to allow imports
+os.environ.setdefault('POSTGRES_SERVER', 'test')
+os.environ.setdefault('POSTGRES_USER', 'test')
+os.environ.setdefault('POSTGRES_PASSWORD', 'test')
+os.environ.setdefault('POSTGRES_DB', 'test')
+os.environ.setdefault('QDRANT_HOST', 'test')
+os.environ.setdefault('QDRANT_API_KEY', 'test')
+os.environ.setdefault('OPENAI_API_KEY', 'test')
+
+from langchain_core.documents import Document
+
+from app.utils.context_packing import pack_context
+
+
+def chunk(text, tokens):
+    return Document(page_content=text, metadata={"token_count": tokens})
+
+
+def test_packs_best_chunks_first():
+    """Higher-scoring chunks are packed first and kept whole"""
+    scored = [(chunk("low", 10), 0.71), (chunk("best", 10), 0.95), (chunk("mid", 10), 0.80)]
+
+    packed = pack_context(scored, max_tokens=21)
+
+    assert [doc.page_content for doc in packed] == ["best", "mid"]
+
+
+def test_skips_chunks_that_do_not_fit():
+    """A large chunk that overflows the budget does not block smaller ones"""
+    scored = [(chunk("best", 50), 0.9), (chunk("huge", 500), 0.85), (chunk("small", 30), 0.8)]
+
+    packed = pack_context(scored, max_tokens=100)
+
+    assert [doc.page_content for doc in packed] == ["best", "small"]
+
+
+def test_deduplicates_chunks():
+    """The same text retrieved twice occupies one slot"""
+    scored = [(chunk("same text", 10), 0.9), (chunk(" same text ", 10), 0.8), (chunk("other", 10), 0.7)]
+
+    packed = pack_context(scored, max_tokens=100)
+
+    assert [doc.page_content for doc in packed] == ["same text", "other"]
+
+
+def test_estimates_legacy_chunks_without_counts():
+    """Chunks stored before token counts existed are estimated, not tokenized"""
+    legacy = Document(page_content="x" * 400, metadata={})
+
+    assert pack_context([(legacy, 0.9)], max_tokens=99) == []
+    assert pack_context([(legacy, 0.9)], max_tokens=100) == [legacy]
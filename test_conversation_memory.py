@@ -0,0 +1,87 @@
+import asyncio
+import os
+
+# Temporarily set environment variables to allow imports
+os.environ.setdefault('POSTGRES_SERVER', 'test')
+os.environ.setdefault('POSTGRES_USER', 'test')
+os.environ.setdefault('POSTGRES_PASSWORD', 'test')
+os.environ.setdefault('POSTGRES_DB', 'test')
+os.environ.setdefault('QDRANT_HOST', 'test')
+os.environ.setdefault('QDRANT_API_KEY', 'test')
+os.environ.setdefault('OPENAI_API_KEY', 'test')
+
+from langchain_core.documents import Document
+
+from app.core.conversation_memory import ConversationMemory, ConversationTurn, is_follow_up
+
+
+def make_memory(stored=None, max_sessions=10):
+    loads = []
+
+    async def load(session_id, limit):
+        loads.append(session_id)
+        return list((stored or {}).get(session_id, []))[-limit:]
+
+    memory = ConversationMemory(history_loader=load, max_sessions=max_sessions, max_turns=3, context_terms=4)
+    return memory, loads
+
+
+KEEPER_DOCS = [Document(
+    page_content="The keeper rowed out in the storm because his daughter was on the supply boat.",
+    metadata={"chunk_id": 3}
+)]
+
+
+def test_follow_up_detection():
+    """Questions leaning on earlier turns are told apart from standalone ones"""
+    assert is_follow_up("Why did he do that?")
+    assert is_follow_up("And the daughter?")
+    assert not is_follow_up("Who kept the logbook of the lighthouse?")
+    assert not is_follow_up("What did the keeper record in the logbook when his lamp failed?")
+
+
+def test_follow_up_reuses_previous_context():
+    """A follow-up is condensed with the last turn and answered from its chunks"""
+    memory, loads = make_memory()
+    memory.record(1, ConversationTurn("Why did the keeper row out?", "Why did the keeper row out?", KEEPER_DOCS))
+
+    query, docs = asyncio.run(memory.resolve(1, "Why did he do that?"))
+    assert query == "Why did he do that? keeper row out"
+    assert docs is KEEPER_DOCS
+
+    # A new term the previous chunks do not contain needs a fresh retrieval
+    query, docs = asyncio.run(memory.resolve(1, "What about his wife?"))
+    assert query.startswith("What about his wife? keeper")
+    assert docs is None
+    assert loads == []
+    assert memory.stats()["context_reused"] == 1
+
+
+def test_miss_loads_questions_from_database_once():
+    """A session not in memory is restored from the stored questions, then cached"""
+    memory, loads = make_memory(stored={5: ["Who kept the lighthouse logbook?"]})
+
+    query, docs = asyncio.run(memory.resolve(5, "Why did she keep it?"))
+    assert "logbook" in query and "lighthouse" in query
+    assert docs is None  # The database does not know which chunks were retrieved
+
+    asyncio.run(memory.resolve(5, "Why did she keep it?"))
+    assert loads == [5]
+
+    # Standalone questions never touch the database
+    asyncio.run(memory.resolve(6, "Who kept the lighthouse logbook?"))
+    assert loads == [5]
+
+
+def test_least_recently_used_session_is_evicted():
+    """Memory holds at most max_sessions sessions"""
+    memory, _ = make_memory(max_sessions=2)
+    for session_id in (1, 2):
+        memory.record(session_id, ConversationTurn("q", "q", []))
+    asyncio.run(memory.history(1))  # Session 2 is now least recently used
+    memory.record(3, ConversationTurn("q", "q", []))
+
+    assert len(memory) == 2
+    assert memory.stats()["evictions"] == 1
+    asyncio.run(memory.history(2))
+    assert memory.stats()["misses"] == 1
@@ -0,0 +1,52 @@
+import asyncio
+import os
+import sqlite3
+
+# Temporarily set environment variables to allow imports
+os.environ.setdefault('POSTGRES_SERVER', 'test')
+os.environ.setdefault('POSTGRES_USER', 'test')
+os.environ.setdefault('POSTGRES_PASSWORD', 'test')
+os.environ.setdefault('POSTGRES_DB', 'test')
+os.environ.setdefault('QDRANT_HOST', 'test')
+os.environ.setdefault('QDRANT_API_KEY', 'test')
+os.environ.setdefault('OPENAI_API_KEY', 'test')
+
+from sqlalchemy import exc
+from sqlalchemy.util import greenlet_spawn
+
+from app.core.config import settings
+from app.database.pool import InstrumentedAsyncPool
+from app.database.session import engine
+
+
+def test_shared_engine_uses_settings():
+    """The process-wide engine is built from the DB_* settings and does not echo SQL"""
+    assert isinstance(engine.pool, InstrumentedAsyncPool)
+    assert engine.pool.size() == settings.DB_POOL_SIZE
+    assert engine.echo is False
+
+
+def test_pool_reports_waiters_and_timeouts():
+    """A checkout blocked on an exhausted pool is visible as a waiter until it times out"""
+    pool = InstrumentedAsyncPool(lambda: sqlite3.connect(":memory:"), pool_size=1, max_overflow=0, timeout=0.2)
+
+    async def scenario():
+        held = await greenlet_spawn(pool.connect)
+        blocked = asyncio.create_task(greenlet_spawn(pool.connect))
+        await asyncio.sleep(0.05)
+        during = pool.stats()
+        try:
+            await blocked
+        except exc.TimeoutError:
+            pass
+        held.close()
+        return during
+
+    during = asyncio.run(scenario())
+    assert during["checked_out"] == 1
+    assert during["waiters"] == 1
+
+    stats = pool.stats()
+    assert stats["waiters"] == 0
+    assert stats["timeouts"] == 1
+    assert stats["wait_ms_max"] >= 150
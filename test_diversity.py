@@ -0,0 +1,89 @@
+import asyncio
+import os
+
+# Temporarily set environment variables to allow imports
+os.environ.setdefault('POSTGRES_SERVER', 'test')
+os.environ.setdefault('POSTGRES_USER', 'test')
+os.environ.setdefault('POSTGRES_PASSWORD', 'test')
+os.environ.setdefault('POSTGRES_DB', 'test')
+os.environ.setdefault('QDRANT_HOST', 'test')
+os.environ.setdefault('QDRANT_API_KEY', 'test')
+os.environ.setdefault('OPENAI_API_KEY', 'test')
+
+from langchain_core.documents import Document
+
+from app.core.config import settings
+from app.core.rag_service import RAGService
+from app.utils.diversity import VECTOR_METADATA_KEY, drop_near_duplicates, mmr_select, select_diverse
+
+PASSAGE = (
+    "Every evening the keeper climbed the hundred and twelve stairs of the tower, trimmed the wick, "
+    "polished the great lens and wound the clockwork that turned the light until morning. On foggy nights "
+    "he also rang the bell every half minute, and in the small hours he wrote the weather, the passing "
+    "ships and the oil burned into the station log before waking his assistant for the second watch."
+)
+CHUNKS = [
+    "The log for that winter records a storm that wrecked the supply boat on the northern rocks. " + PASSAGE,
+    PASSAGE + " His daughter kept the logbook.",
+    "The island school had eleven pupils, taught by the keeper's wife in the old boathouse. Lessons stopped "
+    "whenever the supply boat was sighted, because every child was needed to carry flour, lamp oil and "
+    "coal up the steep path from the landing stage to the cottages below the tower.",
+]
+
+
+def test_repeated_passages_are_dropped():
+    """A chunk mostly contained in a better one is dropped; chunks sharing a short overlap are kept"""
+    overlapping = CHUNKS[2][-50:] + (
+        " Gulls nested on the cliffs below the lantern room every spring, and the children counted the eggs "
+        "each May while their father painted the railings and tarred the roof of the fog signal house."
+    )
+    scored = [
+        (Document(page_content=CHUNKS[0]), 0.9),
+        (Document(page_content=CHUNKS[1]), 0.8),
+        (Document(page_content=CHUNKS[2]), 0.7),
+        (Document(page_content=overlapping), 0.6),
+    ]
+
+    kept = drop_near_duplicates(scored, threshold=0.8)
+
+    assert [doc.page_content for doc, _ in kept] == [CHUNKS[0], CHUNKS[2], overlapping]
+
+
+def test_mmr_trades_relevance_for_novelty():
+    """The second pick skips a near-copy of the first; lambda 1 ranks by relevance alone"""
+    scored = [(Document(page_content=f"chunk {i}"), score) for i, score in enumerate([0.9, 0.88, 0.7, 0.5])]
+    vectors = [[1.0, 0.0], [0.99, 0.1], [0.0, 1.0], None]
+
+    assert [doc.page_content for doc, _ in mmr_select(scored, vectors, 2, 0.5)] == ["chunk 0", "chunk 2"]
+    assert [doc.page_content for doc, _ in mmr_select(scored, vectors, 2, 1.0)] == ["chunk 0", "chunk 1"]
+
+
+def test_select_diverse_strips_vectors_and_keeps_mmr_order():
+    scored = [
+        (Document(page_content=text, metadata={"chunk_id": i, VECTOR_METADATA_KEY: vector}), score)
+        for i, (text, vector, score) in enumerate(zip(CHUNKS, [[1.0, 0.0], [0.0, 1.0], [0.0, 1.0]], [0.9, 0.8, 0.7]))
+    ]
+
+    selected = select_diverse(scored, k=2, duplicate_threshold=0.8, lambda_mult=0.5)
+
+    assert [doc.metadata for doc, _ in selected] == [{"chunk_id": 0}, {"chunk_id": 2}]
+    assert selected[0][1] > selected[1][1]
+    assert VECTOR_METADATA_KEY in scored[0][0].metadata
+
+
+def test_global_retrieval_packs_diverse_chunks(stub_vector_store, monkeypatch):
+    """With MMR, searches return vectors and the context skips the repeated passage"""
+    _, client = stub_vector_store(CHUNKS, vectors=[[1.0, 0.0], [0.95, 0.3], [0.0, 1.0]])
+    monkeypatch.setattr(settings, "CONTEXT_DEDUP_ENABLED", False)
+    monkeypatch.setattr(settings, "MMR_ENABLED", True)
+    monkeypatch.setattr(settings, "MMR_LAMBDA", 0.5)
+    monkeypatch.setattr(settings, "DIVERSITY_CANDIDATES", 20)
+    service = RAGService()
+    service.semantic_cache = None
+    service.reranker = None
+
+    retrieval = asyncio.run(service._retrieve_global("What did the keeper do every evening?", k=2))
+
+    assert [request.limit for request in client.requests] == [20]
+    assert client.requests[0].with_vector is True
+    assert [doc.metadata for doc in retrieval["docs"]] == [{"chunk_id": 0}, {"chunk_id": 2}]
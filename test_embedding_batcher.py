@@ -0,0 +1,72 @@
+import asyncio
+import os
+
+# Temporarily set environment variables to allow imports
+os.environ.setdefault('POSTGRES_SERVER', 'test')
+os.environ.setdefault('POSTGRES_USER', 'test')
+os.environ.setdefault('POSTGRES_PASSWORD', 'test')
+os.environ.setdefault('POSTGRES_DB', 'test')
+os.environ.setdefault('QDRANT_HOST', 'test')
+os.environ.setdefault('QDRANT_API_KEY', 'test')
+os.environ.setdefault('OPENAI_API_KEY', 'test')
+
+from app.utils.embedding_batcher import EmbeddingMicroBatcher
+
+
+class RecordingEmbedder:
+    def __init__(self, fail=False):
+        self.calls = []
+        self.fail = fail
+
+    async def embed_documents(self, texts):
+        self.calls.append(list(texts))
+        await asyncio.sleep(0)
+        if self.fail:
+            raise RuntimeError("rate limited")
+        return [[float(len(text))] for text in texts]
+
+
+def test_concurrent_queries_share_one_call():
+    """Queries arriving within the wait window go out as one batch, deduplicated"""
+    embedder = RecordingEmbedder()
+    batcher = EmbeddingMicroBatcher(embedder.embed_documents, max_wait=0.01, max_batch=64)
+
+    async def burst():
+        return await asyncio.gather(*(batcher.embed(text) for text in ["a", "bb", "a", "ccc"]))
+
+    vectors = asyncio.run(burst())
+
+    assert vectors == [[1.0], [2.0], [1.0], [3.0]]
+    assert embedder.calls == [["a", "bb", "ccc"]]
+    assert batcher.stats()["requests"] == 4
+
+
+def test_full_batch_is_sent_without_waiting():
+    """Reaching max_batch sends the batch immediately; the rest start a new one"""
+    embedder = RecordingEmbedder()
+    batcher = EmbeddingMicroBatcher(embedder.embed_documents, max_wait=10, max_batch=2)
+
+    async def burst():
+        # The third query would wait 10 s for company, so only the first two are awaited
+        first = asyncio.gather(batcher.embed("a"), batcher.embed("b"))
+        third = asyncio.ensure_future(batcher.embed("c"))
+        vectors = await asyncio.wait_for(first, 1)
+        third.cancel()
+        return vectors
+
+    assert asyncio.run(burst()) == [[1.0], [1.0]]
+    assert embedder.calls == [["a", "b"]]
+
+
+def test_failed_call_fails_every_waiting_query():
+    """An embedding error reaches every request of the batch"""
+    embedder = RecordingEmbedder(fail=True)
+    batcher = EmbeddingMicroBatcher(embedder.embed_documents, max_wait=0.01)
+
+    async def burst():
+        return await asyncio.gather(batcher.embed("a"), batcher.embed("b"), return_exceptions=True)
+
+    results = asyncio.run(burst())
+
+    assert all(isinstance(result, RuntimeError) for result in results)
+    assert batcher.stats()["failures"] == 1
@@ -0,0 +1,143 @@
+import asyncio
+import os
+
+# Temporarily set environment variables to allow imports
+os.environ.setdefault('POSTGRES_SERVER', 'test')
+os.environ.setdefault('POSTGRES_USER', 'test')
+os.environ.setdefault('POSTGRES_PASSWORD', 'test')
+os.environ.setdefault('POSTGRES_DB', 'test')
+os.environ.setdefault('QDRANT_HOST', 'test')
+os.environ.setdefault('QDRANT_API_KEY', 'test')
+os.environ.setdefault('OPENAI_API_KEY', 'test')
+
+import pytest
+
+from app.utils.embedding_cache import DiskEmbeddingCache, EmbeddingCache, InMemoryEmbeddingCache, make_cache_key
+from app.utils.embedding_store import EmbeddingStore
+
+
+def test_cache_key_normalizes_query():
+    """Case, whitespace and trailing punctuation do not change the key"""
+    assert make_cache_key("Who is  the hero?", "m") == make_cache_key("who is the hero", "m")
+    assert make_cache_key("who is the hero", "m") != make_cache_key("who is the hero", "other")
+
+
+def test_memory_cache_hits_and_misses():
+    """Counters track lookups"""
+    cache = InMemoryEmbeddingCache(max_entries=10, max_bytes=1024)
+
+    async def scenario():
+        assert await cache.get("a") is None
+        await cache.set("a", [1.0, 2.0])
+        assert await cache.get("a") == [1.0, 2.0]
+
+    asyncio.run(scenario())
+    stats = cache.stats()
+    assert stats["hits"] == 1
+    assert stats["misses"] == 1
+    assert stats["entries"] == 1
+
+
+def test_memory_cache_lru_eviction():
+    """Least recently used entries go first when a bound is exceeded"""
+    # Each vector is 2 float32 values = 8 bytes, so 16 bytes holds two entries
+    cache = InMemoryEmbeddingCache(max_entries=10, max_bytes=16)
+
+    async def scenario():
+        await cache.set("a", [1.0, 1.0])
+        await cache.set("b", [2.0, 2.0])
+        await cache.get("a")  # "b" is now least recently used
+        await cache.set("c", [3.0, 3.0])
+        return await cache.get("a"), await cache.get("b"), await cache.get("c")
+
+    a, b, c = asyncio.run(scenario())
+    assert a == [1.0, 1.0]
+    assert b is None
+    assert c == [3.0, 3.0]
+    assert cache.stats()["evictions"] == 1
+
+
+def test_memory_cache_ttl_expiry():
+    """Expired entries are treated as misses"""
+    cache = InMemoryEmbeddingCache(max_entries=10, max_bytes=1024, ttl_seconds=1)
+
+    async def scenario():
+        await cache.set("a", [1.0])
+        # Pretend the entry was written long ago
+        vector, _ = cache._entries["a"]
+        cache._entries["a"] = (vector, 1.0)
+        return await cache.get("a")
+
+    assert asyncio.run(scenario()) is None
+    assert cache.stats()["entries"] == 0
+
+
+def test_incomplete_cache_backend_fails_on_creation():
+    """A backend missing _get or _set cannot be instantiated"""
+    class WriteOnlyCache(EmbeddingCache):
+        async def _set(self, key, vector):
+            pass
+
+    with pytest.raises(TypeError):
+        WriteOnlyCache()
+
+
+def test_disk_cache_persists(tmp_path):
+    """Vectors survive reopening the cache file and the entry bound holds"""
+    path = str(tmp_path / "cache.sqlite3")
+
+    async def write():
+        cache = DiskEmbeddingCache(path, max_entries=2)
+        await cache.set("a", [0.5, 0.25])
+        await cache.set("b", [1.5])
+        await cache.set("c", [2.5])
+
+    async def read():
+        cache = DiskEmbeddingCache(path, max_entries=2)
+        return await cache.get("a"), await cache.get("c")
+
+    asyncio.run(write())
+    a, c = asyncio.run(read())
+    assert a is None
+    assert c == [2.5]
+
+
+def test_disk_cache_handles_concurrent_lookups(tmp_path):
+    """Concurrent worker-thread reads and writes share the connection safely"""
+    cache = DiskEmbeddingCache(str(tmp_path / "cache.sqlite3"), max_entries=1000)
+
+    async def burst():
+        await asyncio.gather(*(cache.set(str(i), [float(i)]) for i in range(50)))
+        return await asyncio.gather(*(cache.get(str(i)) for i in range(50)))
+
+    vectors = asyncio.run(burst())
+    assert vectors == [[float(i)] for i in range(50)]
+    assert cache.stats()["hits"] == 50
+
+
+def test_embedding_store_round_trip(tmp_path):
+    """Stored document embeddings are found again after reopening the store"""
+    store = EmbeddingStore(str(tmp_path), "test-model")
+    assert store.get_many(["a", "b"]) == [None, None]
+
+    store.put_many(["a", "b", "a"], [[1.0, 2.0], [3.0, 4.0], [9.0, 9.0]])
+    assert len(store) == 2
+
+    reopened = EmbeddingStore(str(tmp_path), "test-model")
+    assert reopened.get_many(["b", "c", "a"]) == [[3.0, 4.0], None, [1.0, 2.0]]
+    assert reopened.stats()["hits"] == 2
+    assert reopened.stats()["misses"] == 1
+
+
+def test_embedding_store_recovers_from_torn_write(tmp_path):
+    """A partial trailing row left by a crash is discarded on load"""
+    store = EmbeddingStore(str(tmp_path), "test-model")
+    store.put_many(["a"], [[1.0, 2.0]])
+    with open(store.vectors_path, "ab") as file:
+        file.write(b"\x00\x00")
+
+    reopened = EmbeddingStore(str(tmp_path), "test-model")
+    reopened.put_many(["b"], [[3.0, 4.0]])
+
+    again = EmbeddingStore(str(tmp_path), "test-model")
+    assert again.get_many(["a", "b"]) == [[1.0, 2.0], [3.0, 4.0]]
@@ -0,0 +1,108 @@
+import asyncio
+import os
+from types import SimpleNamespace
+
+# Temporarily set environment variables to allow imports
+os.environ.setdefault('POSTGRES_SERVER', 'test')
+os.environ.setdefault('POSTGRES_USER', 'test')
+os.environ.setdefault('POSTGRES_PASSWORD', 'test')
+os.environ.setdefault('POSTGRES_DB', 'test')
+os.environ.setdefault('QDRANT_HOST', 'test')
+os.environ.setdefault('QDRANT_API_KEY', 'test')
+os.environ.setdefault('OPENAI_API_KEY', 'test')
+
+import numpy as np
+import pytest
+from qdrant_client.http import models
+
+from app.core.config import settings
+from app.utils.embedding_providers import (
+    EmbeddingProvider, HashingEmbeddingProvider, OpenAIEmbeddingProvider, create_embedding_provider
+)
+from app.utils.vector_store import VectorStoreManager
+
+
+class CollectionClient:
+    """Stands in for AsyncQdrantClient's collection management calls"""
+
+    def __init__(self, existing_size=None):
+        self.existing_size = existing_size
+        self.created = None
+
+    async def get_collection(self, name):
+        if self.existing_size is None:
+            raise RuntimeError("not found")
+        vectors = models.VectorParams(size=self.existing_size, distance=models.Distance.COSINE)
+        return SimpleNamespace(config=SimpleNamespace(params=SimpleNamespace(vectors=vectors)))
+
+    async def create_collection(self, collection_name, vectors_config, **kwargs):
+        self.created = vectors_config
+
+    async def create_payload_index(self, **kwargs):
+        pass
+
+
+def test_incomplete_provider_fails_on_creation():
+    """A provider that does not report its dimension cannot be instantiated"""
+    class DimensionlessProvider(EmbeddingProvider):
+        model_id = "dimensionless"
+
+        def embed_documents(self, texts):
+            return [[0.0] for _ in texts]
+
+        def embed_query(self, text):
+            return [0.0]
+
+    with pytest.raises(TypeError):
+        DimensionlessProvider()
+
+
+def test_hashing_embeddings_are_deterministic_and_normalized():
+    """Same text, same unit vector; shared vocabulary means higher similarity"""
+    provider = HashingEmbeddingProvider(dimension=256)
+
+    keeper = np.array(provider.embed_query("The keeper trimmed the lighthouse lamp"))
+    again = np.array(asyncio.run(provider.aembed_documents(["The keeper trimmed the lighthouse lamp"]))[0])
+    related = np.array(provider.embed_query("Who trimmed the lamp of the lighthouse?"))
+    unrelated = np.array(provider.embed_query("A storm wrecked the supply boat"))
+
+    assert keeper.shape == (256,)
+    assert np.allclose(keeper, again)
+    assert abs(np.linalg.norm(keeper) - 1.0) < 1e-6
+    assert keeper @ related > keeper @ unrelated
+
+
+def test_provider_is_selected_by_settings(monkeypatch):
+    """EMBEDDING_PROVIDER picks the implementation and EMBEDDING_DIMENSION its size"""
+    monkeypatch.setattr(settings, "EMBEDDING_PROVIDER", "hashing")
+    monkeypatch.setattr(settings, "EMBEDDING_DIMENSION", 64)
+
+    provider = create_embedding_provider()
+
+    assert provider.dimension == 64
+    assert provider.model_id == "hashing-64"
+
+
+def test_openai_dimension_comes_from_the_model():
+    """Known models need no configuration; unknown ones need EMBEDDING_DIMENSION"""
+    assert OpenAIEmbeddingProvider("text-embedding-3-large", "key").dimension == 3072
+    assert OpenAIEmbeddingProvider("text-embedding-3-large", "key", dimensions=256).model_id == "text-embedding-3-large@256"
+    with pytest.raises(ValueError):
+        OpenAIEmbeddingProvider("custom-model", "key")
+    with pytest.raises(ValueError):
+        OpenAIEmbeddingProvider("text-embedding-ada-002", None).embed_query("offline")
+
+
+def test_collection_uses_provider_dimension(monkeypatch):
+    """The collection is created with the provider's vector size, and a mismatch is refused"""
+    monkeypatch.setattr(settings, "EMBEDDING_PROVIDER", "hashing")
+    monkeypatch.setattr(settings, "EMBEDDING_DIMENSION", 128)
+    manager = VectorStoreManager()
+
+    manager.client = CollectionClient()
+    asyncio.run(manager._ensure_collection_exists())
+    assert manager.client.created.size == 128
+
+    manager.client = CollectionClient(existing_size=1536)
+    with pytest.raises(ValueError):
+        asyncio.run(manager._ensure_collection_exists())
@@ -0,0 +1,292 @@
+import asyncio
+import os
+
+# Temporarily set environment variables to allow imports
+os.environ.setdefault('POSTGRES_SERVER', 'test')
+os.environ.setdefault('POSTGRES_USER', 'test')
+os.environ.setdefault('POSTGRES_PASSWORD', 'test')
+os.environ.setdefault('POSTGRES_DB', 'test')
+os.environ.setdefault('QDRANT_HOST', 'test')
+os.environ.setdefault('QDRANT_API_KEY', 'test')
+os.environ.setdefault('OPENAI_API_KEY', 'test')
+
+import pytest
+
+from app.core.config import settings
+from app.utils import ingestion
+from app.utils.ingestion import IngestionPipeline, iter_text_blocks
+from app.utils.local_index import LocalVectorIndex
+from app.utils.vector_store import VectorStoreManager
+
+
+class RecordingStore:
+    """Stands in for the vector store manager and can fail chosen batches"""
+
+    embedding_store = None
+
+    def __init__(self, fail_on_call=None):
+        self.fail_on_call = fail_on_call
+        self.calls = 0
+        self.texts = []
+        self.points = {}
+        self.version_bumps = 0
+
+    async def add_texts(self, texts, metadatas=None, ids=None, batch_size=None, wait=True, bump_version=True):
+        self.calls += 1
+        if self.calls == self.fail_on_call:
+            raise RuntimeError("embedding API unavailable")
+        self.texts.extend(texts)
+        for id_, metadata in zip(ids, metadatas):
+            self.points[id_] = dict(metadata)
+        return ids
+
+    async def get_source_points(self, source_path):
+        return {
+            id_: dict(metadata) for id_, metadata in self.points.items()
+            if metadata["source_path"] == source_path
+        }
+
+    async def update_metadata(self, metadatas, wait=True):
+        self.points.update(metadatas)
+
+    async def delete_points(self, ids, wait=True):
+        for id_ in ids:
+            del self.points[id_]
+
+    def save_lexical_index(self):
+        pass
+
+    async def checkpoint(self):
+        pass
+
+    def ensure_lexically_indexed(self, ids, texts, metadatas):
+        return 0
+
+    async def build_vector_index(self):
+        return None
+
+    async def bump_collection_version(self):
+        self.version_bumps += 1
+
+
+def write_book(path, paragraphs, edited=None):
+    text = "\n\n".join(
+        f"Paragraph {i} tells how the keeper trimmed the lamp on night number {i}."
+        if i != edited else f"Paragraph {i} was rewritten: a storm broke the lamp that night."
+        for i in range(paragraphs)
+    )
+    path.write_text(text, encoding="utf-8")
+
+
+def test_iter_text_blocks_cuts_on_paragraphs(tmp_path):
+    """Blocks end at blank lines and together reproduce the file"""
+    path = tmp_path / "book.txt"
+    path.write_text("one\n\ntwo\n\nthree\n", encoding="utf-8")
+
+    blocks = list(iter_text_blocks(str(path), block_size=4))
+
+    assert "".join(blocks) == path.read_text(encoding="utf-8")
+    assert blocks[0] == "one\n\n"
+
+
+def test_pipeline_resumes_from_checkpoint(tmp_path, monkeypatch):
+    """Batches completed before a failure are not embedded again on the next run"""
+    book = tmp_path / "book.txt"
+    write_book(book, 12)
+    manifest = str(tmp_path / "manifest.json")
+
+    failing = RecordingStore(fail_on_call=2)
+    monkeypatch.setattr(ingestion, "vector_store_manager", failing)
+    first = IngestionPipeline(workers=1, batch_size=1, embed_concurrency=1,
+                              manifest_path=manifest, progress=lambda message: None)
+    stats = asyncio.run(first.run([(str(book), {"source": "test"})]))
+    assert stats.files_failed == 1
+    assert stats.batches_failed == 1
+
+    recovering = RecordingStore()
+    monkeypatch.setattr(ingestion, "vector_store_manager", recovering)
+    second = IngestionPipeline(workers=1, batch_size=1, embed_concurrency=1,
+                               manifest_path=manifest, progress=lambda message: None)
+    stats = asyncio.run(second.run([(str(book), {"source": "test"})]))
+
+    assert stats.files_processed == 1
+    assert stats.batches == 1
+    assert stats.batches_skipped == len(failing.texts)
+    assert recovering.version_bumps == 1
+
+    # A third run finds the file complete and does nothing
+    idle = RecordingStore()
+    monkeypatch.setattr(ingestion, "vector_store_manager", idle)
+    third = IngestionPipeline(workers=1, batch_size=1, manifest_path=manifest, progress=lambda message: None)
+    stats = asyncio.run(third.run([(str(book), {"source": "test"})]))
+    assert stats.files_skipped == 1
+    assert idle.calls == 0
+
+
+def test_changing_the_batch_size_discards_batch_progress(tmp_path, monkeypatch):
+    """Batch indices recorded under another batch size name other chunks, so nothing is skipped"""
+    book = tmp_path / "book.txt"
+    write_book(book, 80)
+    manifest = str(tmp_path / "manifest.json")
+
+    failing = RecordingStore(fail_on_call=3)
+    monkeypatch.setattr(ingestion, "vector_store_manager", failing)
+    first = IngestionPipeline(workers=1, batch_size=1, embed_concurrency=1,
+                              manifest_path=manifest, progress=lambda message: None)
+    failed = asyncio.run(first.run([(str(book), None)]))
+    assert failed.batches_failed == 1
+
+    recovering = RecordingStore()
+    monkeypatch.setattr(ingestion, "vector_store_manager", recovering)
+    second = IngestionPipeline(workers=1, batch_size=2, embed_concurrency=1,
+                               manifest_path=manifest, progress=lambda message: None)
+    stats = asyncio.run(second.run([(str(book), None)]))
+
+    assert stats.batches_skipped == 0
+    assert stats.files_processed == 1
+    # Batches of one chunk each: every chunk of the book is embedded again
+    assert len(recovering.texts) == failed.batches + failed.batches_failed
+
+
+def test_a_failing_file_does_not_stop_the_others(tmp_path, monkeypatch):
+    """An error reading one file's stored chunks fails that file only"""
+    for name in ("broken.md", "fine.md"):
+        write_book(tmp_path / name, 6)
+    files = [(str(tmp_path / name), None) for name in ("broken.md", "fine.md")]
+
+    class BrokenSourceStore(RecordingStore):
+        async def get_source_points(self, source_path):
+            await asyncio.sleep(0)
+            if source_path == "broken.md":
+                raise RuntimeError("vector store unavailable")
+            return await super().get_source_points(source_path)
+
+    store = BrokenSourceStore()
+    monkeypatch.setattr(ingestion, "vector_store_manager", store)
+    pipeline = IngestionPipeline(workers=1, batch_size=4, incremental=True,
+                                 manifest_path=str(tmp_path / "manifest.json"), progress=lambda message: None)
+    stats = asyncio.run(pipeline.run(files, root=str(tmp_path)))
+
+    assert stats.files_failed == 1
+    assert stats.files_processed == 1
+    assert {metadata["source_path"] for metadata in store.points.values()} == {"fine.md"}
+    assert not pipeline.manifest.is_complete(files[0][0], ingestion.file_fingerprint(files[0][0]))
+
+
+def test_incremental_reingestion_embeds_only_changes(tmp_path, monkeypatch):
+    """Editing one paragraph re-embeds only the chunks that contain it"""
+    book = tmp_path / "book.txt"
+    write_book(book, 40)
+    store = RecordingStore()
+    monkeypatch.setattr(ingestion, "vector_store_manager", store)
+
+    def pipeline():
+        return IngestionPipeline(workers=1, batch_size=4, incremental=True,
+                                 manifest_path=str(tmp_path / "manifest.json"),
+                                 progress=lambda message: None)
+
+    first = asyncio.run(pipeline().run([(str(book), None)]))
+    original_ids = set(store.points)
+    assert first.chunks == len(original_ids)
+
+    # Re-running on an identical file is a no-op thanks to deterministic IDs
+    book.write_text(book.read_text(encoding="utf-8"), encoding="utf-8")
+    unchanged = asyncio.run(pipeline().run([(str(book), None)]))
+    assert unchanged.chunks == 0
+    assert unchanged.chunks_unchanged == len(original_ids)
+
+    write_book(book, 40, edited=39)
+    store.texts = []
+    edited = asyncio.run(pipeline().run([(str(book), None)]))
+
+    assert edited.chunks == len(store.texts) == 1
+    assert edited.chunks_deleted == 1
+    assert len(store.points) == len(original_ids)
+    assert "rewritten" in store.texts[0]
+
+
+def test_same_named_files_in_subdirectories_are_separate(tmp_path, monkeypatch):
+    """Files are identified by their path under the ingest root, not their name"""
+    for part in ("part1", "part2"):
+        (tmp_path / part).mkdir()
+        write_book(tmp_path / part / "intro.md", 6)
+    files = [(str(tmp_path / part / "intro.md"), None) for part in ("part1", "part2")]
+    store = RecordingStore()
+    monkeypatch.setattr(ingestion, "vector_store_manager", store)
+
+    def pipeline():
+        return IngestionPipeline(workers=1, batch_size=4, incremental=True, resume=False,
+                                 manifest_path=str(tmp_path / "manifest.json"),
+                                 progress=lambda message: None)
+
+    first = asyncio.run(pipeline().run(files, root=str(tmp_path)))
+    # Identical text in the two files still gets two sets of points
+    assert len(store.points) == first.chunks
+    assert {metadata["source_path"] for metadata in store.points.values()} == {"part1/intro.md", "part2/intro.md"}
+
+    again = asyncio.run(pipeline().run(files, root=str(tmp_path)))
+    assert again.chunks == 0
+    assert again.chunks_deleted == 0
+    assert len(store.points) == first.chunks
+
+
+def local_manager(tmp_path, monkeypatch):
+    """A vector store manager on the local backend, as a fresh process would build it"""
+    monkeypatch.setattr(settings, "VECTOR_STORE_BACKEND", "local")
+    monkeypatch.setattr(settings, "LOCAL_INDEX_PATH", str(tmp_path / "index"))
+    monkeypatch.setattr(settings, "BM25_INDEX_PATH", str(tmp_path / "bm25.pkl"))
+    monkeypatch.setattr(settings, "EMBEDDING_PROVIDER", "hashing")
+    monkeypatch.setattr(settings, "EMBEDDING_DIMENSION", 64)
+    manager = VectorStoreManager()
+    manager.embedding_store = None
+    manager.query_batcher = None
+    monkeypatch.setattr(ingestion, "vector_store_manager", manager)
+    return manager
+
+
+def crash_and_resume(tmp_path, monkeypatch):
+    """Kill an ingestion run on the local backend at its fourth batch, then resume it in a fresh manager"""
+    book = tmp_path / "book.txt"
+    write_book(book, 80)
+    manifest = str(tmp_path / "manifest.json")
+
+    def pipeline():
+        return IngestionPipeline(workers=1, batch_size=1, embed_concurrency=1, manifest_path=manifest,
+                                 checkpoint_seconds=0, progress=lambda message: None)
+
+    crashing = local_manager(tmp_path, monkeypatch)
+    embed_documents = crashing.embed_documents
+    calls = []
+
+    async def dying_embed_documents(texts):
+        calls.append(texts)
+        if len(calls) == 4:
+            raise SystemExit("killed")
+        return await embed_documents(texts)
+
+    crashing.embed_documents = dying_embed_documents
+    with pytest.raises(SystemExit):
+        asyncio.run(pipeline().run([(str(book), None)]))
+
+    resumed = local_manager(tmp_path, monkeypatch)
+    stats = asyncio.run(pipeline().run([(str(book), None)]))
+    # Whatever was recorded before the crash is skipped, the rest is ingested again
+    assert 0 < stats.batches_skipped < 4
+    return resumed, stats
+
+
+def test_resumed_run_after_a_crash_indexes_every_chunk(tmp_path, monkeypatch):
+    """Batches recorded before the process died are durable in the lexical index"""
+    resumed, stats = crash_and_resume(tmp_path, monkeypatch)
+
+    assert len(resumed.get_lexical_index()) == stats.batches + stats.batches_skipped
+
+
+def test_resumed_run_after_a_crash_stores_every_chunk(tmp_path, monkeypatch):
+    """Batches recorded before the process died are durable in the local vector index"""
+    resumed, stats = crash_and_resume(tmp_path, monkeypatch)
+
+    # Read back what is on disk, as a server started now would
+    index = LocalVectorIndex(settings.LOCAL_INDEX_PATH)
+    info = asyncio.run(index.get_collection(resumed.collection_name))
+    assert info.points_count == stats.batches + stats.batches_skipped
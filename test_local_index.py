@@ -0,0 +1,230 @@
+import asyncio
+import os
+import threading
+
+# Temporarily set environment variables to allow imports
+os.environ.setdefault('POSTGRES_SERVER', 'test')
+os.environ.setdefault('POSTGRES_USER', 'test')
+os.environ.setdefault('POSTGRES_PASSWORD', 'test')
+os.environ.setdefault('POSTGRES_DB', 'test')
+os.environ.setdefault('QDRANT_HOST', 'test')
+os.environ.setdefault('QDRANT_API_KEY', 'test')
+os.environ.setdefault('OPENAI_API_KEY', 'test')
+
+import numpy as np
+from qdrant_client.http import models
+
+from app.core.config import settings
+from app.utils.local_index import LocalCollection, LocalVectorIndex
+from app.utils.vector_store import VectorStoreManager
+
+COSINE = models.VectorParams(size=8, distance=models.Distance.COSINE)
+
+
+def source_filter(source_file):
+    return models.Filter(must=[
+        models.FieldCondition(key="metadata.source_file", match=models.MatchValue(value=source_file))
+    ])
+
+
+def make_points(vectors):
+    return [
+        models.PointStruct(
+            id=i,
+            vector=vector.tolist(),
+            payload={"text": f"chunk {i}", "metadata": {"source_file": "a.md" if i % 2 else "b.md"}}
+        )
+        for i, vector in enumerate(vectors)
+    ]
+
+
+def test_search_matches_brute_force_with_threshold_and_filter(tmp_path):
+    """Top-k equals an exact cosine ranking; thresholds and payload filters are honored"""
+    rng = np.random.default_rng(7)
+    vectors = rng.normal(size=(300, 8)).astype(np.float32)
+    query = rng.normal(size=8).astype(np.float32)
+    index = LocalVectorIndex(str(tmp_path))
+
+    async def scenario():
+        await index.create_collection("book", vectors_config=COSINE)
+        await index.upsert("book", make_points(vectors))
+        top = await index.search("book", query_vector=query.tolist(), limit=5)
+        above = await index.search("book", query_vector=query.tolist(), limit=300, score_threshold=0.5)
+        filtered = await index.search("book", query_vector=query.tolist(), limit=5, query_filter=source_filter("a.md"))
+        batch = await index.search_batch("book", requests=[
+            models.SearchRequest(vector=query.tolist(), limit=5, with_payload=True),
+            models.SearchRequest(vector=vectors[3].tolist(), limit=1, with_payload=True),
+        ])
+        return top, above, filtered, batch
+
+    top, above, filtered, batch = asyncio.run(scenario())
+
+    normalized = vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+    cosine = normalized @ (query / np.linalg.norm(query))
+    assert [point.id for point in top] == list(np.argsort(-cosine)[:5])
+    assert np.allclose([point.score for point in top], np.sort(cosine)[::-1][:5], atol=1e-5)
+    assert len(above) == int((cosine >= 0.5).sum()) and all(point.score >= 0.5 for point in above)
+    assert [point.id for point in filtered] == [i for i in np.argsort(-cosine) if i % 2][:5]
+    assert filtered[0].payload["metadata"]["source_file"] == "a.md"
+    assert [point.id for point in batch[0]] == [point.id for point in top]
+    assert batch[1][0].id == 3
+
+
+def test_changes_persist_and_reload_memory_mapped(tmp_path):
+    """wait=True persists; another process' index maps the files and sees deletions and payload updates"""
+    vectors = np.eye(8, dtype=np.float32)
+    writer = LocalVectorIndex(str(tmp_path))
+
+    async def write():
+        await writer.create_collection("book", vectors_config=COSINE)
+        await writer.upsert("book", make_points(vectors), wait=False)
+        await writer.delete("book", points_selector=models.PointIdsList(points=[2]), wait=False)
+        await writer.set_payload("book", payload={"pinned": True}, points=[5], wait=True)
+
+    asyncio.run(write())
+
+    reader = LocalVectorIndex(str(tmp_path))
+
+    async def read():
+        hits = await reader.search("book", query_vector=vectors[7].tolist(), limit=1)
+        gone = await reader.search("book", query_vector=vectors[2].tolist(), limit=1, score_threshold=0.5)
+        records = await reader.retrieve("book", ids=[5, 2])
+        page, offset = await reader.scroll("book", scroll_filter=source_filter("a.md"), limit=2)
+        rest, end = await reader.scroll("book", scroll_filter=source_filter("a.md"), limit=2, offset=offset)
+        return hits, gone, records, page + rest, end
+
+    hits, gone, records, scrolled, end = asyncio.run(read())
+
+    assert hits[0].id == 7 and abs(hits[0].score - 1.0) < 1e-6
+    assert gone == []
+    assert [record.id for record in records] == [5]
+    assert records[0].payload["pinned"] is True
+    assert sorted(record.id for record in scrolled) == [1, 3, 5, 7] and end is None
+    assert reader.stats()["collections"]["book"]["memory_mapped"] is True
+
+
+def test_rewritten_collection_is_reloaded_once_off_the_event_loop(tmp_path, monkeypatch):
+    """Concurrent searches share one reload, which reads the files in a worker thread"""
+    vectors = np.eye(8, dtype=np.float32)
+    writer = LocalVectorIndex(str(tmp_path))
+    reader = LocalVectorIndex(str(tmp_path))
+    load = LocalCollection.load
+    loaded_in = []
+
+    def recording_load(directory):
+        loaded_in.append(threading.current_thread())
+        return load(directory)
+
+    monkeypatch.setattr(LocalCollection, "load", recording_load)
+
+    async def scenario():
+        await writer.create_collection("book", vectors_config=COSINE)
+        await writer.upsert("book", make_points(vectors[:4]))
+        before = await reader.search("book", query_vector=vectors[6].tolist(), limit=1, score_threshold=0.5)
+        await writer.upsert("book", make_points(vectors))
+        reader._checked_at.clear()  # As if the reload check interval had passed
+        after = await asyncio.gather(*[
+            reader.search("book", query_vector=vectors[6].tolist(), limit=1) for _ in range(5)
+        ])
+        return before, after
+
+    before, after = asyncio.run(scenario())
+
+    assert before == []
+    assert all(hits[0].id == 6 for hits in after)
+    assert reader.reloads == 2
+    assert threading.main_thread() not in loaded_in
+
+
+def test_vector_store_manager_on_local_backend(tmp_path, monkeypatch):
+    """Ingest, search, per-file lookups and versioning work without a Qdrant server"""
+    monkeypatch.setattr(settings, "VECTOR_STORE_BACKEND", "local")
+    monkeypatch.setattr(settings, "LOCAL_INDEX_PATH", str(tmp_path / "index"))
+    monkeypatch.setattr(settings, "BM25_INDEX_PATH", str(tmp_path / "bm25.pkl"))
+    monkeypatch.setattr(settings, "EMBEDDING_PROVIDER", "hashing")
+    monkeypatch.setattr(settings, "EMBEDDING_DIMENSION", 256)
+    monkeypatch.setattr(settings, "SIMILARITY_THRESHOLD", 0.1)
+    manager = VectorStoreManager()
+    manager.embedding_store = None
+    manager.query_batcher = None
+
+    texts = [
+        "The keeper trimmed the lamp of the lighthouse every evening.",
+        "His daughter kept the logbook of passing ships.",
+        "A winter storm wrecked the supply boat on the rocks.",
+    ]
+
+    async def scenario():
+        ids = await manager.add_texts(texts, metadatas=[{"source_file": "book.md", "source_path": "book.md"}] * 3)
+        docs = await manager.similarity_search("Who trimmed the lighthouse lamp?", k=1)
+        points = await manager.get_source_points("book.md")
+        await manager.delete_points(ids[:1])
+        remaining = await manager.get_source_points("book.md")
+        return ids, docs, points, remaining, await manager.get_collection_version()
+
+    ids, docs, points, remaining, version = asyncio.run(scenario())
+
+    assert docs[0].page_content == texts[0]
+    assert set(points) == set(ids)
+    assert set(remaining) == set(ids[1:])
+    assert version != "0"
+
+
+def clustered_vectors(rng, count, dimension=16, clusters=20):
+    centers = rng.normal(size=(clusters, dimension))
+    return (centers[rng.integers(clusters, size=count)] + 0.3 * rng.normal(size=(count, dimension))).astype(np.float32)
+
+
+def test_ivf_search_is_close_to_exact_and_persists(tmp_path):
+    """Probing a few clusters finds nearly all exact neighbors; the index survives a reload"""
+    rng = np.random.default_rng(3)
+    vectors = clustered_vectors(rng, 2000)
+    queries = clustered_vectors(rng, 20)
+    params = models.VectorParams(size=16, distance=models.Distance.COSINE)
+    writer = LocalVectorIndex(str(tmp_path), index_type="ivf", nlist=32, nprobe=4, min_points=1000)
+
+    async def build():
+        await writer.create_collection("book", vectors_config=params)
+        await writer.upsert("book", make_points(vectors[:1500]), wait=False)
+        lists = await writer.build_index("book")
+        # Points added after the build are assigned to their nearest cluster
+        await writer.upsert("book", [
+            models.PointStruct(id=i, vector=vectors[i].tolist(), payload={"metadata": {"source_file": "c.md"}})
+            for i in range(1500, 2000)
+        ])
+        return lists
+
+    assert asyncio.run(build())["ivf_lists"] == 32
+
+    reader = LocalVectorIndex(str(tmp_path), index_type="ivf", nprobe=4)
+
+    async def search():
+        approximate = [await reader.search("book", query_vector=q.tolist(), limit=10) for q in queries]
+        exact = [
+            await reader.search("book", query_vector=q.tolist(), limit=10, search_params=models.SearchParams(exact=True))
+            for q in queries
+        ]
+        filtered = await reader.search("book", query_vector=queries[0].tolist(), limit=5, query_filter=source_filter("c.md"))
+        return approximate, exact, filtered
+
+    approximate, exact, filtered = asyncio.run(search())
+
+    recall = np.mean([
+        len({p.id for p in a} & {p.id for p in e}) / 10 for a, e in zip(approximate, exact)
+    ])
+    assert recall >= 0.9
+    assert reader.stats()["collections"]["book"]["ivf_lists"] == 32
+    assert reader.stats()["approximate_searches"] == 21
+    assert len(filtered) == 5 and all(point.id >= 1500 for point in filtered)
+
+
+def test_small_collections_stay_exact(tmp_path):
+    """Below min_points no IVF index is built and a flat index ignores one"""
+    index = LocalVectorIndex(str(tmp_path), index_type="ivf", min_points=1000)
+
+    async def scenario():
+        await index.create_collection("book", vectors_config=COSINE)
+        await index.upsert("book", make_points(np.eye(8, dtype=np.float32)))
+        return await index.build_index("book")
+
+    assert asyncio.run(scenario())["ivf_lists"] is None
@@ -0,0 +1,56 @@
+import os
+from datetime import datetime, timezone
+
+import pytest
+
+# Temporarily set environment variables to allow imports
+os.environ.setdefault('POSTGRES_SERVER', 'test')
+os.environ.setdefault('POSTGRES_USER', 'test')
+os.environ.setdefault('POSTGRES_PASSWORD', 'test')
+os.environ.setdefault('POSTGRES_DB', 'test')
+os.environ.setdefault('QDRANT_HOST', 'test')
+os.environ.setdefault('QDRANT_API_KEY', 'test')
+os.environ.setdefault('OPENAI_API_KEY', 'test')
+
+from sqlalchemy.dialects import postgresql
+
+from app.database.pagination import decode_cursor, encode_cursor, split_page
+from app.models.chat_session import ChatMessage
+from app.routers.session import _session_messages_query
+
+
+def test_cursor_round_trip():
+    """Cursors are opaque but carry the exact sort key of the last row"""
+    timestamp = datetime(2026, 10, 17, 12, 30, 1, 250000, tzinfo=timezone.utc)
+    cursor = encode_cursor(timestamp, 42)
+
+    assert "=" not in cursor
+    assert decode_cursor(cursor) == (timestamp, 42)
+
+    with pytest.raises(ValueError):
+        decode_cursor("not-a-cursor")
+
+
+def test_split_page_only_sets_cursor_when_more_rows_exist():
+    """Queries fetch limit + 1 rows; the extra row only signals a next page"""
+    timestamp = datetime(2026, 10, 17, tzinfo=timezone.utc)
+    rows = [(timestamp, i) for i in range(3)]
+
+    page, cursor = split_page(rows, 2, lambda row: row)
+    assert page == rows[:2]
+    assert decode_cursor(cursor) == (timestamp, 1)
+
+    assert split_page(rows, 3, lambda row: row) == (rows, None)
+
+
+def test_messages_query_is_keyset_on_the_composite_index():
+    """The page query seeks past the cursor instead of using OFFSET"""
+    cursor = encode_cursor(datetime(2026, 10, 17, tzinfo=timezone.utc), 7)
+    sql = str(_session_messages_query(5, 50, cursor).compile(dialect=postgresql.dialect()))
+
+    assert "(chat_messages.timestamp, chat_messages.id) >" in sql
+    assert "ORDER BY chat_messages.timestamp, chat_messages.id" in sql
+    assert "OFFSET" not in sql
+
+    indexed = {tuple(column.name for column in index.columns) for index in ChatMessage.__table__.indexes}
+    assert ("session_id", "timestamp", "id") in indexed
@@ -0,0 +1,116 @@
+import asyncio
+import os
+
+# Temporarily set environment variables to allow imports
+os.environ.setdefault('POSTGRES_SERVER', 'test')
+os.environ.setdefault('POSTGRES_USER', 'test')
+os.environ.setdefault('POSTGRES_PASSWORD', 'test')
+os.environ.setdefault('POSTGRES_DB', 'test')
+os.environ.setdefault('QDRANT_HOST', 'test')
+os.environ.setdefault('QDRANT_API_KEY', 'test')
+os.environ.setdefault('OPENAI_API_KEY', 'test')
+
+import numpy as np
+from qdrant_client.http import models
+
+from app.core.config import settings
+from app.utils.local_index import LocalVectorIndex
+from app.utils.quantization import ScalarQuantizer, qdrant_quantization_config
+from app.utils.vector_store import VectorStoreManager
+
+
+def unit_vectors(rng, count, dimension=32):
+    vectors = rng.normal(size=(count, dimension)).astype(np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+def test_int8_scores_approximate_float_scores():
+    """Codes take a quarter of the space and keep dot products close"""
+    rng = np.random.default_rng(0)
+    vectors = unit_vectors(rng, 1000)
+    queries = unit_vectors(rng, 5)
+
+    quantizer = ScalarQuantizer.fit(vectors)
+    codes = quantizer.encode(vectors)
+
+    assert codes.dtype == np.int8 and codes.nbytes * 4 == vectors.nbytes
+    # Only the 1% of values beyond the quantile are clipped
+    assert np.abs(quantizer.decode(codes) - vectors).mean() < 0.005
+    assert np.abs(quantizer.scores(codes, queries) - vectors @ queries.T).mean() < 0.01
+
+
+def test_local_index_searches_codes_and_rescores(tmp_path):
+    """Rescored int8 search returns exact results; codes persist and can be ignored per request"""
+    rng = np.random.default_rng(1)
+    vectors = unit_vectors(rng, 3000)
+    queries = unit_vectors(rng, 10)
+    writer = LocalVectorIndex(str(tmp_path), quantization="int8", oversampling=3.0)
+
+    async def build():
+        await writer.create_collection("book", vectors_config=models.VectorParams(size=32, distance=models.Distance.COSINE))
+        await writer.upsert("book", [
+            models.PointStruct(id=i, vector=vector.tolist(), payload={}) for i, vector in enumerate(vectors)
+        ])
+        return await writer.build_index("book")
+
+    built = asyncio.run(build())
+    assert built["quantization"] == "int8" and built["code_bytes"] * 4 == built["vector_bytes"]
+
+    reader = LocalVectorIndex(str(tmp_path), quantization="int8", oversampling=3.0)
+    ignore = models.SearchParams(quantization=models.QuantizationSearchParams(ignore=True))
+
+    async def search():
+        rescored = await reader.search_batch("book", requests=[
+            models.SearchRequest(vector=query.tolist(), limit=5) for query in queries
+        ])
+        exact = [await reader.search("book", query_vector=query.tolist(), limit=5, search_params=ignore) for query in queries]
+        return rescored, exact
+
+    rescored, exact = asyncio.run(search())
+
+    truth = np.argsort(-(vectors @ queries.T), axis=0)[:5].T
+    assert [[point.id for point in hits] for hits in exact] == truth.tolist()
+    assert [[point.id for point in hits] for hits in rescored] == truth.tolist()
+    assert reader.stats()["quantized_searches"] == 10
+    assert reader.stats()["collections"]["book"]["memory_mapped"] is True
+
+
+class QuantizationClient:
+    """Records how the collection is created and searched"""
+
+    def __init__(self):
+        self.created = None
+        self.search_params = None
+
+    async def get_collection(self, name):
+        raise RuntimeError("not found")
+
+    async def create_collection(self, collection_name, vectors_config, quantization_config=None):
+        self.created = (vectors_config, quantization_config)
+
+    async def create_payload_index(self, **kwargs):
+        pass
+
+    async def search(self, search_params=None, **kwargs):
+        self.search_params = search_params
+        return []
+
+
+def test_qdrant_collection_is_created_quantized(monkeypatch):
+    """VECTOR_QUANTIZATION=int8 creates an int8 collection with on-disk originals and rescored searches"""
+    monkeypatch.setattr(settings, "VECTOR_QUANTIZATION", "int8")
+    monkeypatch.setattr(settings, "EMBEDDING_PROVIDER", "hashing")
+    monkeypatch.setattr(settings, "EMBEDDING_DIMENSION", 64)
+    manager = VectorStoreManager()
+    manager.client = QuantizationClient()
+    manager._initialized = True
+
+    asyncio.run(manager._ensure_collection_exists())
+    asyncio.run(manager.similarity_search_with_score_by_vector([0.1] * 64))
+
+    vectors_config, quantization_config = manager.client.created
+    assert vectors_config.on_disk is True
+    assert quantization_config == qdrant_quantization_config()
+    assert quantization_config.scalar.type == models.ScalarType.INT8
+    assert manager.client.search_params.quantization.rescore is True
+    assert manager.client.search_params.quantization.oversampling == settings.QUANTIZATION_OVERSAMPLING
@@ -0,0 +1,95 @@
+import asyncio
+import os
+import threading
+
+# Temporarily set environment variables to allow imports
+os.environ.setdefault('POSTGRES_SERVER', 'test')
+os.environ.setdefault('POSTGRES_USER', 'test')
+os.environ.setdefault('POSTGRES_PASSWORD', 'test')
+os.environ.setdefault('POSTGRES_DB', 'test')
+os.environ.setdefault('QDRANT_HOST', 'test')
+os.environ.setdefault('QDRANT_API_KEY', 'test')
+os.environ.setdefault('OPENAI_API_KEY', 'test')
+
+import pytest
+from langchain_core.documents import Document
+
+from app.core.config import settings
+from app.core.rag_service import RAGService
+from app.utils.reranking import LexicalReranker, Reranker, create_reranker, lexical_scores
+
+CHUNKS = [
+    "The harbour was quiet in winter and the boats stayed moored.",
+    "Ships passed the island on their way to the northern ports.",
+    "The supply boat was wrecked on the rocks during the winter storm.",
+    "Every evening the keeper climbed the stairs to trim the lamp.",
+]
+
+
+def test_lexical_scores_prefer_matching_phrases():
+    """Chunks with the question's rarer terms, in order, score highest"""
+    scores = lexical_scores("What wrecked the supply boat?", CHUNKS)
+
+    assert scores.argmax() == 2
+    assert scores[1] == 0.0
+    assert ((scores >= 0) & (scores <= 1)).all()
+
+
+def test_reranker_keeps_best_k_of_the_candidates():
+    """A lexically matching chunk retrieved far down the list is promoted into the top k"""
+    reranker = LexicalReranker(weight=0.7)
+    candidates = [(Document(page_content=text), 0.9 - 0.1 * i) for i, text in enumerate(CHUNKS)]
+
+    ranked = asyncio.run(reranker.rerank(["Who trimmed the lamp?", "Ships?"], [candidates, []], k=2))
+
+    assert [doc.page_content for doc, _ in ranked[0]] == [CHUNKS[3], CHUNKS[0]]
+    assert ranked[0][0][1] >= ranked[0][1][1]
+    assert ranked[1] == []
+    assert reranker.stats()["queries"] == 2
+    assert reranker.stats()["candidates_scored"] == 4
+
+
+def test_reranker_without_score_fails_on_creation():
+    class UnscoredReranker(Reranker):
+        name = "unscored"
+
+    with pytest.raises(TypeError):
+        UnscoredReranker()
+
+
+def test_warm_up_loads_the_model_in_the_reranker_pool():
+    """The model is loaded before the first rerank, on a reranker thread"""
+    loaded_on = []
+
+    class LoadingReranker(LexicalReranker):
+        def load(self):
+            loaded_on.append(threading.current_thread().name)
+
+    asyncio.run(LoadingReranker().warm_up())
+
+    assert len(loaded_on) == 1
+    assert loaded_on[0].startswith("rerank")
+
+
+def test_reranker_is_configured_in_settings(monkeypatch):
+    monkeypatch.setattr(settings, "RERANKER", "none")
+    assert create_reranker() is None
+    monkeypatch.setattr(settings, "RERANKER", "lexical")
+    assert isinstance(create_reranker(), LexicalReranker)
+    monkeypatch.setattr(settings, "RERANKER", "bm42")
+    with pytest.raises(ValueError):
+        create_reranker()
+
+
+def test_global_retrieval_overfetches_and_reranks(stub_vector_store, monkeypatch):
+    """RERANK_CANDIDATES chunks are retrieved and the reranker picks the k packed into the prompt"""
+    _, client = stub_vector_store(CHUNKS)
+    monkeypatch.setattr(settings, "RERANK_CANDIDATES", 50)
+    service = RAGService()
+    service.semantic_cache = None
+    service.reranker = LexicalReranker(weight=0.7)
+
+    retrieval = asyncio.run(service._retrieve_global("What wrecked the supply boat?", k=1))
+
+    assert [request.limit for request in client.requests] == [50]
+    assert [doc.page_content for doc in retrieval["docs"]] == [CHUNKS[2]]
@@ -0,0 +1,68 @@
+import asyncio
+import os
+
+# Temporarily set environment variables to allow imports
+os.environ.setdefault('POSTGRES_SERVER', 'test')
+os.environ.setdefault('POSTGRES_USER', 'test')
+os.environ.setdefault('POSTGRES_PASSWORD', 'test')
+os.environ.setdefault('POSTGRES_DB', 'test')
+os.environ.setdefault('QDRANT_HOST', 'test')
+os.environ.setdefault('QDRANT_API_KEY', 'test')
+os.environ.setdefault('OPENAI_API_KEY', 'test')
+
+from app.core.semantic_cache import SemanticResponseCache
+
+
+def make_cache(versions, max_entries=10):
+    async def fetch_version():
+        return versions[0]
+
+    return SemanticResponseCache(
+        version_fetcher=fetch_version,
+        max_entries=max_entries,
+        distance_threshold=0.05,
+        version_check_seconds=0
+    )
+
+
+def test_near_duplicate_query_hits():
+    """A query within the distance threshold reuses the stored response"""
+    cache = make_cache(["v1"])
+    asyncio.run(cache.current_version())
+
+    cache.store([1.0, 0.0, 0.0], {"response": "Ahab", "sources": [{"chunk_id": 1}]})
+
+    assert cache.lookup([0.99, 0.05, 0.0])["response"] == "Ahab"
+    assert cache.lookup([0.0, 1.0, 0.0]) is None
+    assert cache.stats()["hits"] == 1
+    assert cache.stats()["misses"] == 1
+
+
+def test_version_change_invalidates():
+    """New collection content drops every cached response"""
+    versions = ["v1"]
+    cache = make_cache(versions)
+    asyncio.run(cache.current_version())
+    cache.store([1.0, 0.0], {"response": "old", "sources": []})
+
+    versions[0] = "v2"
+    asyncio.run(cache.current_version())
+
+    assert cache.lookup([1.0, 0.0]) is None
+    assert cache.stats()["invalidations"] == 1
+
+
+def test_lru_eviction():
+    """The least recently used response is evicted when the cache is full"""
+    cache = make_cache(["v1"], max_entries=2)
+    asyncio.run(cache.current_version())
+
+    cache.store([1.0, 0.0, 0.0], {"response": "a", "sources": []})
+    cache.store([0.0, 1.0, 0.0], {"response": "b", "sources": []})
+    cache.lookup([1.0, 0.0, 0.0])  # "b" is now least recently used
+    cache.store([0.0, 0.0, 1.0], {"response": "c", "sources": []})
+
+    assert cache.lookup([1.0, 0.0, 0.0])["response"] == "a"
+    assert cache.lookup([0.0, 1.0, 0.0]) is None
+    assert cache.lookup([0.0, 0.0, 1.0])["response"] == "c"
+    assert cache.stats()["evictions"] == 1
@@ -0,0 +1,85 @@
+import asyncio
+import json
+import os
+from datetime import datetime, timezone
+from types import SimpleNamespace
+
+# Temporarily set environment variables to allow imports
+os.environ.setdefault('POSTGRES_SERVER', 'test')
+os.environ.setdefault('POSTGRES_USER', 'test')
+os.environ.setdefault('POSTGRES_PASSWORD', 'test')
+os.environ.setdefault('POSTGRES_DB', 'test')
+os.environ.setdefault('QDRANT_HOST', 'test')
+os.environ.setdefault('QDRANT_API_KEY', 'test')
+os.environ.setdefault('OPENAI_API_KEY', 'test')
+
+from app.database.chat_history import export_session_ndjson
+
+
+class StreamingResult:
+    """Stands in for AsyncResult, handing out rows in yield_per sized partitions"""
+
+    def __init__(self, rows, size, log):
+        self.rows = rows
+        self.size = size
+        self.log = log
+
+    async def partitions(self):
+        for start in range(0, len(self.rows), self.size):
+            self.log.append(("fetch", start))
+            yield self.rows[start:start + self.size]
+
+
+class StreamingSession:
+    def __init__(self, rows):
+        self.rows = rows
+        self.statements = []
+        self.log = []
+
+    async def stream(self, statement):
+        self.statements.append(statement)
+        return StreamingResult(self.rows, statement.get_execution_options()["yield_per"], self.log)
+
+
+def make_messages(count):
+    return [
+        SimpleNamespace(
+            id=i, session_id=7, role="user" if i % 2 == 0 else "assistant",
+            content=f"message {i}", timestamp=datetime(2024, 1, 1, 12, 0, i % 60, tzinfo=timezone.utc)
+        )
+        for i in range(count)
+    ]
+
+
+def test_export_is_ndjson_in_conversation_order():
+    """The session header comes first, then one parseable line per message"""
+    db = StreamingSession(make_messages(5))
+
+    async def collect():
+        return [chunk async for chunk in export_session_ndjson(db, '{"id": 7}', 7, batch_rows=2)]
+
+    chunks = asyncio.run(collect())
+    lines = "".join(chunks).splitlines()
+
+    assert json.loads(lines[0]) == {"id": 7}
+    messages = [json.loads(line) for line in lines[1:]]
+    assert [message["id"] for message in messages] == [0, 1, 2, 3, 4]
+    assert messages[1]["role"] == "assistant"
+    assert messages[0]["timestamp"] == "2024-01-01T12:00:00+00:00"
+    assert "ORDER BY chat_messages.timestamp, chat_messages.id" in str(db.statements[0])
+
+
+def test_export_yields_each_batch_before_fetching_the_next():
+    """Only one server-side cursor batch is held in memory at a time"""
+    db = StreamingSession(make_messages(6))
+
+    async def consume():
+        exporter = export_session_ndjson(db, "{}", 7, batch_rows=2)
+        await exporter.__anext__()  # session header
+        assert db.log == []
+        await exporter.__anext__()
+        assert db.log == [("fetch", 0)]
+        rest = [chunk async for chunk in exporter]
+        assert len(rest) == 2
+
+    asyncio.run(consume())
@@ -0,0 +1,185 @@
+import asyncio
+import os
+import threading
+
+# Temporarily set environment variables to allow imports
+os.environ.setdefault('POSTGRES_SERVER', 'test')
+os.environ.setdefault('POSTGRES_USER', 'test')
+os.environ.setdefault('POSTGRES_PASSWORD', 'test')
+os.environ.setdefault('POSTGRES_DB', 'test')
+os.environ.setdefault('QDRANT_HOST', 'test')
+os.environ.setdefault('QDRANT_API_KEY', 'test')
+os.environ.setdefault('OPENAI_API_KEY', 'test')
+
+from langchain_core.documents import Document
+
+from app.core import rag_service
+from app.core.rag_service import RAGService
+from app.schemas.chat import ChatRequest
+from app.core.single_flight import SingleFlight, request_key
+from app.utils.bm25_index import BM25Index
+
+
+def test_request_key_normalizes_query():
+    """Case and whitespace do not split identical questions; the selected text does"""
+    assert request_key("global", "Summarize  chapter 3") == request_key("global", "summarize chapter 3")
+    assert request_key("selected_text_only", "why?", "a") != request_key("selected_text_only", "why?", "b")
+
+
+def test_concurrent_identical_requests_share_one_computation():
+    """Only the first caller computes; the others wait for its result"""
+    flight = SingleFlight()
+    calls = []
+
+    async def compute():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return {"response": "shared"}
+
+    async def burst():
+        return await asyncio.gather(*(flight.do("key", compute) for _ in range(10)))
+
+    results = asyncio.run(burst())
+
+    assert len(calls) == 1
+    assert all(result["response"] == "shared" for result in results)
+    assert flight.stats()["coalesced"] == 9
+    assert len(flight) == 0
+
+
+def test_cancelled_waiter_does_not_cancel_shared_work():
+    """A disconnecting client leaves the computation running for the others"""
+    flight = SingleFlight()
+
+    async def compute():
+        await asyncio.sleep(0.02)
+        return "done"
+
+    async def scenario():
+        first = asyncio.ensure_future(flight.do("key", compute))
+        second = asyncio.ensure_future(flight.do("key", compute))
+        await asyncio.sleep(0)
+        first.cancel()
+        return await second
+
+    assert asyncio.run(scenario()) == "done"
+
+
+def test_failure_reaches_every_waiter_and_releases_key():
+    """An error is raised to all coalesced callers and the next call starts afresh"""
+    flight = SingleFlight()
+
+    async def fail():
+        await asyncio.sleep(0.01)
+        raise RuntimeError("embedding API unavailable")
+
+    async def scenario():
+        results = await asyncio.gather(*(flight.do("key", fail) for _ in range(3)), return_exceptions=True)
+        assert all(isinstance(result, RuntimeError) for result in results)
+        return await flight.do("key", lambda: asyncio.sleep(0, result="recovered"))
+
+    assert asyncio.run(scenario()) == "recovered"
+    assert flight.stats()["failures"] == 1
+
+
+def test_rag_service_coalesces_global_queries(monkeypatch):
+    """Identical global questions retrieve and answer once and each caller gets its own result"""
+    service = RAGService()
+    service.semantic_cache = None
+    retrievals, answers = [], []
+
+    async def retrieve_global(query, k):
+        retrievals.append(query)
+        await asyncio.sleep(0.01)
+        return {"query_embedding": [1.0], "docs": [], "cached": None}
+
+    def answer_global(query, docs, idf=None):
+        answers.append(query)
+        return {"response": "Chapter 3 summary", "sources": []}
+
+    monkeypatch.setattr(service, "_retrieve_global", retrieve_global)
+    monkeypatch.setattr(service, "_answer_global", answer_global)
+
+    async def burst():
+        return await asyncio.gather(*(
+            service.generate_response_global(query) for query in ["Summarize chapter 3", "summarize chapter 3 "] * 3
+        ))
+
+    results = asyncio.run(burst())
+
+    assert len(retrievals) == 1
+    assert len(answers) == 1
+    assert len({id(result) for result in results}) == len(results)
+    assert service.single_flight.stats()["coalesced"] == 10
+
+
+def test_stream_emits_sources_before_answering(monkeypatch):
+    """The sources event follows retrieval; the answer is generated afterwards"""
+    service = RAGService()
+    service.semantic_cache = None
+    answers = []
+
+    async def retrieve_global(query, k):
+        doc = Document(page_content="The keeper trimmed the lamp.", metadata={"chunk_id": 7})
+        return {"query_embedding": [1.0], "docs": [doc], "cached": None}
+
+    def answer_global(query, docs, idf=None):
+        answers.append(query)
+        return {"response": "He trimmed the lamp.", "sources": [{"chunk_id": 7}]}
+
+    monkeypatch.setattr(service, "_retrieve_global", retrieve_global)
+    monkeypatch.setattr(service, "_answer_global", answer_global)
+
+    async def first_event():
+        events = service.stream_query(ChatRequest(query="What did the keeper do?", mode="global"))
+        event = await events.__anext__()
+        answered = list(answers)
+        rest = [item async for item in events]
+        return event, answered, rest
+
+    event, answered_before_sources, rest = asyncio.run(first_event())
+
+    assert event == {"type": "sources", "sources": [{"chunk_id": 7}]}
+    assert answered_before_sources == []
+    assert "".join(item["text"] for item in rest if item["type"] == "token") == "He trimmed the lamp."
+
+
+def test_answers_are_extracted_off_the_event_loop(monkeypatch):
+    """Both modes weight terms with the book's index, fetched without the blocking getter"""
+    service = RAGService()
+    service.semantic_cache = None
+    index = BM25Index()
+    index.add("1", "The keeper trimmed the lamp.", {})
+    index.add("2", "Gulls nested on the cliff.", {})
+    threads, idfs = [], []
+
+    async def retrieve_global(query, k):
+        doc = Document(page_content="The keeper trimmed the lamp.", metadata={"chunk_id": 7})
+        return {"query_embedding": [1.0], "docs": [doc], "cached": None}
+
+    async def get_lexical_index_async():
+        return index
+
+    def get_lexical_index():
+        raise AssertionError("blocking lexical index lookup")
+
+    def recording_extract_answer(query, passages, idf=None):
+        threads.append(threading.current_thread())
+        idfs.append(idf)
+        return "He trimmed the lamp."
+
+    monkeypatch.setattr(service, "_retrieve_global", retrieve_global)
+    monkeypatch.setattr(rag_service.vector_store_manager, "get_lexical_index_async", get_lexical_index_async)
+    monkeypatch.setattr(rag_service.vector_store_manager, "get_lexical_index", get_lexical_index)
+    monkeypatch.setattr(rag_service, "extract_answer", recording_extract_answer)
+
+    async def ask():
+        await service.process_query(ChatRequest(query="What did the keeper do?", mode="global"))
+        await service.process_query(ChatRequest(
+            query="What did the keeper do?", mode="selected_text_only", selected_text="The keeper trimmed the lamp."
+        ))
+
+    asyncio.run(ask())
+
+    assert len(threads) == 2 and threading.main_thread() not in threads
+    assert idfs == [index.idf, index.idf]
@@ -0,0 +1,110 @@
+import asyncio
+import os
+
+# Temporarily set environment variables to allow imports
+os.environ.setdefault('POSTGRES_SERVER', 'test')
+os.environ.setdefault('POSTGRES_USER', 'test')
+os.environ.setdefault('POSTGRES_PASSWORD', 'test')
+os.environ.setdefault('POSTGRES_DB', 'test')
+os.environ.setdefault('QDRANT_HOST', 'test')
+os.environ.setdefault('QDRANT_API_KEY', 'test')
+os.environ.setdefault('OPENAI_API_KEY', 'test')
+
+import pytest
+from fastapi import HTTPException
+
+from app.database import write_behind
+from app.database.write_behind import ChatHistoryWriter
+from app.routers import chat
+from app.schemas.chat import ChatRequest
+
+
+class NullSession:
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        return False
+
+
+class RecordingInserts:
+    """Stands in for insert_chat_messages; session 404 does not exist"""
+
+    def __init__(self):
+        self.batches = []
+
+    async def __call__(self, db, rows):
+        self.batches.append(list(rows))
+        return sum(1 for row in rows if row[0] != 404)
+
+
+def test_full_batches_flush_without_waiting(monkeypatch):
+    """Reaching batch_rows flushes immediately, long before the flush interval"""
+    inserts = RecordingInserts()
+    monkeypatch.setattr(write_behind, "insert_chat_messages", inserts)
+    writer = ChatHistoryWriter(session_factory=NullSession, flush_interval=60, batch_rows=4)
+
+    async def scenario():
+        await writer.enqueue(1, "q1", "a1")
+        await writer.enqueue(1, "q2", "a2")
+        await asyncio.sleep(0.05)
+        return len(inserts.batches)
+
+    assert asyncio.run(scenario()) == 1
+    assert [row[1] for row in inserts.batches[0]] == ["user", "assistant", "user", "assistant"]
+    assert writer.stats()["rows_flushed"] == 4
+
+
+def test_close_flushes_pending_and_counts_dropped_rows(monkeypatch):
+    """Shutdown drains the queue; messages for unknown sessions are counted as dropped"""
+    inserts = RecordingInserts()
+    monkeypatch.setattr(write_behind, "insert_chat_messages", inserts)
+    writer = ChatHistoryWriter(session_factory=NullSession, flush_interval=60, batch_rows=100)
+
+    async def scenario():
+        await writer.enqueue(1, "q", "a")
+        await writer.enqueue(404, "q", "a")
+        await writer.close()
+
+    asyncio.run(scenario())
+    stats = writer.stats()
+    assert stats["rows_flushed"] == 2
+    assert stats["rows_dropped"] == 2
+    assert stats["queue_depth"] == 0
+    assert sum(len(batch) for batch in inserts.batches) == 4
+
+
+def test_backpressure_waits_for_the_writer(monkeypatch):
+    """A full queue makes enqueue wait instead of growing past max_pending"""
+    inserts = RecordingInserts()
+    monkeypatch.setattr(write_behind, "insert_chat_messages", inserts)
+    writer = ChatHistoryWriter(session_factory=NullSession, flush_interval=0.01, batch_rows=2, max_pending=1)
+
+    async def scenario():
+        await asyncio.gather(*(writer.enqueue(1, f"q{i}", f"a{i}") for i in range(5)))
+        await writer.close()
+
+    asyncio.run(scenario())
+    assert writer.stats()["rows_flushed"] == 10
+    assert writer.stats()["backpressure_waits"] > 0
+
+
+def test_unknown_session_is_not_found_in_write_behind_mode(monkeypatch):
+    """An unknown session ID is a 404 before anything is queued, as without write-behind"""
+    writer = ChatHistoryWriter(session_factory=NullSession, flush_interval=60)
+
+    async def resolve_session(db, session_id, query):
+        return None if session_id == 404 else session_id
+
+    async def process_query(chat_request):
+        return {"response": "answer", "sources": []}
+
+    monkeypatch.setattr(chat, "chat_history_writer", writer)
+    monkeypatch.setattr(chat, "resolve_session", resolve_session)
+    monkeypatch.setattr(chat.rag_service, "process_query", process_query)
+
+    with pytest.raises(HTTPException) as error:
+        asyncio.run(chat.chat_endpoint(ChatRequest(query="Why?", session_id=404), db=None))
+
+    assert error.value.status_code == 404
+    assert writer.stats()["turns_enqueued"] == 0